@@ -1,8 +1,10 @@
 import pandas as pd
+import numpy as np
 from pyvis.network import Network
-import leidenalg as la
-import igraph as ig
 import json
+import os
+from network_graph import NetworkArrays, normalize_range, compute_layout, export_static_html
+from network_partitions import threshold_partitions
 
 # --- CONFIGURACIÓN DE VISUALIZACIÓN ---
 PROFILES_FILE = "perfiles_instagram.txt"
@@ -11,11 +13,20 @@ NAME_MAP_FILE = "reemplazo_nombres_perfiles_visualizacion.json"
 OUTPUT_HTML_FILE = "mapa_de_red_final.html"
 
 # --- Parámetros de Visualización ---
-MIN_WEIGHT_THRESHOLD = 35.0
+# Umbral del mapa; se puede cambiar sin editar el script con la variable de entorno NETWORK_MIN_WEIGHT
+MIN_WEIGHT_THRESHOLD = float(os.environ.get("NETWORK_MIN_WEIGHT", 35.0))
+# Barrido de umbrales: calcula (y guarda en caché) las comunidades de todos estos umbrales en una ejecución
+RUN_THRESHOLD_SWEEP = False
+SWEEP_THRESHOLDS = [10.0, 20.0, 35.0, 50.0, 75.0, 100.0, 150.0, 250.0]
 VISUAL_EDGE_MIN = 1
 VISUAL_EDGE_MAX = 9
 VISUAL_NODE_MIN = 20
 VISUAL_NODE_MAX = 40
+# True: posiciones calculadas aquí (igraph) y HTML liviano con la física apagada.
+# False: mapa de pyvis con física barnes_hut y panel de configuración (se simula en el navegador).
+STATIC_LAYOUT_EXPORT = True
+BACKGROUND_COLOR = "#222222"
+EDGE_COLOR = "#848484"
 
 # --- SCRIPT PRINCIPAL ---
 print("🚀 Iniciando la optimización y normalización del mapa de red...")
@@ -35,113 +46,149 @@ except json.JSONDecodeError:
     print(f"❌ Error: El archivo '{NAME_MAP_FILE}' no tiene un formato JSON válido.")
     exit()
 
-# 1. Aplicar el filtro de umbral
-df_filtered = df[df['weight'] >= MIN_WEIGHT_THRESHOLD].copy()
-print(f"📊 De {len(df)} conexiones, se mantuvieron {len(df_filtered)} tras aplicar el umbral de {MIN_WEIGHT_THRESHOLD}.")
-if df_filtered.empty:
+# 1. Indexar la red completa una sola vez y aplicar el filtro de umbral como máscara
+full_network = NetworkArrays.from_edges(df)
+edge_mask = full_network.weights >= MIN_WEIGHT_THRESHOLD
+print(f"📊 De {len(df)} conexiones, se mantuvieron {int(edge_mask.sum())} tras aplicar el umbral de {MIN_WEIGHT_THRESHOLD}.")
+if not edge_mask.any():
     print("❌ No quedaron conexiones después de filtrar. Intenta con un umbral más bajo.")
     exit()
 
-# 2. Detección de comunidades con Leiden
-sources = df_filtered['source']
-targets = df_filtered['target']
-weights = df_filtered['weight'].reset_index(drop=True)
-G_ig = ig.Graph(directed=True)
-all_nodes = set(sources) | set(targets)
-G_ig.add_vertices(list(all_nodes))
-G_ig.add_edges(zip(sources, targets))
-G_ig.es['weight'] = weights
-partition_leiden = la.find_partition(G_ig, la.ModularityVertexPartition, weights='weight')
-partition = {G_ig.vs[i]['name']: membership for i, membership in enumerate(partition_leiden.membership)}
+# 2. Detección de comunidades con Leiden (particiones en caché por red y umbral)
+thresholds = [MIN_WEIGHT_THRESHOLD] + (SWEEP_THRESHOLDS if RUN_THRESHOLD_SWEEP else [])
+partitions = threshold_partitions(full_network, thresholds)
+if RUN_THRESHOLD_SWEEP:
+    print("🔁 Barrido de umbrales (comunidades guardadas en caché):")
+    for threshold, (threshold_membership, modularity) in sorted(partitions.items()):
+        present = threshold_membership >= 0
+        communities = len(np.unique(threshold_membership[present]))
+        print(f"   umbral {threshold:>8.1f} | {int(present.sum()):>5} nodos | "
+              f"{int((full_network.weights >= threshold).sum()):>6} conexiones | "
+              f"{communities:>4} comunidades | modularidad {modularity:.3f}")
+
+# Los nodos se indexan una sola vez; igraph, las métricas y el dibujo usan los mismos arreglos
+network, node_ids = full_network.subnetwork(edge_mask)
+membership = partitions[MIN_WEIGHT_THRESHOLD][0][node_ids]
 print("🧑‍🤝‍🧑 Se detectaron las comunidades (clusters) en la red con el algoritmo de Leiden.")
 
-# 3. Creación del gráfico interactivo
-net = Network(height="900px", width="100%", bgcolor="#222222", font_color="white", notebook=True, directed=True)
-net.barnes_hut(gravity=-120000, central_gravity=0.1, spring_length=500, spring_strength=0.01, damping=0.09, overlap=0.2)
-
-# --- 👇 OPCIONES UNIFICADAS AQUÍ 👇 ---
-# Se añade 'configure': 'true' para mostrar el menú de físicas.
-# Esto reemplaza la necesidad de llamar a net.show_buttons()
-options = """
-var options = {
-  "configure": {
-    "enabled": true,
-    "filter": "physics"
-  },
-  "interaction": {
-    "hover": true,
-    "highlightNearest": {
-      "enabled": true,
-      "degree": 1,
-      "hover": false
-    },
-    "keyboard": {
-      "enabled": true
+# 3. Atributos visuales (vectorizados sobre los arreglos de la red)
+node_relevance = network.in_strength()
+node_sizes = normalize_range(node_relevance, VISUAL_NODE_MIN, VISUAL_NODE_MAX, mask=network.in_degree() > 0)
+edge_widths = normalize_range(network.weights, VISUAL_EDGE_MIN, VISUAL_EDGE_MAX)
+num_communities = len(np.unique(membership))
+display_names = np.array([NAME_MAP.get(node, node) for node in network.names], dtype=object)
+
+def community_color(community):
+    return f"hsl({community * 360 / num_communities}, 70%, 50%)"
+
+def node_title(node, community, real_relevance):
+    return f"Perfil: {node}<br>Comunidad: {community}<br><b>Relevancia Real: {real_relevance:.2f}</b>"
+
+def edge_title(real_weight):
+    return f"<b>Impacto Real: {real_weight:.2f}</b>"
+
+if STATIC_LAYOUT_EXPORT:
+    # 4a. Posiciones precalculadas y JSON compacto: el navegador solo dibuja
+    print("📐 Calculando las posiciones de los nodos (igraph)...")
+    positions = compute_layout(network, membership)
+
+    nodes, seen_names = [], set()
+    for node, node_name, community, real_relevance, visual_size, (x, y) in zip(
+            network.names, display_names, membership.tolist(), node_relevance.tolist(),
+            node_sizes.tolist(), positions.tolist()):
+        if node_name in seen_names:  # Dos perfiles con el mismo nombre visible se dibujan como un solo nodo
+            continue
+        seen_names.add(node_name)
+        node_data = {'id': node_name, 'label': node_name, 'x': round(x, 1), 'y': round(y, 1),
+                     'size': round(visual_size, 2), 'group': str(community),
+                     'title': node_title(node, community, real_relevance)}
+        if node in candidates:
+            node_data['font'] = {'size': 35, 'strokeWidth': 3, 'strokeColor': '#000000'}
+        nodes.append(node_data)
+
+    edges = [{'from': source_name, 'to': target_name, 'value': round(visual_weight, 2), 'title': edge_title(real_weight)}
+             for source_name, target_name, real_weight, visual_weight in zip(
+                 display_names[network.sources], display_names[network.targets],
+                 network.weights.tolist(), edge_widths.tolist())]
+
+    options = {
+        'physics': {'enabled': False},
+        'nodes': {'shape': 'dot', 'borderWidth': 2, 'font': {'size': 15, 'color': 'white'}},
+        'edges': {'color': EDGE_COLOR, 'arrows': {'to': {'enabled': True}}, 'smooth': False},
+        'groups': {str(community): {'color': {'background': community_color(community), 'border': '#000000',
+                                              'highlight': {'background': community_color(community),
+                                                            'border': '#FFFFFF'}}}
+                   for community in np.unique(membership).tolist()},
+        'interaction': {'hover': True, 'keyboard': {'enabled': True}, 'hideEdgesOnDrag': True},
     }
-  }
-}
-"""
-net.set_options(options)
-# ---------------------------------------------------------
-
-# Lógica de Normalización
-node_relevance = df_filtered.groupby('target')['weight'].sum().to_dict()
-if node_relevance:
-    min_relevance = min(node_relevance.values())
-    max_relevance = max(node_relevance.values())
-    relevance_range = max_relevance - min_relevance if max_relevance > min_relevance else 1
-min_weight = df_filtered['weight'].min()
-max_weight = df_filtered['weight'].max()
-weight_range = max_weight - min_weight if max_weight > min_weight else 1
-
-# Añadir nodos
-for node in all_nodes:
-    is_candidate = node in candidates
-    node_name = NAME_MAP.get(node, node)
-    community = partition.get(node, 0)
-    real_relevance = node_relevance.get(node, 0)
-    visual_size = VISUAL_NODE_MIN + (real_relevance - min_relevance) / relevance_range * (VISUAL_NODE_MAX - VISUAL_NODE_MIN) if real_relevance > 0 else VISUAL_NODE_MIN
-
-    node_mass = visual_size / 10
-    font_size = 35 if is_candidate else 15
-    node_color = f"hsl({community * 360 / len(set(partition.values()))}, 70%, 50%)"
-
-    net.add_node(
-        node_name,
-        label=node_name,
-        size=visual_size,
-        mass=node_mass,
-        color={
-            'background': node_color,
-            'border': '#000000',
-            'highlight': {
-                'background': node_color,
-                'border': '#FFFFFF'
-            }
+
+    print("🎨 Generando el archivo HTML final (física apagada)...")
+    export_static_html(OUTPUT_HTML_FILE, nodes, edges, options, bgcolor=BACKGROUND_COLOR)
+else:
+    # 4b. Gráfico interactivo de pyvis con física en el navegador
+    net = Network(height="900px", width="100%", bgcolor=BACKGROUND_COLOR, font_color="white", notebook=True, directed=True)
+    net.barnes_hut(gravity=-120000, central_gravity=0.1, spring_length=500, spring_strength=0.01, damping=0.09, overlap=0.2)
+
+    # Se añade 'configure': 'true' para mostrar el menú de físicas.
+    # Esto reemplaza la necesidad de llamar a net.show_buttons()
+    options = """
+    var options = {
+      "configure": {
+        "enabled": true,
+        "filter": "physics"
+      },
+      "interaction": {
+        "hover": true,
+        "highlightNearest": {
+          "enabled": true,
+          "degree": 1,
+          "hover": false
         },
-        borderWidth=2,
-        title=f"Perfil: {node}<br>Comunidad: {community}<br><b>Relevancia Real: {real_relevance:.2f}</b>",
-        font={'size': font_size, 'strokeWidth': 3, 'strokeColor': '#000000' if is_candidate else 'none'}
-    )
-
-# Añadir aristas
-for _, row in df_filtered.iterrows():
-    source_name = NAME_MAP.get(row['source'], row['source'])
-    target_name = NAME_MAP.get(row['target'], row['target'])
-    real_weight = row['weight']
-    visual_weight = VISUAL_EDGE_MIN + (real_weight - min_weight) / weight_range * (VISUAL_EDGE_MAX - VISUAL_EDGE_MIN)
-
-    net.add_edge(
-        source_name,
-        target_name,
-        value=visual_weight,
-        title=f"<b>Impacto Real: {real_weight:.2f}</b>",
-        color="#848484"
-    )
-
-print("🎨 Generando el archivo HTML final...")
-# Ya no es necesaria la siguiente línea:
-# net.show_buttons(filter_=['physics'])
-net.save_graph(OUTPUT_HTML_FILE)
+        "keyboard": {
+          "enabled": true
+        }
+      }
+    }
+    """
+    net.set_options(options)
+
+    # Añadir nodos
+    for node, node_name, community, real_relevance, visual_size in zip(
+            network.names, display_names, membership.tolist(), node_relevance.tolist(), node_sizes.tolist()):
+        is_candidate = node in candidates
+        node_color = community_color(community)
+
+        net.add_node(
+            node_name,
+            label=node_name,
+            size=visual_size,
+            mass=visual_size / 10,
+            color={
+                'background': node_color,
+                'border': '#000000',
+                'highlight': {
+                    'background': node_color,
+                    'border': '#FFFFFF'
+                }
+            },
+            borderWidth=2,
+            title=node_title(node, community, real_relevance),
+            font={'size': 35 if is_candidate else 15, 'strokeWidth': 3, 'strokeColor': '#000000' if is_candidate else 'none'}
+        )
+
+    # Añadir aristas
+    for source_name, target_name, real_weight, visual_weight in zip(
+            display_names[network.sources], display_names[network.targets],
+            network.weights.tolist(), edge_widths.tolist()):
+        net.add_edge(
+            source_name,
+            target_name,
+            value=visual_weight,
+            title=edge_title(real_weight),
+            color=EDGE_COLOR
+        )
+
+    print("🎨 Generando el archivo HTML final...")
+    net.save_graph(OUTPUT_HTML_FILE)
 
 print(f"\n🎉 ¡Éxito! El mapa final ha sido guardado en '{OUTPUT_HTML_FILE}'.")
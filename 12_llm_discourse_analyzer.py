@@ -2,6 +2,7 @@ import google.generativeai as genai
 import os
 import glob
 import time
+from corpus_store import CorpusStore
 
 # Asumimos que config.py contiene: GEMINI_API_KEY
 try:
@@ -13,6 +14,10 @@ except ImportError:
 # --- CONFIGURACIÓN ---
 INPUT_FOLDER = "reportes_discurso"
 OUTPUT_FOLDER = "analisis_llm"
+# Rango opcional de fechas de creación ('AAAA-MM-DD'; END_DATE no incluido). Si se define, solo se
+# envía el texto de los posts de ese rango, leyendo del corpus únicamente sus tramos.
+START_DATE = None
+END_DATE = None
 
 # --- INSTRUCCIÓN MAESTRA (MASTER PROMPT) PARA GEMINI ---
 # Este es el cerebro del análisis. Guía al LLM para que actúe como un experto
@@ -86,6 +91,7 @@ def main():
         return
 
     print(f"💬 Se analizarán {len(corpus_files)} perfiles.")
+    corpus_store = CorpusStore(INPUT_FOLDER) if START_DATE or END_DATE else None
 
     # Bucle de análisis
     for file_path in corpus_files:
@@ -96,8 +102,11 @@ def main():
         print(f"\n--- Analizando a: {candidate_name} ---")
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                corpus_text = f.read()
+            if corpus_store is not None:
+                corpus_text = corpus_store.read_range(filename, START_DATE, END_DATE)
+            else:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    corpus_text = f.read()
 
             if not corpus_text.strip():
                 print("  ⚠️  El archivo de corpus está vacío. Saltando...")
@@ -121,6 +130,9 @@ def main():
         except Exception as e:
             print(f"  ❌ Error procesando el archivo {filename}: {e}")
 
+    if corpus_store is not None:
+        corpus_store.close()
+
     print(f"\n🎉 ¡Proceso completado! Todos los análisis están en la carpeta '{OUTPUT_FOLDER}'.")
 
 
@@ -4,6 +4,7 @@ import glob
 import json
 from jinja2 import Environment, FileSystemLoader
 import markdown # <-- LIBRERÍA AÑADIDA
+from columnar_store import load_posts
 
 # --- (El resto de la configuración se mantiene igual) ---
 CANDIDATES_FILE = "perfiles_instagram.txt"
@@ -12,15 +13,14 @@ LLM_GENERAL_FOLDER = "analisis_llm"
 LLM_EXITOSO_FOLDER = "analisis_discurso_exitoso"
 NAME_MAP_FILE = "reemplazo_nombres_perfiles_visualizacion.json"
 OUTPUT_FOLDER = "sitio_web"
-BASE_DATA_FILE = "base_de_datos_instagram.csv"
+BASE_DATA_FILE = "base_de_datos_instagram.db"
 SUMMARY_ENGAGEMENT_FILE = "output/a_resumen_candidatos.csv"
 TOP_VIDEOS_FILE = "output/b_top10_videos_likes.csv"
 
 
 def get_start_date(file_path):
     try:
-        df = pd.read_csv(file_path, usecols=['post_created_at_str'])
-        df['post_created_at_str'] = pd.to_datetime(df['post_created_at_str'])
+        df = load_posts(columns=['post_created_at_str'], db_file=file_path)
         min_date = df['post_created_at_str'].min().strftime('%d de %B de %Y')
         return min_date
     except Exception as e:
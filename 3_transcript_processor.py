@@ -1,25 +1,17 @@
 import requests
-import csv
 import os
-import time
+import json
 import re # ¡Importante añadir esta librería!
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Asumimos que config.py contiene: SCRAPE_API_KEY = "tu_clave"
-from config import SCRAPE_API_KEY
+from scrapecreators_client import api_get, ENDPOINT_TRANSCRIPT
+import post_db
 
 # Rutas a los archivos
-INPUT_CSV_FILE = "base_de_datos_instagram.csv"
-OUTPUT_CSV_FILE_TEMP = "base_de_datos_instagram_temp.csv"
+INPUT_DB_FILE = post_db.DB_FILE
+TRANSCRIPT_JOURNAL_FILE = "transcripciones_journal.jsonl"  # Diario de versiones anteriores (solo se fusiona)
 
-# Endpoint de la API
-BASE_URL_TRANSCRIPT = "https://api.scrapecreators.com/v2/instagram/media/transcript"
-
-HEADERS = {
-    "x-api-key": SCRAPE_API_KEY,
-    "accept": "application/json"
-}
-
-BATCH_SIZE = 5  # Guardar el progreso cada 5 posts
+MAX_WORKERS = 6  # Transcripciones consultadas simultáneamente
 
 def limpiar_transcripcion_srt(texto_srt: str) -> str:
     """
@@ -41,9 +33,7 @@ def get_transcript(post_url):
     """
     params = {"url": post_url}
     try:
-        response = requests.get(BASE_URL_TRANSCRIPT, headers=HEADERS, params=params, timeout=45) # Añadido timeout
-        response.raise_for_status()
-        data = response.json()
+        data = api_get(ENDPOINT_TRANSCRIPT, params)
         
         found_transcripts = []
         
@@ -73,78 +63,62 @@ def get_transcript(post_url):
         print(f"  ❌ Error al decodificar JSON para {post_url}. Respuesta no válida.")
         return "Error en la transcripción."
 
+def load_journal(journal_file):
+    """
+    Carga el diario de transcripciones {shortcode: transcripción}.
+    Una última línea incompleta (por un corte abrupto) se ignora.
+    """
+    journal = {}
+    if not os.path.exists(journal_file):
+        return journal
+    with open(journal_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            journal[entry['shortcode']] = entry['transcript']
+    return journal
+
 def process_transcriptions():
     """
-    Función principal que lee el CSV, procesa las transcripciones pendientes y guarda el resultado.
+    Función principal que consulta en la base los videos sin transcripción, las obtiene
+    y las guarda. Cada resultado se confirma en la base apenas llega, de modo que una
+    ejecución interrumpida se reanuda sin repetir llamadas a la API.
     """
-    if not os.path.exists(INPUT_CSV_FILE):
-        print(f"Error: El archivo de entrada '{INPUT_CSV_FILE}' no existe.")
+    if not os.path.exists(INPUT_DB_FILE) and not os.path.exists(post_db.LEGACY_CSV_FILE):
+        print(f"Error: La base de datos '{INPUT_DB_FILE}' no existe.")
         return
 
-    rows_to_process = []
-    header = []
-    with open(INPUT_CSV_FILE, 'r', newline='', encoding='utf-8') as f_in:
-        reader = csv.reader(f_in)
-        header = next(reader)
-        # Asegurarse de que las columnas existen
-        if 'post_url' not in header or 'post_transcript' not in header or 'media_type' not in header:
-            print("Error: El CSV debe contener las columnas 'post_url', 'post_transcript' y 'media_type'.")
-            return
-        
-        for row in reader:
-            rows_to_process.append(row)
-
-    url_index = header.index('post_url')
-    transcript_index = header.index('post_transcript')
-    media_type_index = header.index('media_type') # <-- Obtenemos el índice de media_type
-
+    conn = post_db.connect(INPUT_DB_FILE)
     transcriptions_processed_count = 0
-    total_rows = len(rows_to_process)
-    
-    print("🚀 Iniciando proceso de transcripción...")
 
-    for i, row in enumerate(rows_to_process):
-        # --- 👇 LÓGICA DE FILTRADO MEJORADA 👇 ---
-        
-        is_video = row[media_type_index].strip() == '2'
-        current_transcript = row[transcript_index]
-        needs_processing = not current_transcript or current_transcript.strip() in ["N/A"]
-
-        # Solo procesar si es un video Y necesita transcripción
-        if is_video and needs_processing:
-            post_url = row[url_index]
-            print(f"({i+1}/{total_rows}) 💬 Procesando video: {post_url}")
-            
-            new_transcript = get_transcript(post_url)
-            row[transcript_index] = new_transcript
-            
+    # --- Diario de una versión anterior del script (basada en CSV) que quedó sin fusionar ---
+    journal = load_journal(TRANSCRIPT_JOURNAL_FILE)
+    if journal:
+        transcriptions_processed_count += post_db.set_transcripts(conn, journal.items())
+        print(f"♻️ Se recuperaron {len(journal)} transcripciones del diario '{TRANSCRIPT_JOURNAL_FILE}'.")
+        os.remove(TRANSCRIPT_JOURNAL_FILE)
+
+    # Videos pendientes (únicos por shortcode): consulta directa a la base
+    pending = dict(post_db.pending_transcripts(conn))
+
+    total_pending = len(pending)
+    print(f"🚀 Iniciando proceso de transcripción ({total_pending} videos pendientes, {MAX_WORKERS} hilos)...")
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {executor.submit(get_transcript, post_url): (shortcode, post_url) for shortcode, post_url in pending.items()}
+        for i, future in enumerate(as_completed(futures)):
+            shortcode, post_url = futures[future]
+            new_transcript = future.result()
+            # Un solo hilo escribe en la base: una actualización pequeña por resultado
+            transcriptions_processed_count += post_db.set_transcripts(conn, [(shortcode, new_transcript)])
+            print(f"({i+1}/{total_pending}) 💬 {post_url}")
             print(f"  ➡️ Resultado: {new_transcript[:80]}...")
-            transcriptions_processed_count += 1
-            
-            # Pausa para no saturar la API
-            time.sleep(1)
-
-            # Guardar progreso cada BATCH_SIZE
-            if transcriptions_processed_count > 0 and transcriptions_processed_count % BATCH_SIZE == 0:
-                print(f"\n✅ Lote de {BATCH_SIZE} posts completado. Guardando progreso...\n")
-                
-                with open(OUTPUT_CSV_FILE_TEMP, 'w', newline='', encoding='utf-8') as f_out:
-                    writer = csv.writer(f_out)
-                    writer.writerow(header)
-                    writer.writerows(rows_to_process)
-                
-                os.replace(OUTPUT_CSV_FILE_TEMP, INPUT_CSV_FILE)
-
-    # Guardado final
+
+    conn.close()
     if transcriptions_processed_count > 0:
-        print("\n✅ Proceso finalizado. Guardando los últimos cambios...")
-        with open(OUTPUT_CSV_FILE_TEMP, 'w', newline='', encoding='utf-8') as f_out:
-            writer = csv.writer(f_out)
-            writer.writerow(header)
-            writer.writerows(rows_to_process)
-        
-        os.replace(OUTPUT_CSV_FILE_TEMP, INPUT_CSV_FILE)
-        print(f"🎉 ¡Éxito! Se actualizaron {transcriptions_processed_count} posts en '{INPUT_CSV_FILE}'.")
+        print(f"\n🎉 ¡Éxito! Se actualizaron {transcriptions_processed_count} posts en '{INPUT_DB_FILE}'.")
     else:
         print("\n✅ No se encontraron videos pendientes de transcripción. ¡Todo está actualizado!")
 
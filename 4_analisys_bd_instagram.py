@@ -2,6 +2,8 @@ import pandas as pd
 import os
 import numpy as np
 from datetime import datetime, timedelta
+from columnar_store import load_posts
+from engagement_metrics import add_engagement_metrics
 
 def run_analysis(df, output_folder):
     """
@@ -19,38 +21,22 @@ def run_analysis(df, output_folder):
         os.makedirs(output_folder)
         print(f"Carpeta '{output_folder}' creada.")
 
-    # --- PASO 2: Cálculo de Métricas de Engagement ---
-    print("Paso 2: Calculando métricas de engagement...")
+    # --- PASO 2: Métricas de Engagement ---
+    # Las columnas 'engagement_likes' y 'engagement_comments' vienen precalculadas
+    # (engagement_metrics.py): si es video se calculan por reproducciones, si no por seguidores.
+    print("Paso 2: Usando métricas de engagement precalculadas...")
     
     # Copia segura para evitar SettingWithCopyWarning
     df = df.copy()
-
-    # Calcular engagement basado en seguidores (para no videos)
-    engagement_likes_followers = (df['likes_count'] / df['followers_count']) * 100
-    engagement_comments_followers = (df['comments_count'] / df['followers_count']) * 100
-
-    # Calcular engagement basado en reproducciones (solo para videos)
-    engagement_likes_plays = (df['likes_count'] / df['play_count']) * 100
-    engagement_comments_plays = (df['comments_count'] / df['play_count']) * 100
-
-    # Aplicar la lógica condicional usando np.where
-    # Si media_type es 2 (video), usa el cálculo por plays. Si no (imagen o carrusel), usa el cálculo por followers.
-    df['engagement_likes'] = np.where(df['media_type'] == 2, engagement_likes_plays, engagement_likes_followers)
-    df['engagement_comments'] = np.where(df['media_type'] == 2, engagement_comments_plays, engagement_comments_followers)
-
-    # Reemplazar posibles valores infinitos o NaN con 0
-    df.replace([np.inf, -np.inf], np.nan, inplace=True)
-    df['engagement_likes'] = df['engagement_likes'].fillna(0)
-    df['engagement_comments'] = df['engagement_comments'].fillna(0)
     
-    print(" -> Métricas de engagement calculadas.")
+    print(" -> Métricas de engagement listas.")
 
     # --- PASO 3: Creación del Resumen de Candidatos ---
     print("Paso 3: Creando el resumen de candidatos...")
     
     # CORRECCIÓN AQUÍ: Se usa 'max' en lugar de 'first' para asegurar que se tome
     # el valor más alto (el conteo real) y se ignoren los NaNs generados por la limpieza.
-    resumen_candidatos = df.groupby('username').agg(
+    resumen_candidatos = df.groupby('username', observed=True).agg(
         seguidores_actualizados=('followers_count', 'max'), 
         total_publicaciones=('post_id', 'count')
     ).reset_index()
@@ -60,7 +46,7 @@ def run_analysis(df, output_folder):
 
 
     # Calcular promedios de engagement por tipo de medio
-    avg_engagement = df.groupby(['username', 'media_type']).agg(
+    avg_engagement = df.groupby(['username', 'media_type'], observed=True).agg(
         avg_likes=('engagement_likes', 'mean'),
         avg_comments=('engagement_comments', 'mean')
     ).reset_index()
@@ -72,12 +58,13 @@ def run_analysis(df, output_folder):
     pivot_engagement = avg_engagement.pivot_table(
         index='username',
         columns='media_type',
-        values=['avg_likes', 'avg_comments']
+        values=['avg_likes', 'avg_comments'],
+        observed=True
     ).reset_index()
 
     # Renombrar las columnas de forma más descriptiva
     pivot_engagement.columns = [
-        f'{col[0]}_{media_type_map[int(col[1])]}' if isinstance(col[1], (int, float)) and int(col[1]) in media_type_map else col[0] 
+        f'{col[0]}_{media_type_map[int(col[1])]}' if isinstance(col[1], (int, float, np.integer, np.floating)) and int(col[1]) in media_type_map else col[0] 
         for col in pivot_engagement.columns
     ]
     
@@ -113,7 +100,7 @@ def run_analysis(df, output_folder):
             
         # Ordenar por usuario y métrica, luego tomar los 10 primeros por usuario
         top_10_df = media_df.sort_values(by=['username', metric], ascending=[True, False]) \
-                             .groupby('username') \
+                             .groupby('username', observed=True) \
                              .head(10)
         
         # Guardar el archivo Top 10
@@ -131,8 +118,8 @@ def run_analysis(df, output_folder):
     # Generar datos de evolución diaria
     if 'post_created_at_str' in df.columns and not df['post_created_at_str'].isnull().all():
         df['dia_publicacion'] = df['post_created_at_str'].dt.date
-        likes_evolution = df.groupby(['dia_publicacion', 'username'])['likes_count'].sum().reset_index()
-        comments_evolution = df.groupby(['dia_publicacion', 'username'])['comments_count'].sum().reset_index()
+        likes_evolution = df.groupby(['dia_publicacion', 'username'], observed=True)['likes_count'].sum().reset_index()
+        comments_evolution = df.groupby(['dia_publicacion', 'username'], observed=True)['comments_count'].sum().reset_index()
 
         likes_evolution.to_csv(os.path.join(output_folder, 'h_datos_evolucion_likes.csv'), index=False)
         print(" -> Archivo 'h_datos_evolucion_likes.csv' generado.")
@@ -145,7 +132,7 @@ def run_analysis(df, output_folder):
     print(f"\n✅ Análisis para '{output_folder}' completado.")
 
 
-def main(input_filepath='base_de_datos_instagram.csv'):
+def main(input_filepath='base_de_datos_instagram.db'):
     """
     Función principal que carga los datos y orquesta los dos tipos de análisis:
     completo y mensual.
@@ -153,37 +140,19 @@ def main(input_filepath='base_de_datos_instagram.csv'):
     print("Iniciando el proceso de análisis dual...")
 
     # --- Carga y Preparación Inicial de Datos ---
+    # El almacenamiento columnar ya entrega fechas como datetime y conteos como números
     try:
-        df_full = pd.read_csv(input_filepath)
+        df_full = load_posts(db_file=input_filepath)
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo de entrada en '{input_filepath}'.")
         return
 
-    # Limpieza básica inicial
-    df_full['post_created_at_str'] = pd.to_datetime(df_full['post_created_at_str'], errors='coerce')
-    # Asegurarse de que 'media_type' existe antes de convertirla
-    if 'media_type' not in df_full.columns:
-        print("Error: Falta la columna 'media_type' en el archivo CSV.")
-        return
-        
-    numeric_cols = ['followers_count', 'likes_count', 'comments_count', 'play_count', 'media_type']
-    for col in numeric_cols:
-          # Verificar si la columna existe antes de intentar convertirla
-          if col in df_full.columns:
-            df_full[col] = pd.to_numeric(df_full[col], errors='coerce')
-          else:
-            print(f"Advertencia: Falta la columna '{col}'. Se continuará sin ella.")
-            # Crear la columna con NaNs si no existe para evitar errores posteriores
-            if col == 'play_count': df_full[col] = np.nan 
-            # Para otras columnas numéricas, podrías asignar 0 o NaN según tu lógica
-            elif col in ['likes_count', 'comments_count', 'followers_count']: df_full[col] = 0 
-
-
-    # Reemplazar ceros con NaN para evitar divisiones por cero
-    if 'followers_count' in df_full.columns:
-        df_full['followers_count'] = df_full['followers_count'].replace(0, np.nan)
-    if 'play_count' in df_full.columns:
-          df_full['play_count'] = df_full['play_count'].replace(0, np.nan)
+    # Métricas de engagement de una sola pasada (en caché por versión de los datos)
+    add_engagement_metrics(df_full, ['engagement_likes', 'engagement_comments'], db_file=input_filepath)
+
+    # Reemplazar ceros con NaN (los seguidores en 0 no cuentan para el máximo del resumen)
+    df_full['followers_count'] = df_full['followers_count'].replace(0, np.nan)
+    df_full['play_count'] = df_full['play_count'].replace(0, np.nan)
     
     # --- ANÁLISIS 1: COMPLETO ---
     # Se pasa una copia del DataFrame completo a la función de análisis
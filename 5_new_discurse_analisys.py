@@ -1,68 +1,75 @@
 import pandas as pd
 import os
-import re
 import numpy as np
 from datetime import datetime, timedelta
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+from chart_renderer import render_charts, wordcloud_spec
+from columnar_store import load_posts
+from corpus_store import CorpusStore, corpus_filename
+from distinctive_terms import write_distinctive_terms
+from engagement_metrics import add_engagement_metrics
+from token_index import TokenIndex
 
 # --- CONFIGURACIÓN ---
-MAIN_DATA_FILE = "base_de_datos_instagram.csv"
+MAIN_DATA_FILE = "base_de_datos_instagram.db"
 PROFILES_FILE = "perfiles_instagram.txt"
 # Carpeta base para análisis completo
 OUTPUT_FOLDER_FULL = "reportes_discurso" 
+# Columnas que necesita este análisis (el resto no se carga)
+ANALYSIS_COLUMNS = [
+    'timestamp_registro', 'username', 'followers_count', 'post_created_at_str', 'post_url',
+    'likes_count', 'comments_count', 'post_caption', 'media_type', 'play_count', 'post_transcript',
+    'post_shortcode'
+]
 
-STOPWORDS = set([
-    'de', 'la', 'que', 'el', 'en', 'y', 'a', 'los', 'del', 'se', 'las', 'por', 'un',
-    'para', 'con', 'no', 'una', 'su', 'al', 'lo', 'como', 'más', 'pero', 'sus',
-    'le', 'ya', 'o', 'este', 'ha', 'me', 'si', 'sin', 'sobre', 'este', 'entre',
-    'cuando', ' también', 'fue', 'ser', 'son', 'dos', 'así', 'desde', 'muy', 'hasta',
-    'nos', 'mi', 'eso', 'qué', 'todo', 'todos', 'eres', 'soy', 'es', 'está', 'están'
-])
-
-# --- FUNCIONES AUXILIARES ---
-
-def clean_text(text):
-    """Limpia el texto eliminando URLs, menciones y caracteres no alfanuméricos."""
-    text = re.sub(r'http\S+', '', text)
-    text = re.sub(r'@\w+', '', text)
-    text = re.sub(r'#\w+', '', text)
-    text = re.sub(r'[^a-zA-ZáéíóúÁÉÍÓÚñÑ\s]', '', text)
-    text = text.lower()
-    return ' '.join([word for word in text.split() if word not in STOPWORDS and len(word) > 2])
-
-def generate_wordcloud(text, candidate_name, output_folder):
-    """Genera y guarda una nube de palabras a partir de un texto."""
-    wordcloud = WordCloud(width=800, height=400, background_color='white', collocations=False).generate(text)
-
-    plt.figure(figsize=(10, 5))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis("off")
-
-    filename = f"wordcloud_discurso_{candidate_name}.png"
-    filepath = os.path.join(output_folder, filename)
-    plt.savefig(filepath)
-    plt.close()
-    print(f"  🖼️ Nube de palabras guardada en '{filepath}'")
-
-def add_labels_to_bars(ax, is_percentage=False):
-    """Añade el valor como texto encima de cada barra en un gráfico."""
-    for bar in ax.patches:
-        y_value = bar.get_height()
-        x_value = bar.get_x() + bar.get_width() / 2
-
-        if is_percentage:
-            label = f"{y_value:.2%}"
-        else:
-            label = f"{int(y_value):,}"
+# --- FUNCIONES REUTILIZABLES DE ANÁLISIS ---
+
+def post_full_text(df):
+    """Texto completo de cada post (caption + transcripción), como arreglo."""
+    return (df['post_caption'].fillna('') + " " +
+            df['post_transcript'].replace('N/A', '').fillna('')).to_numpy(dtype=object)
 
-        ax.text(x_value, y_value, label, ha='center', va='bottom', fontsize=8, rotation=90)
+def compute_candidate_metrics(df):
+    """
+    Métricas de relevancia de todos los perfiles en una sola agrupación por 'username'.
 
+    Retorna un DataFrame indexado por username con: latest_followers, reach
+    (suma de reproducciones de videos), rate (tasa de interacción promedio por
+    reproducción) y total_interactions (reach * rate).
+    """
+    is_video = (df['media_type'] == 2).to_numpy()
+    grouped = pd.DataFrame({
+        'username': df['username'],
+        'followers': df['followers_count'],
+        'video_plays': df['play_count'].fillna(0).where(is_video),
+        'video_rate': df['interaction_rate'].where(is_video),  # Precalculada: (likes + comentarios) / reproducciones
+        'is_video': is_video,
+    }).groupby('username', observed=True)
+
+    metrics = grouped.agg(latest_followers=('followers', 'max'), reach=('video_plays', 'sum'),
+                          rate=('video_rate', 'mean'), videos=('is_video', 'sum'))
+    # Sin videos o sin reproducciones la tasa y las interacciones estimadas son 0
+    has_reach = (metrics['videos'] > 0) & (metrics['reach'] > 0)
+    metrics['rate'] = metrics['rate'].where(has_reach, 0)
+    metrics['total_interactions'] = (metrics['reach'] * metrics['rate']).where(has_reach, 0)
+    return metrics
+
+def top_posts_by_candidate(df, n=5):
+    """Los 'n' posts de mayor 'impact_score' de cada perfil (mismo orden que nlargest)."""
+    top_posts = (df.sort_values('impact_score', ascending=False, kind='stable')
+                 .groupby('username', observed=True).head(n))
+    return {username: group for username, group in top_posts.groupby('username', observed=True)}
+
+def run_discourse_analysis(df, candidates, output_folder, token_index):
+    """
+    Ejecuta el análisis de discurso y relevancia sobre un DataFrame específico.
 
-# --- FUNCIÓN REUTILIZABLE DE ANÁLISIS ---
+    Las frecuencias de palabras salen de 'token_index' (TokenIndex ya actualizado
+    con los posts de 'df').
 
-def run_discourse_analysis(df, candidates, output_folder):
-    """Ejecuta el análisis de discurso y relevancia sobre un DataFrame específico."""
+    Returns:
+        list: Especificaciones de las nubes de palabras y de los gráficos comparativos
+              (ver chart_renderer.render_charts).
+    """
 
     print(f"\n--- Iniciando análisis para la carpeta: '{output_folder}' ---")
 
@@ -70,73 +77,66 @@ def run_discourse_analysis(df, candidates, output_folder):
         os.makedirs(output_folder)
         print(f"📁 Carpeta '{output_folder}' creada.")
 
+    # Una sola agrupación para todos los perfiles: posiciones de sus filas, métricas y top 5
+    positions_by_candidate = df.groupby('username', observed=True).indices
+    candidate_metrics = compute_candidate_metrics(df)
+    top_posts = top_posts_by_candidate(df)
+
+    # Texto completo de cada post (caption + transcripción), una sola vez para toda la tabla
+    full_text = post_full_text(df)
+    shortcodes = df['post_shortcode'].to_numpy(dtype=object)
+    post_dates = df['post_created_at_str'].to_numpy()
+    corpus_store = CorpusStore(output_folder)
+
     comparative_results = {}
+    charts = []  # Nubes de palabras y gráficos comparativos, para render_charts
 
     for candidate in candidates:
         print(f"\n--- Analizando a: {candidate} ---")
 
-        df_candidate = df[df['username'] == candidate].copy()
-
-        if df_candidate.empty:
+        positions = positions_by_candidate.get(candidate)
+        if positions is None or not len(positions):
             print(f"  ⚠️ No se encontraron publicaciones para {candidate} en este período. Saltando...")
             continue
+        metrics = candidate_metrics.loc[candidate]
             
         # Asegurarse de que el conteo de seguidores sea válido (tomamos el max para ignorar NaNs de post individuales)
-        latest_followers = df_candidate['followers_count'].max() 
+        latest_followers = metrics['latest_followers']
         
         # --- SOLUCIÓN AL VALUERROR: Manejar NaN antes de la conversión a int ---
         if pd.isna(latest_followers) or latest_followers == 0:
              print(f"  ⚠️ Conteo de seguidores no válido (0 o NaN) para {candidate}. No se puede calcular el engagement. Se usa N/A en el reporte.")
              latest_followers_report_str = "N/A"
-             # Usar 1 como denominador temporal solo para permitir que la columna de engagement
-             # se cree y se llene con ceros más adelante. La lógica de engagement ya maneja NaNs.
-             latest_followers = 1 
         else:
             latest_followers_report_str = f"{int(latest_followers):,}"
         # -----------------------------------------------------------------------
 
 
         # 1. Preparación del Corpus de Texto
-        df_candidate['full_text'] = df_candidate['post_caption'].fillna('') + " " + \
-                                    df_candidate['post_transcript'].replace('N/A', '').fillna('')
-        
-        corpus_text = " ".join(df_candidate['full_text'])
-        cleaned_corpus = clean_text(corpus_text)
-
-        # 1.1. Guardar corpus y generar nube de palabras
-        corpus_filename = f"corpus_texto_{candidate}.txt"
-        corpus_filepath = os.path.join(output_folder, corpus_filename)
-        with open(corpus_filepath, 'w', encoding='utf-8') as f_out:
-            f_out.write(corpus_text)
-        print(f"  📝 Corpus de texto guardado en '{corpus_filepath}'")
-
-        if cleaned_corpus:
-            generate_wordcloud(cleaned_corpus, candidate, output_folder)
+        # Frecuencia de palabras sumando los tokens ya indexados de sus posts
+        word_counts = token_index.term_counts(shortcodes[positions])
+
+        # 1.1. Guardar corpus (solo se escriben los posts nuevos o cambiados) y generar nube de palabras
+        corpus_file = corpus_filename(candidate)
+        written, kept = corpus_store.sync(corpus_file, shortcodes[positions], full_text[positions], post_dates[positions])
+        print(f"  📝 Corpus de texto actualizado en '{os.path.join(output_folder, corpus_file)}' "
+              f"({written} posts escritos, {kept} sin cambios)")
+
+        if word_counts:
+            # La nube se dibuja junto con los demás gráficos, a partir de las frecuencias de palabras
+            wordcloud_path = os.path.join(output_folder, f"wordcloud_discurso_{candidate}.png")
+            charts.append(wordcloud_spec(word_counts, wordcloud_path))
         else:
             print("  ⚠️ No hay suficiente texto limpio para generar una nube de palabras.")
 
 
-        # 2. Cálculo de Métricas de Relevancia (Engagement)
-        df_videos = df_candidate[df_candidate['media_type'] == 2].copy()
-        
-        # Asegurar que play_count es numérico y no NaN
-        df_videos['play_count'] = pd.to_numeric(df_videos['play_count'], errors='coerce').fillna(0)
-        
-        total_video_reach = df_videos['play_count'].sum()
-        
-        # Calcular tasa de interacción por reproducción promedio
-        if not df_videos.empty and total_video_reach > 0:
-            df_videos['interaction_rate'] = (df_videos['likes_count'] + df_videos['comments_count']) / df_videos['play_count']
-            avg_interaction_rate = df_videos['interaction_rate'].replace([np.inf, -np.inf], np.nan).mean()
-            total_interactions = total_video_reach * avg_interaction_rate
-        else:
-            avg_interaction_rate = 0
-            total_interactions = 0
-
+        # 2. Métricas de Relevancia (Engagement), ya calculadas para todos los perfiles
+        total_video_reach = metrics['reach']
+        avg_interaction_rate = metrics['rate']
+        total_interactions = metrics['total_interactions']
 
-        # 3. Puntuación de Impacto por Post (para Top 5)
-        df_candidate['impact_score'] = 1 + (df_candidate['likes_count'].fillna(0) * 0.1) + (df_candidate['comments_count'].fillna(0) * 0.25)
-        top_5_posts = df_candidate.nlargest(5, 'impact_score')
+        # 3. Top 5 por Puntuación de Impacto ('impact_score': 1 + likes * 0.1 + comentarios * 0.25)
+        top_5_posts = top_posts[candidate]
 
         comparative_results[candidate] = {
             'reach': total_video_reach,
@@ -155,51 +155,44 @@ def run_discourse_analysis(df, candidates, output_folder):
             f_report.write(f"Tasa de Interacción por Reproducción Promedio: {avg_interaction_rate:.2%}\n")
             f_report.write(f"Interacciones Totales Estimadas en Videos: {total_interactions:,.0f}\n\n")
             f_report.write("== TOP 5 PUBLICACIONES DE MAYOR IMPACTO ==\n")
-            for i, (_, post) in enumerate(top_5_posts.iterrows()):
-                f_report.write(f"\n--- {i+1}. Post con Impacto: {post['impact_score']:.2f} ---\n")
-                f_report.write(f"URL: {post['post_url']}\n")
-                f_report.write(f"Texto: {post['post_caption']}\n")
+            for i, (impact_score, post_url, post_caption) in enumerate(
+                    top_5_posts[['impact_score', 'post_url', 'post_caption']].itertuples(index=False)):
+                f_report.write(f"\n--- {i+1}. Post con Impacto: {impact_score:.2f} ---\n")
+                f_report.write(f"URL: {post_url}\n")
+                f_report.write(f"Texto: {post_caption}\n")
         print(f"  📄 Reporte individual guardado en '{report_filepath}'")
 
+    corpus_store.close()
+
     # --- 5. SECCIÓN DE GRÁFICOS COMPARATIVOS ---
     if not comparative_results:
         print("\n⚠️ No hay datos comparables para generar gráficos.")
-        return
+        return charts
         
     df_comp = pd.DataFrame.from_dict(comparative_results, orient='index')
     df_comp = df_comp.fillna(0) # Asegurar 0s para gráficos
 
-    # Gráfico 1: Alcance Real
-    ax_reach = df_comp.sort_values('reach', ascending=False).plot(kind='bar', y='reach', figsize=(12, 7), legend=None,
-                                                                   title='Alcance Real Total de Videos (Suma de Reproducciones)')
-    plt.ylabel("Total de Reproducciones")
-    add_labels_to_bars(ax_reach)
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_folder, "comparativo_alcance_videos.png"))
-    plt.close()
-
-    # Gráfico 2: Tasa de Interacción (Eficiencia)
-    ax_rate = df_comp.sort_values('rate', ascending=False).plot(kind='bar', y='rate', figsize=(12, 7), legend=None,
-                                                                title='Tasa de Interacción por Reproducción (Eficiencia)')
-    plt.ylabel("Interacciones por Reproducción (%)")
-    plt.gca().yaxis.set_major_formatter(plt.FuncFormatter('{:.2%}'.format))
-    add_labels_to_bars(ax_rate, is_percentage=True)
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_folder, "comparativo_eficiencia_videos.png"))
-    plt.close()
-
-    # Gráfico 3: Interacciones Totales Estimadas
-    ax_interactions = df_comp.sort_values('total_interactions', ascending=False).plot(kind='bar', y='total_interactions', figsize=(12, 7), legend=None,
-                                                                                      title='Interacciones Totales Estimadas en Videos')
-    plt.ylabel("Número Total de Interacciones (Likes + Comentarios)")
-    add_labels_to_bars(ax_interactions)
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_folder, "comparativo_interacciones_totales_videos.png"))
-    plt.close()
-
-    print("\n📊 Gráficos comparativos guardados.")
     print(f"\n✅ Análisis para '{output_folder}' completado.")
 
+    # Gráficos comparativos: se describen aquí y se dibujan en paralelo con render_charts
+    return charts + [
+        # Gráfico 1: Alcance Real
+        {'kind': 'ranked_bar', 'data': df_comp, 'y': 'reach', 'figsize': (12, 7),
+         'title': 'Alcance Real Total de Videos (Suma de Reproducciones)',
+         'ylabel': "Total de Reproducciones",
+         'output': os.path.join(output_folder, "comparativo_alcance_videos.png")},
+        # Gráfico 2: Tasa de Interacción (Eficiencia)
+        {'kind': 'ranked_bar', 'data': df_comp, 'y': 'rate', 'figsize': (12, 7), 'percent_axis': True,
+         'title': 'Tasa de Interacción por Reproducción (Eficiencia)',
+         'ylabel': "Interacciones por Reproducción (%)",
+         'output': os.path.join(output_folder, "comparativo_eficiencia_videos.png")},
+        # Gráfico 3: Interacciones Totales Estimadas
+        {'kind': 'ranked_bar', 'data': df_comp, 'y': 'total_interactions', 'figsize': (12, 7),
+         'title': 'Interacciones Totales Estimadas en Videos',
+         'ylabel': "Número Total de Interacciones (Likes + Comentarios)",
+         'output': os.path.join(output_folder, "comparativo_interacciones_totales_videos.png")},
+    ]
+
 
 # --- FUNCIÓN PRINCIPAL ORQUESTADORA ---
 
@@ -212,8 +205,8 @@ def main_discourse_analysis(input_filepath=MAIN_DATA_FILE):
 
     # --- Carga y Preparación Inicial de Datos ---
     try:
-        # Forzar el post_id/shortcode a string para evitar errores de tipo en la deduplicación
-        df_full = pd.read_csv(input_filepath, dtype={'post_id': str, 'post_shortcode': str})
+        # Carga tipada desde el almacenamiento columnar, solo con las columnas necesarias
+        df_full = load_posts(columns=ANALYSIS_COLUMNS, db_file=input_filepath)
     except FileNotFoundError:
         print(f"❌ Error: No se encontró el archivo de entrada en '{input_filepath}'.")
         return
@@ -225,24 +218,23 @@ def main_discourse_analysis(input_filepath=MAIN_DATA_FILE):
         print(f"❌ Error: No se encontró el archivo de perfiles en '{PROFILES_FILE}'.")
         return
 
-    # 1. Limpieza de tipos de datos
-    df_full['post_created_at_str'] = pd.to_datetime(df_full['post_created_at_str'], errors='coerce')
-        
-    numeric_cols = ['followers_count', 'likes_count', 'comments_count', 'play_count', 'media_type']
-    for col in numeric_cols:
-          if col in df_full.columns:
-            df_full[col] = pd.to_numeric(df_full[col], errors='coerce')
-          else:
-            print(f"Advertencia: Falta la columna '{col}'. Se continuará con 0/NaN.")
-            if col == 'play_count': df_full[col] = np.nan 
-            elif col in ['likes_count', 'comments_count', 'followers_count']: df_full[col] = 0 
-            
+    # Métricas de engagement precalculadas (interaction_rate, impact_score) en una sola pasada
+    add_engagement_metrics(df_full, ['interaction_rate', 'impact_score'], db_file=input_filepath)
+
     # Reemplazar ceros con NaN en denominadores para evitar divisiones por cero
     df_full['followers_count'] = df_full['followers_count'].replace(0, np.nan)
     df_full['play_count'] = df_full['play_count'].replace(0, np.nan)
 
+    # --- ÍNDICE DE TOKENS: solo se tokenizan los posts nuevos o con texto nuevo ---
+    token_index = TokenIndex()
+    tokenized = token_index.update(df_full['post_shortcode'], post_full_text(df_full))
+    print(f"🔤 Índice de tokens actualizado: {tokenized} posts tokenizados, {len(df_full) - tokenized} sin cambios.")
+
     # --- ANÁLISIS 1: COMPLETO (HISTORIAL) ---
-    run_discourse_analysis(df_full.copy(), candidates, output_folder=OUTPUT_FOLDER_FULL)
+    charts = run_discourse_analysis(df_full.copy(), candidates, OUTPUT_FOLDER_FULL, token_index)
+
+    # Términos distintivos (TF-IDF y log-odds) por perfil y por mes de todo el historial
+    write_distinctive_terms(token_index, df_full, OUTPUT_FOLDER_FULL)
     
 
     # --- ANÁLISIS 2: MENSUAL (MES PRESENTE) ---
@@ -267,7 +259,7 @@ def main_discourse_analysis(input_filepath=MAIN_DATA_FILE):
         followers_map = df_followers_latest.set_index('username')['followers_count'].dropna().to_dict()
         
         # 2. Inyectar el último conteo de seguidores conocido en el DataFrame Mensual
-        df_monthly['followers_count'] = df_monthly['username'].map(followers_map)
+        df_monthly['followers_count'] = df_monthly['username'].astype(object).map(followers_map)
         # Reemplazar ceros con NaN nuevamente en el df_monthly
         df_monthly['followers_count'] = df_monthly['followers_count'].replace(0, np.nan) 
     else:
@@ -276,9 +268,14 @@ def main_discourse_analysis(input_filepath=MAIN_DATA_FILE):
 
     # Ejecutar el análisis solo si hay datos en el rango mensual
     if not df_monthly.empty:
-        run_discourse_analysis(df_monthly, candidates, output_folder=output_folder_monthly)
+        charts += run_discourse_analysis(df_monthly, candidates, output_folder_monthly, token_index)
     else:
         print(f"\n--- No se encontraron publicaciones en el rango mensual ({start_date.strftime('%Y-%m-%d')} en adelante). Se omite el análisis para '{output_folder_monthly}'. ---")
+    token_index.close()
+
+    # Las nubes de palabras y los gráficos comparativos de ambos análisis se dibujan juntos, en paralelo
+    print("\n--- Generando nubes de palabras y gráficos comparativos ---")
+    render_charts(charts)
 
     print("\n🎉 Proceso dual de análisis completado.")
 
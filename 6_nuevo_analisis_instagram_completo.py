@@ -2,9 +2,10 @@ import pandas as pd
 import numpy as np
 import os
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-import seaborn as sns
 import warnings
+from chart_renderer import render_charts
+from columnar_store import load_posts
+from engagement_metrics import add_engagement_metrics
 
 # Configuración inicial para evitar warnings de visualización
 warnings.filterwarnings("ignore")
@@ -14,7 +15,7 @@ warnings.filterwarnings("ignore")
 # =========================================================================
 
 # --- Variables de Entorno ---
-INPUT_FILE = "base_de_datos_instagram.csv"
+INPUT_FILE = "base_de_datos_instagram.db"
 TODAY = datetime.now()
 
 # La carpeta de salida incluye la fecha de ejecución 
@@ -35,19 +36,20 @@ def setup_environment(input_file: str) -> pd.DataFrame or None:
         print(f"Carpeta de salida creada: '{FOLDER_NAME}'")
 
     try:
-        df = pd.read_csv(input_file)
+        # Solo se carga la partición del mes analizado (poda por mes en el almacenamiento columnar)
+        df = load_posts(months=[CURRENT_MONTH_YEAR], db_file=input_file)
     except FileNotFoundError:
         print(f"❌ Error: El archivo '{input_file}' no se encontró. Asegúrate de que está en la misma carpeta.")
         return None
 
-    # Limpieza: Convertir fecha y columnas de conteo a tipos adecuados
-    df['post_created_at_dt'] = pd.to_datetime(df['post_created_at_str'], errors='coerce')
+    # Las fechas y conteos ya vienen tipados; solo se rellenan los conteos faltantes
+    df['post_created_at_dt'] = df['post_created_at_str']
     
     # Columnas de conteo a tipo numérico (incluyendo play_count y media_type si es numérico)
     count_columns = ['followers_count', 'likes_count', 'comments_count', 'play_count', 'media_type']
     for col in count_columns:
         # Rellenar NaNs con 0 y convertir a entero (necesario para cálculos)
-        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
+        df[col] = df[col].fillna(0).astype(int)
 
     # Filtrar registros que no tienen una fecha válida (NaT)
     df = df[df['post_created_at_dt'].notna()].copy()
@@ -97,7 +99,7 @@ def step_2_monthly_summary(df: pd.DataFrame):
     }
 
     # 2. Aplicar la agregación
-    df_summary = df.groupby('username').agg(aggregation_functions).reset_index()
+    df_summary = df.groupby('username', observed=True).agg(aggregation_functions).reset_index()
     df_summary = df_summary.rename(columns={'post_id': 'posts_publicados_mes', 'followers_count': 'max_followers_mes'})
     
     # 3. Calcular la Tasa de Engagement por Seguidores (ERF)
@@ -125,28 +127,12 @@ def step_3_4_icp_top_posts(df: pd.DataFrame) -> pd.DataFrame:
     
     print("\n--- PASOS 3 y 4: Índice de Compromiso Ponderado (IC-P) y Top Posts ---")
     
-    # 1. Cálculo de las interacciones ponderadas (Numerador del IC-P)
-    # FÓRMULA: Numerador Ponderado = (3 * Comentarios) + (1 * Likes)
-    df['weighted_interactions'] = (3 * df['comments_count']) + (1 * df['likes_count'])
-    
-    # 2. Determinar el Denominador Lógico (Vistas o Seguidores)
-    # 🛑 FIX: Usamos la comparación numérica directa para media_type. 
-    # media_type == 2 es el código para VIDEO en la mayoría de implementaciones de Instagram.
-    df['denominator'] = np.where(
-        # Condición: Si es un Video (media_type == 2) Y tiene vistas (>0)
-        (df['media_type'] == 2) & (df['play_count'] > 0),
-        df['play_count'],
-        # Falso: Es imagen, carrusel o video sin vistas -> Usar Followers
-        df['followers_count']
-    )
-    
-    # 3. Cálculo del Índice de Compromiso Ponderado (IC-P)
-    # FÓRMULA: IC-P = (Interacciones Ponderadas / Denominador Lógico) * 100
-    df['IC_P'] = np.where(
-        df['denominator'] > 0,
-        (df['weighted_interactions'] / df['denominator']) * 100,
-        0
-    )
+    # Métricas precalculadas en una sola pasada por engagement_metrics.py (en caché por versión de los datos):
+    add_engagement_metrics(df, ['weighted_interactions', 'icp_denominator', 'IC_P', 'ERV_Comments', 'ERF_Likes'],
+                           db_file=INPUT_FILE)
+    # - weighted_interactions = (3 * Comentarios) + (1 * Likes)
+    # - icp_denominator = play_count si es video (media_type == 2) con vistas; si no, followers_count
+    # - IC_P = (Interacciones Ponderadas / Denominador Lógico) * 100 (0 si el denominador es 0)
     
     # --- PASO 4.1: Generar el Top 3 por IC-P ---
     df_top_3 = df.sort_values(by='IC_P', ascending=False).head(3)
@@ -162,10 +148,8 @@ def step_3_4_icp_top_posts(df: pd.DataFrame) -> pd.DataFrame:
 
     # --- PASO 4.2: Generar Ratios Promedio por Perfil ---
     
-    df['ERV_Comments'] = np.where(df['play_count'] > 0, (df['comments_count'] / df['play_count']) * 100, 0)
-    df['ERF_Likes'] = np.where(df['followers_count'] > 0, (df['likes_count'] / df['followers_count']) * 100, 0)
-    
-    df_ratios = df.groupby('username')[['IC_P', 'ERV_Comments', 'ERF_Likes']].mean().reset_index()
+    # ERV_Comments (comentarios / vistas) y ERF_Likes (likes / seguidores) también vienen precalculadas
+    df_ratios = df.groupby('username', observed=True)[['IC_P', 'ERV_Comments', 'ERF_Likes']].mean().reset_index()
     df_ratios = df_ratios.sort_values(by='IC_P', ascending=False)
     
     output_path_ratios = os.path.join(FOLDER_NAME, "04_profile_engagement_ratios_ig.csv")
@@ -178,13 +162,13 @@ def step_3_4_icp_top_posts(df: pd.DataFrame) -> pd.DataFrame:
 # 4. PASO 5: FRECUENCIA DIARIA (TENDENCIA)
 # =========================================================================
 
-def step_5_daily_frequency(df: pd.DataFrame):
-    """Calcula y grafica la cantidad de posts diarios por perfil."""
+def step_5_daily_frequency(df: pd.DataFrame) -> list:
+    """Calcula la cantidad de posts diarios por perfil. Retorna la especificación de su gráfico."""
     
     print("\n--- PASO 5: Frecuencia de Publicación Diaria (Tendencia) ---")
     
     # 1. Contar posts diarios
-    df_daily_posts = df.groupby(['date_only', 'username']).agg(
+    df_daily_posts = df.groupby(['date_only', 'username'], observed=True).agg(
         posts_count=('post_id', 'count')
     ).reset_index()
 
@@ -198,29 +182,21 @@ def step_5_daily_frequency(df: pd.DataFrame):
     df_plot = df_daily_posts.copy()
     df_plot['date_only'] = pd.to_datetime(df_plot['date_only'])
     
-    plt.figure(figsize=(14, 6))
-    sns.lineplot(
-        data=df_plot, x='date_only', y='posts_count', hue='username',
-        marker='o', dashes=False, palette='Spectral'
-    )
-    plt.title('Posts Diarios por Perfil (Tendencia Mensual - Instagram)', fontsize=16)
-    plt.xlabel('Fecha', fontsize=14)
-    plt.ylabel('Cantidad de Posts', fontsize=14)
-    plt.xticks(rotation=45, ha='right')
-    plt.legend(title='Perfil', bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.tight_layout()
-
-    output_path_png = os.path.join(FOLDER_NAME, "05_daily_post_line_chart_ig.png")
-    plt.savefig(output_path_png)
-    plt.close()
-    print(f"Gráfico de Líneas guardado en: {output_path_png}")
+    return [{
+        'kind': 'line', 'data': df_plot, 'x': 'date_only', 'y': 'posts_count', 'hue': 'username',
+        'palette': 'Spectral', 'figsize': (14, 6),
+        'title': 'Posts Diarios por Perfil (Tendencia Mensual - Instagram)',
+        'xlabel': 'Fecha', 'ylabel': 'Cantidad de Posts',
+        'legend': {'title': 'Perfil', 'bbox_to_anchor': (1.05, 1), 'loc': 'upper left'},
+        'output': os.path.join(FOLDER_NAME, "05_daily_post_line_chart_ig.png"),
+    }]
 
 # =========================================================================
 # 5. PASO 6: LONGITUD DE CONTENIDO
 # =========================================================================
 
-def step_6_content_length(df: pd.DataFrame):
-    """Calcula el promedio de longitud de la descripción (caption) y transcripción."""
+def step_6_content_length(df: pd.DataFrame) -> list:
+    """Calcula el promedio de longitud de la descripción (caption) y transcripción. Retorna la especificación de su gráfico."""
     
     print("\n--- PASO 6: Análisis de Longitud de Contenido ---")
     
@@ -229,7 +205,7 @@ def step_6_content_length(df: pd.DataFrame):
     df['transcript_length'] = df['post_transcript'].fillna('').astype(str).apply(len)
 
     # 2. Agrupar por perfil y calcular el promedio
-    df_content_length = df.groupby('username')[['caption_length', 'transcript_length']].mean().reset_index()
+    df_content_length = df.groupby('username', observed=True)[['caption_length', 'transcript_length']].mean().reset_index()
     df_content_length.columns = ['username', 'avg_caption_length', 'avg_transcript_length']
 
     # 3. Guardar la tabla (CSV)
@@ -242,34 +218,27 @@ def step_6_content_length(df: pd.DataFrame):
         id_vars='username', var_name='Type', value_name='Average_Length'
     )
 
-    plt.figure(figsize=(14, 8))
-    sns.barplot(
-        data=df_length_plot, x='username', y='Average_Length', hue='Type', palette='Pastel1'
-    )
-    plt.title('Longitud Promedio de Contenido por Perfil (Instagram)', fontsize=16)
-    plt.xlabel('Perfil', fontsize=14)
-    plt.ylabel('Longitud Promedio de Caracteres', fontsize=14)
-    plt.xticks(rotation=45, ha='right')
-    plt.legend(title='Tipo de Contenido', loc='upper right')
-    plt.tight_layout()
-
-    output_png = os.path.join(FOLDER_NAME, "06_content_length_bar_chart_ig.png")
-    plt.savefig(output_png)
-    plt.close()
-    print(f"Gráfico de Barras de longitud guardado en: {output_png}")
+    return [{
+        'kind': 'bar', 'data': df_length_plot, 'x': 'username', 'y': 'Average_Length', 'hue': 'Type',
+        'palette': 'Pastel1', 'figsize': (14, 8),
+        'title': 'Longitud Promedio de Contenido por Perfil (Instagram)',
+        'xlabel': 'Perfil', 'ylabel': 'Longitud Promedio de Caracteres',
+        'legend': {'title': 'Tipo de Contenido', 'loc': 'upper right'},
+        'output': os.path.join(FOLDER_NAME, "06_content_length_bar_chart_ig.png"),
+    }]
 
 
 # =========================================================================
 # 6. PASO 7: OPORTUNIDAD (HORA Y DÍA ÓPTIMOS)
 # =========================================================================
 
-def step_7_optimal_time(df: pd.DataFrame):
-    """Calcula y grafica la hora y día óptimos de publicación (usando play_count promedio)."""
+def step_7_optimal_time(df: pd.DataFrame) -> list:
+    """Calcula la hora y día óptimos de publicación (usando play_count promedio). Retorna la especificación de sus gráficos."""
     
     print("\n--- PASO 7: Análisis de Oportunidad (Hora y Día Óptimos) ---")
 
     # 1. Hora Óptima
-    df_optimal_hour = df.groupby(['hour', 'username']).agg(
+    df_optimal_hour = df.groupby(['hour', 'username'], observed=True).agg(
         avg_success_metric=('play_count', 'mean') # Métrica de éxito: Vistas promedio (Play Count)
     ).reset_index()
 
@@ -278,24 +247,18 @@ def step_7_optimal_time(df: pd.DataFrame):
     print(f"Tabla de hora óptima guardada en: {output_path_hour}")
 
     # Gráfico de Líneas para Hora Óptima
-    plt.figure(figsize=(14, 6))
-    sns.lineplot(
-        data=df_optimal_hour, x='hour', y='avg_success_metric', hue='username',
-        marker='o', dashes=False, palette='Spectral'
-    )
-    plt.title('Vistas Promedio por Hora de Publicación (Instagram)', fontsize=16)
-    plt.xlabel('Hora del Día (0-23)', fontsize=14)
-    plt.ylabel('Vistas Promedio (Play Count)', fontsize=14)
-    plt.xticks(range(0, 24))
-    plt.legend(title='Perfil', bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.tight_layout()
-    output_path_png = os.path.join(FOLDER_NAME, "07_optimal_time_hour_line_chart_ig.png")
-    plt.savefig(output_path_png)
-    plt.close()
-    print(f"Gráfico de Líneas de hora óptima guardado en: {output_path_png}")
+    hour_chart = {
+        'kind': 'line', 'data': df_optimal_hour, 'x': 'hour', 'y': 'avg_success_metric', 'hue': 'username',
+        'palette': 'Spectral', 'figsize': (14, 6),
+        'title': 'Vistas Promedio por Hora de Publicación (Instagram)',
+        'xlabel': 'Hora del Día (0-23)', 'ylabel': 'Vistas Promedio (Play Count)',
+        'xticks': list(range(0, 24)),
+        'legend': {'title': 'Perfil', 'bbox_to_anchor': (1.05, 1), 'loc': 'upper left'},
+        'output': os.path.join(FOLDER_NAME, "07_optimal_time_hour_line_chart_ig.png"),
+    }
     
     # 2. Día Óptimo
-    df_optimal_day = df.groupby(['day_of_week', 'username']).agg(
+    df_optimal_day = df.groupby(['day_of_week', 'username'], observed=True).agg(
         avg_success_metric=('play_count', 'mean')
     ).reset_index()
     
@@ -307,30 +270,23 @@ def step_7_optimal_time(df: pd.DataFrame):
     print(f"Tabla de día óptimo guardada en: {output_path_day}")
 
     # Gráfico de Barras para Día Óptimo
-    plt.figure(figsize=(14, 6))
-    sns.barplot(
-        data=df_optimal_day, x='day_name', y='avg_success_metric', hue='username',
-        palette='Spectral', order=day_map.values()
-    )
-    plt.title('Vistas Promedio por Día de la Semana de Publicación (Instagram)', fontsize=16)
-    plt.xlabel('Día de la Semana', fontsize=14)
-    plt.ylabel('Vistas Promedio (Play Count)', fontsize=14)
-    plt.xticks(rotation=45, ha='right')
-    plt.legend(title='Perfil', bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.tight_layout()
-
-    output_path_png = os.path.join(FOLDER_NAME, "07_optimal_time_day_bar_chart_ig.png")
-    plt.savefig(output_path_png)
-    plt.close()
-    print(f"Gráfico de Barras de día óptimo guardado en: {output_path_png}")
+    day_chart = {
+        'kind': 'bar', 'data': df_optimal_day, 'x': 'day_name', 'y': 'avg_success_metric', 'hue': 'username',
+        'palette': 'Spectral', 'order': list(day_map.values()), 'figsize': (14, 6),
+        'title': 'Vistas Promedio por Día de la Semana de Publicación (Instagram)',
+        'xlabel': 'Día de la Semana', 'ylabel': 'Vistas Promedio (Play Count)',
+        'legend': {'title': 'Perfil', 'bbox_to_anchor': (1.05, 1), 'loc': 'upper left'},
+        'output': os.path.join(FOLDER_NAME, "07_optimal_time_day_bar_chart_ig.png"),
+    }
+    return [hour_chart, day_chart]
 
 
 # =========================================================================
 # 7. PASO 8: DESEMPEÑO POR FORMATO (MEDIA TYPE)
 # =========================================================================
 
-def step_8_media_type_analysis(df: pd.DataFrame):
-    """Calcula y grafica el IC-P promedio por tipo de contenido (media_type)."""
+def step_8_media_type_analysis(df: pd.DataFrame) -> list:
+    """Calcula el IC-P promedio por tipo de contenido (media_type). Retorna la especificación de su gráfico."""
     
     print("\n--- PASO 8: Desempeño por Formato (Media Type) ---")
 
@@ -346,7 +302,7 @@ def step_8_media_type_analysis(df: pd.DataFrame):
     df['media_type_clean'] = df['media_type'].map(media_map).fillna('Otro/Desconocido')
     
     # 2. Agrupar por perfil y tipo de medio, y calcular el IC-P promedio
-    df_media_type = df.groupby(['username', 'media_type_clean']).agg(
+    df_media_type = df.groupby(['username', 'media_type_clean'], observed=True).agg(
         avg_icp=('IC_P', 'mean')
     ).reset_index()
 
@@ -356,23 +312,16 @@ def step_8_media_type_analysis(df: pd.DataFrame):
     print(f"Tabla de IC-P por formato guardada en: {output_path_csv}")
 
     # 4. Generar Gráfico de Barras Agrupadas
-    plt.figure(figsize=(14, 8))
-    sns.barplot(
-        data=df_media_type, x='username', y='avg_icp', hue='media_type_clean',
-        palette='magma' # Paleta distinguible para formatos
-    )
-    plt.title('IC-P Promedio por Perfil y Tipo de Formato (Instagram)', fontsize=16)
-    plt.xlabel('Perfil', fontsize=14)
-    plt.ylabel('Índice de Compromiso Ponderado Promedio (IC-P)', fontsize=14)
-    plt.xticks(rotation=45, ha='right')
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.legend(title='Tipo de Formato', bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.tight_layout()
-
-    output_path_png = os.path.join(FOLDER_NAME, "08_media_type_bar_chart_ig.png")
-    plt.savefig(output_path_png)
-    plt.close()
-    print(f"Gráfico de Barras de formatos guardado en: {output_path_png}")
+    return [{
+        'kind': 'bar', 'data': df_media_type, 'x': 'username', 'y': 'avg_icp', 'hue': 'media_type_clean',
+        'palette': 'magma',  # Paleta distinguible para formatos
+        'figsize': (14, 8),
+        'title': 'IC-P Promedio por Perfil y Tipo de Formato (Instagram)',
+        'xlabel': 'Perfil', 'ylabel': 'Índice de Compromiso Ponderado Promedio (IC-P)',
+        'grid_y': True,
+        'legend': {'title': 'Tipo de Formato', 'bbox_to_anchor': (1.05, 1), 'loc': 'upper left'},
+        'output': os.path.join(FOLDER_NAME, "08_media_type_bar_chart_ig.png"),
+    }]
 
 
 # =========================================================================
@@ -389,10 +338,15 @@ def main():
         if len(df_filtered) > 0:
             step_2_monthly_summary(df_filtered)
             df_with_icp = step_3_4_icp_top_posts(df_filtered)
-            step_5_daily_frequency(df_with_icp)
-            step_6_content_length(df_with_icp)
-            step_7_optimal_time(df_with_icp)
-            step_8_media_type_analysis(df_with_icp)
+            # Los pasos 5 a 8 describen sus gráficos; se dibujan todos juntos en paralelo
+            charts = []
+            charts += step_5_daily_frequency(df_with_icp)
+            charts += step_6_content_length(df_with_icp)
+            charts += step_7_optimal_time(df_with_icp)
+            charts += step_8_media_type_analysis(df_with_icp)
+
+            print("\n--- Generando gráficos de los pasos 5 a 8 ---")
+            render_charts(charts)
             
             print("\n🎉 Proceso de análisis de métricas de INSTAGRAM finalizado. Revisa la carpeta:", FOLDER_NAME)
         else:
@@ -1,76 +1,89 @@
-import pandas as pd
+import numpy as np
 import os
-import re
 import glob
+from columnar_store import load_posts
+from mention_matcher import MentionMatcher
+from network_edges import build_scan_text, impact_weights, edges_from_matches, concat_edges
+from mention_ingestion import scan_mention_files
+from fingerprints import post_fingerprints, file_fingerprint
+from network_edge_index import NetworkEdgeIndex, alias_version
 
 # --- CONFIGURACIÓN ---
-MAIN_DATA_FILE = "base_de_datos_instagram.csv"
+MAIN_DATA_FILE = "base_de_datos_instagram.db"
 PROFILES_FILE = "perfiles_instagram.txt"
 MENTIONS_FOLDER = "menciones"
 OUTPUT_CSV_RAW_FILE = "network_data_raw.csv"
 OUTPUT_CSV_CONSOLIDATED_FILE = "network_data_consolidated.csv"
+CAPTION_COLUMNS = ['post_caption', 'usertags']  # Columnas de texto donde se buscan menciones
+INDEX_SCOPE = "9"  # Espacio del índice incremental de aristas para este generador
+INDEX_RULES = "v1|caption+usertags|solo-autores-candidatos"
+FINGERPRINT_COLUMNS = ['username', 'likes_count', 'comments_count'] + CAPTION_COLUMNS
 
 # --- FUNCIONES DE ANÁLISIS ---
 
-def calculate_impact_weight(likes, comments):
-    """Calcula el peso de una interacción basado en el engagement."""
-    likes = float(likes) if pd.notna(likes) else 0
-    comments = float(comments) if pd.notna(comments) else 0
-    return 1 + (likes * 0.1) + (comments * 0.25)
-
-def analyze_direct_interactions(main_df, candidates):
-    """Parte 1: Extrae interacciones directas del archivo principal."""
-    print("🔎 Parte 1: Analizando interacciones directas entre candidatos...")
-    connections = []
-    for _, row in main_df.iterrows():
-        author = row['username']
-        if author not in candidates:
-            continue
-
-        text_to_scan = f"{row.get('post_caption', '')} {row.get('usertags', '')}"
-
-        for target_candidate in candidates:
-            if author == target_candidate:
-                continue
-
-            if re.search(f'@{re.escape(target_candidate)}\\b|\\b{re.escape(target_candidate)}\\b', str(text_to_scan), re.IGNORECASE):
-                weight = calculate_impact_weight(row['likes_count'], row['comments_count'])
-                connections.append({'source': author, 'target': target_candidate, 'weight': weight})
-
-    print(f"  ✅ Se encontraron {len(connections)} interacciones directas.")
-    return connections
-
-def analyze_external_mentions(mentions_folder, candidates):
-    """Parte 2: Extrae co-menciones de los archivos de la carpeta 'menciones'."""
-    print("\n🔎 Parte 2: Analizando conversaciones externas (co-menciones)...")
-    connections = []
-    mention_files = glob.glob(os.path.join(mentions_folder, '*.csv'))
-
-    for file_path in mention_files:
-        try:
-            df_mention = pd.read_csv(file_path)
-            main_candidate_mentioned = os.path.basename(file_path).split('_')[-1].replace('.csv', '')
+def analyze_direct_interactions(main_df, candidates, unit_keys):
+    """Parte 1: Extrae interacciones directas de los posts nuevos o cambiados (aristas con su 'key')."""
+    print(f"🔎 Parte 1: Analizando interacciones directas entre candidatos en {len(main_df)} posts nuevos o cambiados...")
+    # Un solo autómata con todos los candidatos: un recorrido por texto
+    matcher = MentionMatcher({candidate: candidate for candidate in candidates})
 
-            df_mention = df_mention[df_mention['username'] != main_candidate_mentioned]
+    texts = build_scan_text(main_df, CAPTION_COLUMNS)
+    weights = impact_weights(main_df)
+    authors = main_df['username'].astype(object).to_numpy()
 
-            for _, row in df_mention.iterrows():
-                author = row['username']
-                text_to_scan = f"{row.get('post_caption', '')} {row.get('usertags', '')}"
-
-                mentioned_in_post = set()
-                for candidate in candidates:
-                    if re.search(f'@{re.escape(candidate)}\\b|\\b{re.escape(candidate)}\\b', str(text_to_scan), re.IGNORECASE):
-                        mentioned_in_post.add(candidate)
-
-                if main_candidate_mentioned in mentioned_in_post and len(mentioned_in_post) > 1:
-                    weight = calculate_impact_weight(row['likes_count'], row['comments_count'])
-                    for mentioned_candidate in mentioned_in_post:
-                        connections.append({'source': author, 'target': mentioned_candidate, 'weight': weight})
-        except Exception as e:
-            print(f"  ⚠️  Error procesando el archivo {file_path}: {e}")
-
-    print(f"  ✅ Se encontraron {len(connections)} conexiones en menciones de terceros.")
-    return connections
+    row_indices, targets = [], []
+    for i, (author, text_to_scan) in enumerate(zip(authors, texts)):
+        if author not in candidates:
+            continue
+        for target_candidate in matcher.find_targets(text_to_scan) - {author}:
+            row_indices.append(i)
+            targets.append(target_candidate)
+
+    edges = edges_from_matches(row_indices, targets, authors, weights, keys=unit_keys)
+    print(f"  ✅ Se encontraron {len(edges['weight'])} interacciones directas.")
+    return edges
+
+def scan_mention_chunk(df_mention, matcher, main_candidate_mentioned):
+    """Regla de co-mención sobre un bloque de un archivo de menciones (se ejecuta en los procesos)."""
+    df_mention = df_mention[df_mention['username'] != main_candidate_mentioned]
+
+    texts = build_scan_text(df_mention, CAPTION_COLUMNS)
+    weights = impact_weights(df_mention)
+    authors = df_mention['username'].astype(object).to_numpy()
+
+    row_indices, targets = [], []
+    for i, (author, text_to_scan) in enumerate(zip(authors, texts)):
+        mentioned_in_post = matcher.find_targets(text_to_scan)
+
+        if main_candidate_mentioned in mentioned_in_post and len(mentioned_in_post) > 1:
+            for mentioned_candidate in mentioned_in_post:
+                row_indices.append(i)
+                targets.append(mentioned_candidate)
+
+    return edges_from_matches(row_indices, targets, authors, weights)
+
+def analyze_external_mentions(file_units, candidates):
+    """
+    Parte 2: Extrae co-menciones de los archivos nuevos o cambiados de la carpeta 'menciones'.
+    Los archivos se leen por bloques y se reparten entre procesos (mention_ingestion.py).
+
+    Args:
+        file_units (dict): {ruta del archivo de menciones: unidad del índice ('file:<nombre>')}.
+
+    Returns:
+        tuple: (aristas con 'key', sumadas por archivo, y unidades procesadas sin error)
+    """
+    print(f"\n🔎 Parte 2: Analizando conversaciones externas (co-menciones) en {len(file_units)} archivos...")
+    needed_columns = set(CAPTION_COLUMNS) | {'username', 'likes_count', 'comments_count'}
+    files = [(file_path, unit_key, os.path.basename(file_path).split('_')[-1].replace('.csv', ''))
+             for file_path, unit_key in file_units.items()]
+
+    edge_sets, processed_units = scan_mention_files(files, scan_mention_chunk,
+                                                    {candidate: candidate for candidate in candidates},
+                                                    needed_columns)
+    edges = concat_edges(*edge_sets)
+    print(f"  ✅ Se encontraron {len(edges['weight'])} conexiones (sumadas por archivo) en menciones de terceros.")
+    return edges, processed_units
 
 # --- FUNCIÓN PRINCIPAL ---
 
@@ -79,24 +92,49 @@ def main():
     print("🚀 Iniciando la generación de datos de red...")
 
     try:
-        main_df = pd.read_csv(MAIN_DATA_FILE)
+        main_df = load_posts(columns=['post_shortcode'] + FINGERPRINT_COLUMNS, db_file=MAIN_DATA_FILE)
         with open(PROFILES_FILE, 'r', encoding='utf-8') as f:
             candidates = {line.strip() for line in f if line.strip()}
     except FileNotFoundError as e:
         print(f"❌ Error: No se pudo encontrar un archivo necesario: {e}")
         return
 
-    direct_connections = analyze_direct_interactions(main_df, candidates)
-    external_connections = analyze_external_mentions(MENTIONS_FOLDER, candidates)
-    all_connections = direct_connections + external_connections
-
-    if not all_connections:
+    # Índice incremental: si cambió la lista de candidatos se reescanea todo
+    index = NetworkEdgeIndex(INDEX_SCOPE, alias_version({c: c for c in candidates}, INDEX_RULES))
+    if index.rebuilt:
+        print("  🔄 Lista de candidatos nueva o modificada: se reconstruye el índice de aristas completo.")
+
+    post_units = ('post:' + main_df['post_shortcode'].astype(str)).to_numpy(dtype=object)
+    post_fps = dict(zip(post_units, post_fingerprints(main_df, FINGERPRINT_COLUMNS)))
+    changed_posts, removed_posts = index.pending(post_fps, 'post:')
+
+    mention_files = sorted(glob.glob(os.path.join(MENTIONS_FOLDER, '*.csv')))
+    file_units = {path: 'file:' + os.path.basename(path) for path in mention_files}
+    file_fps = {file_units[path]: file_fingerprint(path) for path in mention_files}
+    changed_files, removed_files = index.pending(file_fps, 'file:')
+
+    changed_set = set(changed_posts)
+    changed_mask = np.fromiter((unit in changed_set for unit in post_units), dtype=bool, count=len(post_units))
+    direct_connections = analyze_direct_interactions(
+        main_df[changed_mask].reset_index(drop=True), candidates, post_units[changed_mask])
+    changed_file_set = set(changed_files)
+    external_connections, processed_files = analyze_external_mentions(
+        {path: unit for path, unit in file_units.items() if unit in changed_file_set}, candidates)
+
+    print("\n📊 Parte 3: Actualizando el índice, consolidando conexiones y guardando archivos...")
+    scanned = {unit: post_fps[unit] for unit in changed_posts}
+    scanned.update({unit: file_fps[unit] for unit in processed_files})
+    index.update(scanned, removed_posts + removed_files,
+                 concat_edges(direct_connections, external_connections))
+
+    df_net = index.raw_edges()
+    df_final_net = index.consolidated()
+    index.close()
+
+    if df_net.empty:
         print("❌ No se encontraron suficientes conexiones para generar los archivos.")
         return
 
-    print("\n📊 Parte 3: Consolidando conexiones y guardando archivos...")
-    df_net = pd.DataFrame(all_connections)
-
     # Guardar el archivo de conexiones RAW (df_net)
     try:
         df_net.to_csv(OUTPUT_CSV_RAW_FILE, index=False, float_format='%.2f')
@@ -104,10 +142,7 @@ def main():
     except IOError as e:
         print(f"  ⚠️  No se pudo guardar el archivo CSV de red sin procesar: {e}")
 
-    # Consolidar los datos
-    df_final_net = df_net.groupby(['source', 'target']).sum().reset_index()
-
-    # Guardar el archivo de conexiones CONSOLIDADO (df_final_net)
+    # Guardar el archivo de conexiones CONSOLIDADO (pesos sumados por (source, target) en el índice)
     try:
         df_final_net.to_csv(OUTPUT_CSV_CONSOLIDATED_FILE, index=False, float_format='%.2f')
         print(f"  💾 Datos de red consolidados guardados en '{OUTPUT_CSV_CONSOLIDATED_FILE}'.")
@@ -1,61 +1,15 @@
 import pandas as pd
 import os
-import re
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+from chart_renderer import render_charts, wordcloud_spec
+from columnar_store import load_posts
+from corpus_store import CorpusStore, corpus_filename
+from text_processing import token_counts_by_group
 
 # --- CONFIGURACIÓN ---
-MAIN_DATA_FILE = "base_de_datos_instagram.csv"
+MAIN_DATA_FILE = "base_de_datos_instagram.db"
 PROFILES_FILE = "perfiles_instagram.txt"
 OUTPUT_FOLDER = "reportes_discurso"
 
-STOPWORDS = set([
-    'de', 'la', 'que', 'el', 'en', 'y', 'a', 'los', 'del', 'se', 'las', 'por', 'un',
-    'para', 'con', 'no', 'una', 'su', 'al', 'lo', 'como', 'más', 'pero', 'sus',
-    'le', 'ya', 'o', 'este', 'ha', 'me', 'si', 'sin', 'sobre', 'este', 'entre',
-    'cuando', 'también', 'fue', 'ser', 'son', 'dos', 'así', 'desde', 'muy', 'hasta',
-    'nos', 'mi', 'eso', 'qué', 'todo', 'todos', 'eres', 'soy', 'es', 'está', 'están'
-])
-
-# --- FUNCIONES AUXILIARES ---
-
-def clean_text(text):
-    """Limpia el texto eliminando URLs, menciones y caracteres no alfanuméricos."""
-    text = re.sub(r'http\S+', '', text)
-    text = re.sub(r'@\w+', '', text)
-    text = re.sub(r'#\w+', '', text)
-    text = re.sub(r'[^a-zA-ZáéíóúÁÉÍÓÚñÑ\s]', '', text)
-    text = text.lower()
-    return ' '.join([word for word in text.split() if word not in STOPWORDS and len(word) > 2])
-
-def generate_wordcloud(text, candidate_name, output_folder):
-    """Genera y guarda una nube de palabras a partir de un texto."""
-    wordcloud = WordCloud(width=800, height=400, background_color='white', collocations=False).generate(text)
-
-    plt.figure(figsize=(10, 5))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis("off")
-
-    filename = f"wordcloud_discurso_{candidate_name}.png"
-    filepath = os.path.join(output_folder, filename)
-    plt.savefig(filepath)
-    plt.close()
-    print(f"  🖼️  Nube de palabras guardada en '{filepath}'")
-
-def add_labels_to_bars(ax, is_percentage=False):
-    """Añade el valor como texto encima de cada barra en un gráfico."""
-    for bar in ax.patches:
-        y_value = bar.get_height()
-        x_value = bar.get_x() + bar.get_width() / 2
-
-        if is_percentage:
-            label = f"{y_value:.2%}"
-        else:
-            label = f"{int(y_value):,}"
-
-        ax.text(x_value, y_value, label, ha='center', va='bottom', fontsize=8, rotation=90)
-
-
 # --- FUNCIÓN PRINCIPAL ---
 
 def analyze_discourse_and_relevance():
@@ -68,14 +22,20 @@ def analyze_discourse_and_relevance():
         print(f"📁 Carpeta '{OUTPUT_FOLDER}' creada.")
 
     try:
-        df = pd.read_csv(MAIN_DATA_FILE)
+        df = load_posts(db_file=MAIN_DATA_FILE)
         with open(PROFILES_FILE, 'r', encoding='utf-8') as f:
             candidates = [line.strip() for line in f if line.strip()]
     except FileNotFoundError as e:
         print(f"❌ Error: No se pudo encontrar un archivo necesario: {e}")
         return
 
+    # Texto de cada post y sus palabras limpias contadas por perfil, en una sola pasada
+    full_text = df['post_caption'].fillna('') + " " + df['post_transcript'].fillna('')
+    word_counts_by_candidate = token_counts_by_group(df['username'], full_text)
+
+    corpus_store = CorpusStore(OUTPUT_FOLDER)
     comparative_results = {}
+    charts = []  # Nubes de palabras y gráficos comparativos, para render_charts
 
     for candidate in candidates:
         print(f"\n--- Analizando a: {candidate} ---")
@@ -86,18 +46,19 @@ def analyze_discourse_and_relevance():
             print(f"  ⚠️  No se encontraron publicaciones para {candidate}. Saltando...")
             continue
 
-        df_candidate['full_text'] = df_candidate['post_caption'].fillna('') + " " + df_candidate['post_transcript'].fillna('')
-        corpus_text = " ".join(df_candidate['full_text'])
-        cleaned_corpus = clean_text(corpus_text)
+        word_counts = word_counts_by_candidate.get(candidate)
 
-        corpus_filename = f"corpus_texto_{candidate}.txt"
-        corpus_filepath = os.path.join(OUTPUT_FOLDER, corpus_filename)
-        with open(corpus_filepath, 'w', encoding='utf-8') as f_out:
-            f_out.write(corpus_text)
-        print(f"  📝 Corpus de texto guardado en '{corpus_filepath}'")
+        # Solo se escriben en el corpus los posts nuevos o cambiados
+        corpus_file = corpus_filename(candidate)
+        written, kept = corpus_store.sync(corpus_file, df_candidate['post_shortcode'],
+                                          full_text.loc[df_candidate.index], df_candidate['post_created_at_str'])
+        print(f"  📝 Corpus de texto actualizado en '{os.path.join(OUTPUT_FOLDER, corpus_file)}' "
+              f"({written} posts escritos, {kept} sin cambios)")
 
-        if cleaned_corpus:
-            generate_wordcloud(cleaned_corpus, candidate, OUTPUT_FOLDER)
+        if word_counts:
+            # La nube se dibuja junto con los demás gráficos, a partir de las frecuencias de palabras
+            wordcloud_path = os.path.join(OUTPUT_FOLDER, f"wordcloud_discurso_{candidate}.png")
+            charts.append(wordcloud_spec(word_counts, wordcloud_path))
         else:
             print("  ⚠️  No hay suficiente texto para generar una nube de palabras.")
 
@@ -137,33 +98,29 @@ def analyze_discourse_and_relevance():
                 f_report.write(f"Texto: {post['post_caption']}\n")
         print(f"  📄 Reporte individual guardado en '{report_filepath}'")
 
+    corpus_store.close()
+
     # --- 👇 SECCIÓN DE GRÁFICOS MODIFICADA 👇 ---
     df_comp = pd.DataFrame.from_dict(comparative_results, orient='index')
 
-    # Gráfico 1: Alcance Real
-    ax_reach = df_comp.sort_values('reach', ascending=False).plot(kind='bar', y='reach', figsize=(12, 7), legend=None,
-                                                                 title='Alcance Real Total de Videos (Suma de Reproducciones)')
-    plt.ylabel("Total de Reproducciones")
-    add_labels_to_bars(ax_reach)
-    plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_FOLDER, "comparativo_alcance_videos.png"))
-
-    # Gráfico 2: Tasa de Interacción (Eficiencia)
-    ax_rate = df_comp.sort_values('rate', ascending=False).plot(kind='bar', y='rate', figsize=(12, 7), legend=None,
-                                                               title='Tasa de Interacción por Reproducción (Eficiencia)')
-    plt.ylabel("Interacciones por Reproducción (%)")
-    plt.gca().yaxis.set_major_formatter(plt.FuncFormatter('{:.2%}'.format))
-    add_labels_to_bars(ax_rate, is_percentage=True)
-    plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_FOLDER, "comparativo_eficiencia_videos.png"))
-
-    # --- 👇 NUEVO GRÁFICO 3: INTERACCIONES TOTALES 👇 ---
-    ax_interactions = df_comp.sort_values('total_interactions', ascending=False).plot(kind='bar', y='total_interactions', figsize=(12, 7), legend=None,
-                                                                                    title='Interacciones Totales Estimadas en Videos')
-    plt.ylabel("Número Total de Interacciones (Likes + Comentarios)")
-    add_labels_to_bars(ax_interactions)
-    plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_FOLDER, "comparativo_interacciones_totales_videos.png"))
+    # Las nubes de palabras y los tres gráficos comparativos se dibujan en paralelo
+    render_charts(charts + [
+        # Gráfico 1: Alcance Real
+        {'kind': 'ranked_bar', 'data': df_comp, 'y': 'reach', 'figsize': (12, 7),
+         'title': 'Alcance Real Total de Videos (Suma de Reproducciones)',
+         'ylabel': "Total de Reproducciones",
+         'output': os.path.join(OUTPUT_FOLDER, "comparativo_alcance_videos.png")},
+        # Gráfico 2: Tasa de Interacción (Eficiencia)
+        {'kind': 'ranked_bar', 'data': df_comp, 'y': 'rate', 'figsize': (12, 7), 'percent_axis': True,
+         'title': 'Tasa de Interacción por Reproducción (Eficiencia)',
+         'ylabel': "Interacciones por Reproducción (%)",
+         'output': os.path.join(OUTPUT_FOLDER, "comparativo_eficiencia_videos.png")},
+        # Gráfico 3: Interacciones Totales
+        {'kind': 'ranked_bar', 'data': df_comp, 'y': 'total_interactions', 'figsize': (12, 7),
+         'title': 'Interacciones Totales Estimadas en Videos',
+         'ylabel': "Número Total de Interacciones (Likes + Comentarios)",
+         'output': os.path.join(OUTPUT_FOLDER, "comparativo_interacciones_totales_videos.png")},
+    ])
 
     print("\n📊 Gráficos comparativos guardados.")
     print(f"\n🎉 ¡Proceso completado! Todos los reportes están en la carpeta '{OUTPUT_FOLDER}'.")
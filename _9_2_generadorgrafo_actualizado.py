@@ -1,16 +1,25 @@
-import pandas as pd
+import numpy as np
 import os
-import re
 import glob
 import json
+from columnar_store import load_posts
+from mention_matcher import MentionMatcher
+from network_edges import (SCAN_TEXT_COLUMNS, build_scan_text, impact_weights,
+                           edges_from_matches, concat_edges)
+from mention_ingestion import scan_mention_files
+from fingerprints import post_fingerprints, file_fingerprint
+from network_edge_index import NetworkEdgeIndex, alias_version
 
 # --- CONFIGURACIÓN ---
-MAIN_DATA_FILE = "base_de_datos_instagram.csv"
+MAIN_DATA_FILE = "base_de_datos_instagram.db"
 PROFILES_FILE = "perfiles_instagram.txt"
 NAMES_MAPPING_FILE = "reemplazo_nombres_perfiles_visualizacion.json" # Nuevo archivo
 MENTIONS_FOLDER = "menciones"
 OUTPUT_CSV_RAW_FILE = "network_data_raw.csv"
 OUTPUT_CSV_CONSOLIDATED_FILE = "network_data_consolidated.csv"
+INDEX_SCOPE = "9_2"  # Espacio del índice incremental de aristas para este generador
+INDEX_RULES = "v1|caption+usertags+transcript|co-mencion-con-candidato-del-archivo"
+FINGERPRINT_COLUMNS = ['username', 'likes_count', 'comments_count'] + SCAN_TEXT_COLUMNS
 
 # --- FUNCIONES DE UTILIDAD ---
 
@@ -53,122 +62,92 @@ def load_search_mapping(candidates, mapping_file):
                     
     return search_map
 
-def calculate_impact_weight(likes, comments):
-    """Calcula el peso de una interacción basado en el engagement."""
-    likes = float(likes) if pd.notna(likes) else 0
-    comments = float(comments) if pd.notna(comments) else 0
-    return 1 + (likes * 0.1) + (comments * 0.25)
-
 # --- FUNCIONES DE ANÁLISIS ---
 
-def analyze_direct_interactions(main_df, search_map):
+def analyze_direct_interactions(main_df, search_map, unit_keys):
     """
-    Parte 1: Extrae interacciones buscando en TODAS las columnas 
-    coincidencias de username O nombre real.
+    Parte 1: Extrae interacciones buscando en las columnas de texto
+    (caption, usertags y transcripción) coincidencias de username O nombre real.
+    Retorna las aristas como arreglos {'source', 'target', 'weight', 'key'}, donde
+    'key' es la unidad del índice ('post:<shortcode>') de cada arista.
     """
-    print("🔎 Parte 1: Analizando interacciones directas (Búsqueda total en columnas)...")
-    connections = []
-    
-    # Pre-compilar expresiones regulares para velocidad
-    # Creamos una lista de (regex, target_candidate_id)
-    search_patterns = []
-    for search_term, target_id in search_map.items():
-        # Escapamos el término para evitar errores de regex con caracteres especiales
-        # \b asegura que coincida "Ana" pero no "Banana"
-        pattern = re.compile(f'@{re.escape(search_term)}\\b|\\b{re.escape(search_term)}\\b', re.IGNORECASE)
-        search_patterns.append((pattern, target_id))
-
-    total_rows = len(main_df)
-    for index, row in main_df.iterrows():
-        if index % 100 == 0:
-            print(f"  ...procesando fila {index}/{total_rows}", end='\r')
-
-        author = row.get('username', 'unknown')
-        
-        # CONCATENACIÓN TOTAL: Convierte toda la fila a string y la une
-        # Esto incluye caption, usertags, location, accessibility, etc.
-        text_to_scan = " ".join(row.astype(str).values)
+    print(f"🔎 Parte 1: Analizando interacciones directas en {len(main_df)} posts nuevos o cambiados...")
+
+    # Un solo autómata con todos los términos (usernames y nombres reales).
+    # Mismas reglas que @término\b|\btérmino\b: coincide "Ana" pero no "Banana"
+    matcher = MentionMatcher(search_map)
+
+    # Texto y peso de todas las filas en una sola pasada por columnas
+    texts = build_scan_text(main_df, SCAN_TEXT_COLUMNS)
+    weights = impact_weights(main_df)
+    authors = main_df['username'].astype(object).fillna('unknown').to_numpy()
+
+    row_indices, targets = [], []
+    for i, (author, text_to_scan) in enumerate(zip(authors, texts)):
+        # El autor no cuenta como mención a sí mismo
+        for target in matcher.find_targets(text_to_scan) - {author}:
+            row_indices.append(i)
+            targets.append(target)
+
+    edges = edges_from_matches(row_indices, targets, authors, weights, keys=unit_keys)
+    print(f"  ✅ Se encontraron {len(edges['weight'])} interacciones directas.")
+    return edges
+
+def scan_mention_chunk(df_mention, matcher, main_candidate_mentioned):
+    """Regla de co-mención sobre un bloque de un archivo de menciones (se ejecuta en los procesos)."""
+    texts = build_scan_text(df_mention, SCAN_TEXT_COLUMNS)
+    weights = impact_weights(df_mention)
+    if 'username' in df_mention.columns:
+        authors = df_mention['username'].astype(object).fillna('unknown').to_numpy()
+    else:
+        authors = np.full(len(df_mention), 'unknown', dtype=object)
 
-        # Buscar menciones en el texto masivo
-        found_targets_in_row = set()
-        
-        for pattern, target_id in search_patterns:
-            if author == target_id:
-                continue # El autor no cuenta como mención a sí mismo
-
-            if pattern.search(text_to_scan):
-                found_targets_in_row.add(target_id)
-
-        # Si encontramos menciones, calculamos peso y guardamos
-        if found_targets_in_row:
-            weight = calculate_impact_weight(row.get('likes_count', 0), row.get('comments_count', 0))
-            for target in found_targets_in_row:
-                connections.append({'source': author, 'target': target, 'weight': weight})
-
-    print(f"\n  ✅ Se encontraron {len(connections)} interacciones directas.")
-    return connections
-
-def analyze_external_mentions(mentions_folder, search_map):
-    """Parte 2: Extrae co-menciones usando el mapa expandido de nombres."""
-    print("\n🔎 Parte 2: Analizando conversaciones externas (co-menciones)...")
-    connections = []
-    mention_files = glob.glob(os.path.join(mentions_folder, '*.csv'))
-
-    # Pre-compilar regex igual que antes
-    search_patterns = []
-    for search_term, target_id in search_map.items():
-        pattern = re.compile(f'@{re.escape(search_term)}\\b|\\b{re.escape(search_term)}\\b', re.IGNORECASE)
-        search_patterns.append((pattern, target_id))
-
-    for file_path in mention_files:
-        try:
-            df_mention = pd.read_csv(file_path)
-            # Intentar deducir el candidato principal del nombre del archivo
-            filename_clean = os.path.basename(file_path).replace('.csv', '').split('_')[-1]
-            
-            # Verificar si el nombre del archivo es un alias conocido
-            main_candidate_mentioned = filename_clean
-            if filename_clean in search_map:
-                main_candidate_mentioned = search_map[filename_clean]
-
-            for _, row in df_mention.iterrows():
-                author = row.get('username', 'unknown')
-                if author == main_candidate_mentioned: 
-                    continue
-
-                # También aquí usamos búsqueda en toda la fila por consistencia
-                text_to_scan = " ".join(row.astype(str).values)
-
-                mentioned_in_post = set()
-                
-                # Buscar a todos los candidatos en el texto
-                for pattern, target_id in search_patterns:
-                    if pattern.search(text_to_scan):
-                        mentioned_in_post.add(target_id)
-
-                # Regla de Co-mención:
-                # Si el candidato del archivo (main) está implícito o mencionado, 
-                # y encontramos OTROS candidatos, creamos conexión.
-                
-                # Asumimos que si estamos en el archivo de "CandidatoA", CandidatoA es parte de la interacción
-                if main_candidate_mentioned in mentioned_in_post:
-                    # Ya está incluido en el set, no hacemos nada extra
-                    pass
-                else:
-                    # Lo forzamos porque el archivo pertenece a sus menciones
-                    mentioned_in_post.add(main_candidate_mentioned)
-
-                if len(mentioned_in_post) > 1:
-                    weight = calculate_impact_weight(row.get('likes_count', 0), row.get('comments_count', 0))
-                    for mentioned_candidate in mentioned_in_post:
-                        if mentioned_candidate != author: # Evitar bucles propios
-                             connections.append({'source': author, 'target': mentioned_candidate, 'weight': weight})
-                             
-        except Exception as e:
-            print(f"  ⚠️  Error procesando archivo {file_path}: {e}")
+    row_indices, targets = [], []
+    for i, (author, text_to_scan) in enumerate(zip(authors, texts)):
+        if author == main_candidate_mentioned:
+            continue
+
+        # Buscar a todos los candidatos en el texto
+        mentioned_in_post = matcher.find_targets(text_to_scan)
+
+        # Regla de Co-mención: el candidato del archivo es parte de la interacción
+        # (se agrega aunque no aparezca explícitamente), y hace falta al menos otro.
+        mentioned_in_post.add(main_candidate_mentioned)
 
-    print(f"  ✅ Se encontraron {len(connections)} conexiones en menciones de terceros.")
-    return connections
+        if len(mentioned_in_post) > 1:
+            for mentioned_candidate in mentioned_in_post:
+                if mentioned_candidate != author: # Evitar bucles propios
+                    row_indices.append(i)
+                    targets.append(mentioned_candidate)
+
+    return edges_from_matches(row_indices, targets, authors, weights)
+
+def analyze_external_mentions(file_units, search_map):
+    """
+    Parte 2: Extrae co-menciones usando el mapa expandido de nombres.
+    Los archivos se leen por bloques y se reparten entre procesos (mention_ingestion.py).
+
+    Args:
+        file_units (dict): {ruta del archivo de menciones: unidad del índice ('file:<nombre>')}.
+
+    Returns:
+        tuple: (aristas con 'key', sumadas por archivo, y unidades procesadas sin error)
+    """
+    print(f"\n🔎 Parte 2: Analizando conversaciones externas en {len(file_units)} archivos nuevos o cambiados...")
+    needed_columns = set(SCAN_TEXT_COLUMNS) | {'username', 'likes_count', 'comments_count'}
+
+    files = []
+    for file_path, unit_key in file_units.items():
+        # Intentar deducir el candidato principal del nombre del archivo
+        filename_clean = os.path.basename(file_path).replace('.csv', '').split('_')[-1]
+        # Verificar si el nombre del archivo es un alias conocido
+        main_candidate_mentioned = search_map.get(filename_clean, filename_clean)
+        files.append((file_path, unit_key, main_candidate_mentioned))
+
+    edge_sets, processed_units = scan_mention_files(files, scan_mention_chunk, search_map, needed_columns)
+    edges = concat_edges(*edge_sets)
+    print(f"  ✅ Se encontraron {len(edges['weight'])} conexiones (sumadas por archivo) en menciones de terceros.")
+    return edges, processed_units
 
 # --- FUNCIÓN PRINCIPAL ---
 
@@ -176,7 +155,7 @@ def main():
     print("🚀 Iniciando la generación de datos de red (Modo Nombre Real + Búsqueda Total)...")
 
     try:
-        main_df = pd.read_csv(MAIN_DATA_FILE)
+        main_df = load_posts(columns=['post_shortcode'] + FINGERPRINT_COLUMNS, db_file=MAIN_DATA_FILE)
         # Leer candidatos base
         with open(PROFILES_FILE, 'r', encoding='utf-8') as f:
             candidates = {line.strip() for line in f if line.strip()}
@@ -189,18 +168,45 @@ def main():
     
     print(f"  ℹ️  Se buscarán {len(search_map)} términos (usuarios y nombres reales).")
 
-    # 2. Ejecutar análisis
-    direct_connections = analyze_direct_interactions(main_df, search_map)
-    external_connections = analyze_external_mentions(MENTIONS_FOLDER, search_map)
-    all_connections = direct_connections + external_connections
-
-    if not all_connections:
+    # 2. Índice incremental: si cambió el conjunto de alias se reescanea todo
+    index = NetworkEdgeIndex(INDEX_SCOPE, alias_version(search_map, INDEX_RULES))
+    if index.rebuilt:
+        print("  🔄 Conjunto de alias nuevo o modificado: se reconstruye el índice de aristas completo.")
+
+    post_units = ('post:' + main_df['post_shortcode'].astype(str)).to_numpy(dtype=object)
+    post_fps = dict(zip(post_units, post_fingerprints(main_df, FINGERPRINT_COLUMNS)))
+    changed_posts, removed_posts = index.pending(post_fps, 'post:')
+
+    mention_files = sorted(glob.glob(os.path.join(MENTIONS_FOLDER, '*.csv')))
+    file_units = {path: 'file:' + os.path.basename(path) for path in mention_files}
+    file_fps = {file_units[path]: file_fingerprint(path) for path in mention_files}
+    changed_files, removed_files = index.pending(file_fps, 'file:')
+    print(f"  ℹ️  Índice: {len(changed_posts)} posts y {len(changed_files)} archivos por escanear, "
+          f"{len(removed_posts) + len(removed_files)} unidades eliminadas.")
+
+    # 3. Ejecutar análisis solo sobre lo nuevo o cambiado
+    changed_set = set(changed_posts)
+    changed_mask = np.fromiter((unit in changed_set for unit in post_units), dtype=bool, count=len(post_units))
+    direct_connections = analyze_direct_interactions(
+        main_df[changed_mask].reset_index(drop=True), search_map, post_units[changed_mask])
+    changed_file_set = set(changed_files)
+    external_connections, processed_files = analyze_external_mentions(
+        {path: unit for path, unit in file_units.items() if unit in changed_file_set}, search_map)
+
+    print("\n📊 Parte 3: Actualizando el índice y consolidando conexiones...")
+    scanned = {unit: post_fps[unit] for unit in changed_posts}
+    scanned.update({unit: file_fps[unit] for unit in processed_files})
+    index.update(scanned, removed_posts + removed_files,
+                 concat_edges(direct_connections, external_connections))
+
+    df_net = index.raw_edges()
+    df_final_net = index.consolidated()
+    index.close()
+
+    if df_net.empty:
         print("❌ No se encontraron suficientes conexiones.")
         return
 
-    print("\n📊 Parte 3: Consolidando conexiones...")
-    df_net = pd.DataFrame(all_connections)
-
     # Guardar RAW
     try:
         df_net.to_csv(OUTPUT_CSV_RAW_FILE, index=False, float_format='%.2f')
@@ -208,10 +214,7 @@ def main():
     except IOError as e:
         print(f"  ⚠️  Error guardando RAW: {e}")
 
-    # Consolidar (Sumar pesos de interacciones repetidas)
-    df_final_net = df_net.groupby(['source', 'target']).sum().reset_index()
-
-    # Guardar CONSOLIDADO
+    # Guardar CONSOLIDADO (pesos sumados por (source, target), mantenidos por diferencia en el índice)
     try:
         df_final_net.to_csv(OUTPUT_CSV_CONSOLIDATED_FILE, index=False, float_format='%.2f')
         print(f"  💾 CONSOLIDADO guardado: '{OUTPUT_CSV_CONSOLIDATED_FILE}'")
@@ -221,4 +224,4 @@ def main():
     print("\n🎉 ¡Proceso completado!")
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
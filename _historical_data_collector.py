@@ -1,32 +1,19 @@
 import requests
-import csv
 from datetime import datetime, timedelta
-import os
 import time
 
-# Asumimos que config.py contiene: SCRAPE_API_KEY = "tu_clave"
-from config import SCRAPE_API_KEY
+from scrapecreators_client import api_get, ENDPOINT_PROFILE, ENDPOINT_POSTS
+import post_db
 
 # Rutas a los archivos
-OUTPUT_CSV_FILE = "base_de_datos_instagram.csv"
-
-# Endpoints de la API
-BASE_URL_PROFILE = "https://api.scrapecreators.com/v1/instagram/profile"
-BASE_URL_POSTS = "https://api.scrapecreators.com/v2/instagram/user/posts"
-
-HEADERS = {
-    "x-api-key": SCRAPE_API_KEY,
-    "accept": "application/json"
-}
+OUTPUT_DB_FILE = post_db.DB_FILE
 
 def get_profile_data(username):
     """Obtiene las estadísticas generales de un perfil usando el endpoint v1."""
     print(f"  > Obteniendo datos del perfil...")
     params = {"handle": username}
     try:
-        response = requests.get(BASE_URL_PROFILE, headers=HEADERS, params=params)
-        response.raise_for_status()
-        profile_data = response.json().get('data', {}).get('user', {})
+        profile_data = api_get(ENDPOINT_PROFILE, params).get('data', {}).get('user', {})
         if not profile_data:
             print(f"  ❌ No se encontraron datos del perfil en la respuesta para {username}.")
         return profile_data
@@ -44,35 +31,15 @@ def get_posts_page(username, next_max_id=None):
         params["next_max_id"] = next_max_id
 
     try:
-        response = requests.get(BASE_URL_POSTS, headers=HEADERS, params=params)
-        response.raise_for_status()
-        data = response.json()
+        data = api_get(ENDPOINT_POSTS, params)
         return data.get('items', []), data.get('next_max_id')
     except requests.exceptions.RequestException as e:
         print(f"  ❌ Error de API al obtener posts: {e}")
         return [], None
 
-def load_existing_timestamps(filename):
-    """Carga las marcas de tiempo de creación de posts existentes del archivo CSV."""
-    existing_timestamps = set()
-    if os.path.exists(filename):
-        with open(filename, 'r', newline='', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            next(reader, None)  # Saltar el encabezado
-            for row in reader:
-                # La marca de tiempo está en la columna 'post_created_at_str', índice 6
-                if len(row) > 6 and row[6] not in ('N/A', ''):
-                    existing_timestamps.add(row[6])
-    return existing_timestamps
-
-def save_data_to_csv(data_rows, filename, header):
-    """Guarda o añade datos a un archivo CSV."""
-    file_exists = os.path.exists(filename)
-    with open(filename, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(header)
-        writer.writerows(data_rows)
+def save_data_to_db(conn, data_rows, filename):
+    """Guarda los posts en la base (upsert por shortcode: un post repetido solo refresca sus métricas)."""
+    post_db.upsert_posts(conn, data_rows)
     print(f"  ✅ Datos guardados en {filename}.")
 
 def main():
@@ -88,8 +55,8 @@ def main():
     all_historical_data = []
     next_max_id = None
 
-    # Cargar las marcas de tiempo de posts existentes para evitar duplicados
-    existing_timestamps = load_existing_timestamps(OUTPUT_CSV_FILE)
+    # Los duplicados se detectan por shortcode con el índice de la base
+    conn = post_db.connect(OUTPUT_DB_FILE)
 
     # Definir el límite de tiempo de 60 días
     sixty_days_ago = datetime.now() - timedelta(days=45)
@@ -112,6 +79,8 @@ def main():
             print("No hay más publicaciones disponibles o ocurrió un error.")
             break
 
+        existing_shortcodes = post_db.known_shortcodes(conn, [post.get('code') for post in posts])
+
         stop_collection = False
         for post in posts:
             post_created_at_unix = post.get('taken_at')
@@ -119,9 +88,9 @@ def main():
                 post_created_at_str = datetime.fromtimestamp(post_created_at_unix).strftime('%Y-%m-%d %H:%M:%S')
                 post_date = datetime.fromtimestamp(post_created_at_unix)
 
-                # Verificar si el post ya está en el CSV o si es demasiado antiguo
-                if post_created_at_str in existing_timestamps:
-                    print(f"  > Post con fecha de creación '{post_created_at_str}' ya existe. Saltando para evitar duplicados.")
+                # Verificar si el post ya está en la base o si es demasiado antiguo
+                if post.get('code') in existing_shortcodes:
+                    print(f"  > Post '{post.get('code')}' de '{post_created_at_str}' ya existe. Saltando para evitar duplicados.")
                     continue
                 if post_date < sixty_days_ago:
                     print(f"  > Post de '{post_created_at_str}' es más antiguo que 60 días. Deteniendo la recolección.")
@@ -161,19 +130,13 @@ def main():
 
         time.sleep(15)  # Pausa entre peticiones de paginación para evitar bloqueos
 
-    # Encabezado del CSV consolidado
-    header = [
-        'timestamp_registro', 'username', 'followers_count', 'posts_count_total',
-        'following_count', 'post_id', 'post_created_at_str', 'post_shortcode', 'post_url',
-        'likes_count', 'comments_count', 'post_caption', 'media_type', 'play_count', 'usertags', 'post_transcript'
-    ]
-
     if all_historical_data:
-        save_data_to_csv(all_historical_data, OUTPUT_CSV_FILE, header)
-        print("\n🎉 Recolección de datos históricos completada. Los posts han sido guardados en 'base_de_datos_instagram.csv'.")
+        save_data_to_db(conn, all_historical_data, OUTPUT_DB_FILE)
+        print(f"\n🎉 Recolección de datos históricos completada. Los posts han sido guardados en '{OUTPUT_DB_FILE}'.")
         print("Recuerda ejecutar el script de transcripción si es necesario.")
     else:
         print("\nℹ️ No se recolectaron posts nuevos en esta ejecución.")
+    conn.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,160 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from scrapecreators_stub import StubSettings, start_stub_server
+
+# =============================================================================
+# BENCHMARK DE INGESTA CONTRA EL SERVIDOR DE PRUEBA
+#
+# Ejecuta 2_update_bd.py, 1_metrics_updater.py y 3_transcript_processor.py (en
+# ese orden, como en el flujo real) dentro de una carpeta temporal, apuntando a
+# scrapecreators_stub.py en lugar de la API real. Para cada script reporta:
+# peticiones, peticiones/s, latencia p50/p99, respuestas por código y tiempo
+# total.
+#
+# Hay dos latencias:
+# - cliente: lo que tarda cada llamada a api_get en el script (registro
+#   SCRAPE_API_LATENCY_LOG de scrapecreators_client.py), con la espera del
+#   limitador de tasa, la red y los reintentos incluidos.
+# - servidor: solo el tiempo de proceso dentro del servidor de prueba, que
+#   es básicamente la latencia simulada con --latency-ms.
+#
+# Uso:
+#   python benchmark_ingestion.py --profiles 20 --latency-ms 150 --rate-429 0.02 --rps 20
+# =============================================================================
+
+REPO_FOLDER = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = ["2_update_bd.py", "1_metrics_updater.py", "3_transcript_processor.py"]
+LATENCY_LOG_FILE = "latencia_cliente.tsv"
+
+
+def prepare_workdir(workdir, num_profiles):
+    """Crea la carpeta de trabajo con un config.py de prueba y la lista de perfiles."""
+    with open(os.path.join(workdir, "config.py"), 'w', encoding='utf-8') as f:
+        f.write('SCRAPE_API_KEY = "stub"\n')
+    with open(os.path.join(workdir, "perfiles_instagram.txt"), 'w', encoding='utf-8') as f:
+        f.write("\n".join(f"perfil_{i:03d}" for i in range(num_profiles)) + "\n")
+
+
+def run_script(script, workdir, env, verbose):
+    """Ejecuta un script del proyecto en la carpeta de trabajo y retorna (segundos, código de salida)."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, os.path.join(REPO_FOLDER, script)], cwd=workdir, env=env,
+        stdout=None if verbose else subprocess.DEVNULL, stderr=subprocess.STDOUT if not verbose else None,
+    )
+    return time.perf_counter() - started, result.returncode
+
+
+def read_latency_log(path):
+    """Lee el registro de latencia del cliente: lista de (endpoint, código, segundos)."""
+    calls = []
+    if not os.path.exists(path):
+        return calls
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            endpoint, outcome, seconds = line.rstrip("\n").split("\t")
+            calls.append((endpoint, outcome, float(seconds)))
+    return calls
+
+
+def percentile_ms(seconds, q):
+    return float(np.percentile(np.array(seconds) * 1000, q)) if len(seconds) else 0.0
+
+
+def summarize(script, wall_seconds, returncode, requests_log, client_calls):
+    """Calcula las métricas del benchmark para un script."""
+    client_seconds = [seconds for _, _, seconds in client_calls]
+    server_seconds = [seconds for _, _, seconds in requests_log]
+    statuses = {}
+    for _, status, _ in requests_log:
+        statuses[status] = statuses.get(status, 0) + 1
+    return {
+        'script': script,
+        'returncode': returncode,
+        'requests': len(requests_log),
+        'requests_per_second': len(requests_log) / wall_seconds if wall_seconds > 0 else 0.0,
+        'calls': len(client_calls),
+        'client_p50_ms': percentile_ms(client_seconds, 50),
+        'client_p99_ms': percentile_ms(client_seconds, 99),
+        'server_p50_ms': percentile_ms(server_seconds, 50),
+        'server_p99_ms': percentile_ms(server_seconds, 99),
+        'statuses': statuses,
+        'wall_seconds': wall_seconds,
+    }
+
+
+def print_report(results):
+    print("\n📊 Resultados del benchmark de ingesta")
+    print("   (cli = llamada a api_get en el script; srv = tiempo de proceso en el servidor de prueba)")
+    print(f"{'script':<28}{'llamadas':>9}{'peticiones':>11}{'pet/s':>9}{'cli p50':>9}{'cli p99':>9}"
+          f"{'srv p50':>9}{'srv p99':>9}{'tiempo s':>10}  códigos")
+    for r in results:
+        statuses = ", ".join(f"{code}:{count}" for code, count in sorted(r['statuses'].items()))
+        failed = "" if r['returncode'] == 0 else f"  ❌ salida {r['returncode']}"
+        print(f"{r['script']:<28}{r['calls']:>9}{r['requests']:>11}{r['requests_per_second']:>9.1f}"
+              f"{r['client_p50_ms']:>9.1f}{r['client_p99_ms']:>9.1f}{r['server_p50_ms']:>9.1f}"
+              f"{r['server_p99_ms']:>9.1f}{r['wall_seconds']:>10.1f}  {statuses}{failed}")
+    total_requests = sum(r['requests'] for r in results)
+    total_seconds = sum(r['wall_seconds'] for r in results)
+    print(f"{'TOTAL':<28}{sum(r['calls'] for r in results):>9}{total_requests:>11}"
+          f"{total_requests / total_seconds if total_seconds else 0:>9.1f}{'':>36}{total_seconds:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los scripts de ingesta contra el servidor de prueba.")
+    parser.add_argument("--profiles", type=int, default=10, help="Perfiles sintéticos a procesar.")
+    parser.add_argument("--pages", type=int, default=4, help="Páginas de posts por perfil.")
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=30.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--fixtures", default=None, help="Archivo de caché con respuestas grabadas.")
+    parser.add_argument("--rps", type=float, default=None,
+                        help="Cuota de peticiones/s del cliente (por defecto, la de scrapecreators_client.py).")
+    parser.add_argument("--keep", action="store_true", help="No borrar la carpeta temporal al terminar.")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar la salida de los scripts.")
+    args = parser.parse_args()
+
+    settings = StubSettings(args.latency_ms, args.jitter_ms, args.rate_429, args.error_rate,
+                            os.path.abspath(args.fixtures) if args.fixtures else None, pages_per_profile=args.pages)
+    server = start_stub_server(settings)
+    workdir = tempfile.mkdtemp(prefix="benchmark_ingesta_")
+    prepare_workdir(workdir, args.profiles)
+
+    env = dict(os.environ)
+    env["SCRAPE_API_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [workdir, REPO_FOLDER, env.get("PYTHONPATH")]))
+    if args.rps is not None:
+        env["SCRAPE_API_REQUESTS_PER_SECOND"] = str(args.rps)
+    latency_log = os.path.join(workdir, LATENCY_LOG_FILE)
+    env["SCRAPE_API_LATENCY_LOG"] = latency_log
+
+    print(f"🧪 Servidor de prueba en {env['SCRAPE_API_BASE_URL']} | carpeta de trabajo: {workdir}")
+    results = []
+    try:
+        for script in SCRIPTS:
+            print(f"▶️ Ejecutando {script}...")
+            server.reset()
+            if os.path.exists(latency_log):
+                os.remove(latency_log)
+            wall_seconds, returncode = run_script(script, workdir, env, args.verbose)
+            results.append(summarize(script, wall_seconds, returncode, server.requests_log,
+                                     read_latency_log(latency_log)))
+    finally:
+        server.shutdown()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(results)
+
+
+if __name__ == "__main__":
+    main()
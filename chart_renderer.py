@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')  # Sin ventanas: solo se generan archivos PNG
+import matplotlib.pyplot as plt
+import pandas as pd
+
+# =============================================================================
+# GENERACIÓN DE GRÁFICOS EN PARALELO A PARTIR DE ESPECIFICACIONES
+#
+# Los scripts de análisis ya no dibujan cada PNG uno tras otro: describen cada
+# gráfico como un diccionario (datos + tipo + textos + archivo de salida) y
+# render_charts los dibuja en un grupo de procesos con el backend Agg.
+#
+# Tipos de gráfico ('kind'):
+#   'line'        sns.lineplot con marcadores, una línea por 'hue'
+#   'bar'         sns.barplot agrupado por 'hue'
+#   'ranked_bar'  barras de una columna de 'data' ordenadas de mayor a menor,
+#                 con el valor escrito sobre cada barra
+#   'wordcloud'   nube de palabras a partir de frecuencias ya contadas
+#                 (columnas 'word' y 'count'; ver wordcloud_spec)
+#
+# Cada carpeta de salida tiene un '_manifiesto_graficos.json' con la huella
+# (datos + especificación) de cada PNG: si no cambió y el archivo existe, el
+# gráfico no se vuelve a dibujar.
+# =============================================================================
+
+# --- CONFIGURACIÓN ---
+MANIFEST_FILE = "_manifiesto_graficos.json"
+MAX_WORKERS = os.cpu_count() or 1
+RENDERER_VERSION = "1"  # Cambiarlo al modificar el dibujo invalida las huellas guardadas
+
+# Parámetros de las nubes de palabras. La semilla fija hace que la misma
+# frecuencia de palabras dé siempre la misma imagen.
+WORDCLOUD_PARAMS = {'width': 800, 'height': 400, 'background_color': 'white', 'random_state': 42}
+
+DEFAULT_SPEC = {
+    'x': None, 'y': None, 'hue': None, 'palette': None, 'order': None,
+    'title': '', 'xlabel': None, 'ylabel': None, 'figsize': (14, 6),
+    'xticks': None, 'xtick_rotation': 45, 'legend': None, 'grid_y': False,
+    'percent_axis': False, 'tight_layout': True,
+}
+
+
+def add_labels_to_bars(ax, is_percentage=False):
+    """Añade el valor como texto encima de cada barra en un gráfico."""
+    for bar in ax.patches:
+        y_value = bar.get_height()
+        x_value = bar.get_x() + bar.get_width() / 2
+
+        if is_percentage:
+            label = f"{y_value:.2%}"
+        else:
+            label = f"{int(y_value):,}"
+
+        ax.text(x_value, y_value, label, ha='center', va='bottom', fontsize=8, rotation=90)
+
+
+def _apply_axes_text(spec):
+    """Título, etiquetas, marcas del eje x, cuadrícula y leyenda comunes a los gráficos de seaborn."""
+    plt.title(spec['title'], fontsize=16)
+    plt.xlabel(spec['xlabel'], fontsize=14)
+    plt.ylabel(spec['ylabel'], fontsize=14)
+    if spec['xticks'] is not None:
+        plt.xticks(spec['xticks'])
+    else:
+        plt.xticks(rotation=spec['xtick_rotation'], ha='right')
+    if spec['grid_y']:
+        plt.grid(axis='y', linestyle='--', alpha=0.7)
+    if spec['legend'] is not None:
+        plt.legend(**spec['legend'])
+
+
+def _draw_line(spec):
+    import seaborn as sns
+    plt.figure(figsize=spec['figsize'])
+    sns.lineplot(data=spec['data'], x=spec['x'], y=spec['y'], hue=spec['hue'],
+                 marker='o', dashes=False, palette=spec['palette'])
+    _apply_axes_text(spec)
+
+
+def _draw_bar(spec):
+    import seaborn as sns
+    plt.figure(figsize=spec['figsize'])
+    sns.barplot(data=spec['data'], x=spec['x'], y=spec['y'], hue=spec['hue'],
+                palette=spec['palette'], order=spec['order'])
+    _apply_axes_text(spec)
+
+
+def _draw_ranked_bar(spec):
+    ax = spec['data'].sort_values(spec['y'], ascending=False).plot(
+        kind='bar', y=spec['y'], figsize=spec['figsize'], legend=None, title=spec['title'])
+    plt.ylabel(spec['ylabel'])
+    if spec['percent_axis']:
+        plt.gca().yaxis.set_major_formatter(plt.FuncFormatter('{:.2%}'.format))
+    add_labels_to_bars(ax, is_percentage=spec['percent_axis'])
+
+
+def wordcloud_frequencies(counts):
+    """
+    Aplica a un conteo de palabras (en minúsculas) el mismo filtrado que WordCloud.generate:
+    quita sus stopwords y los números, y suma cada plural terminado en 's' a su singular
+    si ambos aparecen.
+    """
+    from wordcloud import STOPWORDS as WORDCLOUD_STOPWORDS
+    frequencies = {word: count for word, count in counts.items()
+                   if word not in WORDCLOUD_STOPWORDS and not word.isdigit()}
+    for word in list(frequencies):
+        if word.endswith('s') and not word.endswith('ss') and word[:-1] in frequencies:
+            frequencies[word[:-1]] += frequencies.pop(word)
+    return frequencies
+
+
+def _draw_wordcloud(spec):
+    from wordcloud import WordCloud
+    data = spec['data']
+    frequencies = wordcloud_frequencies(dict(zip(data['word'], data['count'].tolist())))
+    wordcloud = WordCloud(**spec['wordcloud']).generate_from_frequencies(frequencies)
+    plt.figure(figsize=spec['figsize'])
+    plt.imshow(wordcloud, interpolation='bilinear')
+    plt.axis("off")
+
+
+def wordcloud_spec(counts, output, params=WORDCLOUD_PARAMS):
+    """
+    Especificación de una nube de palabras a partir de un conteo {palabra: frecuencia}.
+
+    La huella del gráfico es la de las frecuencias y los parámetros: si no
+    cambiaron, la nube (que es lo más costoso de dibujar) no se vuelve a generar.
+    """
+    words = sorted(counts)
+    data = pd.DataFrame({'word': words, 'count': [counts[word] for word in words]})
+    return {'kind': 'wordcloud', 'data': data, 'figsize': (10, 5), 'tight_layout': False,
+            'wordcloud': dict(params), 'output': output}
+
+
+DRAWERS = {'line': _draw_line, 'bar': _draw_bar, 'ranked_bar': _draw_ranked_bar, 'wordcloud': _draw_wordcloud}
+
+
+def chart_hash(spec):
+    """Huella de los datos y de la especificación de un gráfico."""
+    digest = hashlib.sha1(RENDERER_VERSION.encode('utf-8'))
+    options = {key: value for key, value in spec.items() if key != 'data'}
+    digest.update(json.dumps(options, sort_keys=True, default=str, ensure_ascii=False).encode('utf-8'))
+    data = spec['data']
+    digest.update(json.dumps([list(map(str, data.columns)), list(map(str, data.dtypes))]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _render_chart(spec):
+    """Dibuja un gráfico y lo guarda. Retorna None o el mensaje de error."""
+    try:
+        DRAWERS[spec['kind']](spec)
+        if spec['tight_layout']:
+            plt.tight_layout()
+        plt.savefig(spec['output'])
+    except Exception as e:
+        return str(e)
+    finally:
+        plt.close('all')
+    return None
+
+
+def _load_manifest(folder):
+    try:
+        with open(os.path.join(folder, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_manifest(folder, manifest):
+    path = os.path.join(folder, MANIFEST_FILE)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def render_charts(specs, max_workers=MAX_WORKERS):
+    """
+    Dibuja los gráficos cuyos datos o especificación cambiaron desde la última vez.
+
+    Args:
+        specs (list): Diccionarios con al menos 'kind', 'data' (DataFrame) y 'output' (ruta del PNG);
+                      el resto de claves se completa con DEFAULT_SPEC.
+        max_workers (int): Procesos a usar (con 1 se dibuja en el proceso principal).
+
+    Returns:
+        tuple: (rutas dibujadas, rutas omitidas por no tener cambios)
+    """
+    specs = [{**DEFAULT_SPEC, **spec} for spec in specs]
+    manifests = {}
+    pending = []
+    skipped = []
+    for spec in specs:
+        folder, filename = os.path.split(spec['output'])
+        manifest = manifests.setdefault(folder, _load_manifest(folder))
+        spec_hash = chart_hash(spec)
+        if manifest.get(filename) == spec_hash and os.path.exists(spec['output']):
+            skipped.append(spec['output'])
+            print(f"⏭️  Gráfico sin cambios, se conserva: {spec['output']}")
+        else:
+            pending.append((spec, spec_hash))
+
+    workers = max(1, min(max_workers, len(pending)))
+    if workers == 1:
+        errors = [_render_chart(spec) for spec, _ in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            errors = list(pool.map(_render_chart, [spec for spec, _ in pending]))
+
+    rendered = []
+    for (spec, spec_hash), error in zip(pending, errors):
+        folder, filename = os.path.split(spec['output'])
+        if error is not None:
+            print(f"❌ Error al generar el gráfico {spec['output']}: {error}")
+            manifests[folder].pop(filename, None)
+            continue
+        manifests[folder][filename] = spec_hash
+        rendered.append(spec['output'])
+        print(f"📊 Gráfico guardado en: {spec['output']}")
+
+    for folder, manifest in manifests.items():
+        _save_manifest(folder, manifest)
+    return rendered, skipped
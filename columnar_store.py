@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# ALMACENAMIENTO COLUMNAR (PARQUET) DE LA BASE DE DATOS DE INSTAGRAM
+#
+# Mantiene una copia tipada de la base de posts ('base_de_datos_instagram.db',
+# ver post_db.py) en un dataset Parquet particionado por mes de publicación
+# (post_month=YYYY-MM). Los tipos se resuelven una sola vez al escribir cada
+# partición, de modo que cada etapa de análisis carga únicamente las columnas y
+# los meses que necesita, sin repetir to_datetime / to_numeric.
+#
+# La base registra qué meses cambiaron (tabla 'dirty_months'); antes de cada
+# lectura solo se reescriben esas particiones. Si pyarrow no está instalado,
+# load_posts() consulta la base directamente con los mismos tipos y filtros.
+# =============================================================================
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+import post_db
+from post_db import DB_FILE, POST_COLUMNS
+
+# --- CONFIGURACIÓN ---
+DATASET_FOLDER = "base_de_datos_instagram_parquet"
+MANIFEST_FILE = "_manifest.json"  # Los archivos que empiezan por '_' no se leen como datos
+PARTITION_FILE = "data.parquet"
+PARTITION_COLUMN = "post_month"
+ROW_ORDER_COLUMN = "row_order"  # rowid de la base, para conservar el orden de registro
+NO_DATE_PARTITION = post_db.NO_DATE_MONTH
+
+COUNT_COLUMNS = [
+    'followers_count', 'posts_count_total', 'following_count',
+    'likes_count', 'comments_count', 'play_count', 'media_type'
+]
+DATETIME_COLUMNS = ['timestamp_registro', 'post_created_at_str']
+STRING_COLUMNS = ['post_id', 'post_shortcode', 'post_url', 'post_caption', 'usertags', 'post_transcript']
+CATEGORY_COLUMNS = ['username']
+MISSING_TEXT_VALUES = ['', 'N/A']
+
+if pa is not None:
+    SCHEMA = pa.schema(
+        [(col, pa.timestamp('s')) if col in DATETIME_COLUMNS
+         else (col, pa.int64()) if col in COUNT_COLUMNS
+         else (col, pa.dictionary(pa.int32(), pa.string())) if col in CATEGORY_COLUMNS
+         else (col, pa.string())
+         for col in POST_COLUMNS]
+        + [(ROW_ORDER_COLUMN, pa.int64()), (PARTITION_COLUMN, pa.string())]
+    )
+    # Esquema de cada archivo de partición (el mes va en el nombre de la carpeta)
+    FILE_SCHEMA = SCHEMA.remove(SCHEMA.get_field_index(PARTITION_COLUMN))
+
+
+# --- FUNCIONES AUXILIARES ---
+
+def coerce_post_types(df):
+    """Aplica los tipos fijos del esquema a un DataFrame leído de la base (en el lugar)."""
+    # Textos vacíos o 'N/A' se tratan como faltantes, igual que al leer el CSV con pandas
+    for col in STRING_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].where(~df[col].isin(MISSING_TEXT_VALUES), None)
+    for col in DATETIME_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in COUNT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def _read_manifest(dataset_folder):
+    manifest_path = os.path.join(dataset_folder, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return None
+
+
+def _write_manifest(dataset_folder, manifest):
+    manifest_path = os.path.join(dataset_folder, MANIFEST_FILE)
+    with open(manifest_path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def _to_arrow_table(df):
+    """Convierte el DataFrame tipado de un mes en una tabla Arrow con el esquema fijo."""
+    columns = {}
+    for col in POST_COLUMNS:
+        series = df[col] if col in df.columns else pd.Series([None] * len(df))
+        if col in COUNT_COLUMNS:
+            values = series.to_numpy(dtype='float64', na_value=np.nan)
+            mask = np.isnan(values)
+            columns[col] = pa.array(np.where(mask, 0, values).astype('int64'), mask=mask, type=pa.int64())
+        elif col in DATETIME_COLUMNS:
+            columns[col] = pa.array(pd.to_datetime(series, errors='coerce'), type=pa.timestamp('s'))
+        elif col in CATEGORY_COLUMNS:
+            columns[col] = pa.array(series.astype(object).where(series.notna(), None), type=pa.string()).dictionary_encode()
+        else:
+            columns[col] = pa.array(series.astype(object).where(series.notna(), None), type=pa.string())
+    columns[ROW_ORDER_COLUMN] = pa.array(df[ROW_ORDER_COLUMN].to_numpy(dtype='int64'))
+    return pa.table(columns, schema=FILE_SCHEMA)
+
+
+def _read_month_from_db(conn, month):
+    """Lee de la base los posts de un mes, con su rowid como orden de registro."""
+    condition, params = post_db.month_query(month)
+    query = f"SELECT rowid AS {ROW_ORDER_COLUMN}, {', '.join(POST_COLUMNS)} FROM posts WHERE {condition}"
+    return pd.read_sql_query(query, conn, params=params)
+
+
+def _write_partition(dataset_folder, month, df):
+    """Reescribe (o elimina si quedó vacía) la partición de un mes."""
+    partition_folder = os.path.join(dataset_folder, f"{PARTITION_COLUMN}={month}")
+    if df.empty:
+        if os.path.exists(partition_folder):
+            shutil.rmtree(partition_folder)
+        return
+    os.makedirs(partition_folder, exist_ok=True)
+    partition_path = os.path.join(partition_folder, PARTITION_FILE)
+    # Escritura a un temporal + reemplazo atómico: los lectores nunca ven un archivo a medias
+    pq.write_table(_to_arrow_table(coerce_post_types(df)), partition_path + ".tmp")
+    os.replace(partition_path + ".tmp", partition_path)
+
+
+# --- API PÚBLICA ---
+
+def sync_dataset(db_file=DB_FILE, dataset_folder=DATASET_FOLDER):
+    """
+    Propaga a Parquet los meses modificados en la base desde la última
+    sincronización (o construye el dataset completo si aún no existe).
+    Retorna el manifiesto.
+    """
+    conn = post_db.connect(db_file)
+    try:
+        manifest = _read_manifest(dataset_folder)
+        changed = post_db.dirty_months(conn)
+        if manifest is None:
+            print(f"🗄️ Construyendo el almacenamiento columnar '{dataset_folder}' desde '{db_file}'...")
+            if os.path.exists(dataset_folder):
+                shutil.rmtree(dataset_folder)
+            months_to_write = set(post_db.all_months(conn))
+            manifest = {'version': '', 'generation': 0}
+        elif changed:
+            months_to_write = set(changed)
+            print(f"🗄️ Actualizando {len(months_to_write)} mes(es) del almacenamiento columnar...")
+        else:
+            return manifest
+
+        os.makedirs(dataset_folder, exist_ok=True)
+        for month in sorted(months_to_write):
+            _write_partition(dataset_folder, month, _read_month_from_db(conn, month))
+
+        # Solo se limpian los contadores leídos antes de escribir: si otro proceso
+        # modificó un mes entretanto, quedará pendiente para la próxima sincronización
+        post_db.clear_dirty_months(conn, changed)
+        generation = manifest.get('generation', 0) + 1
+        version_key = json.dumps([manifest.get('version'), generation, sorted(changed.items())])
+        manifest = {
+            'version': hashlib.sha1(version_key.encode()).hexdigest()[:16],
+            'generation': generation,
+            'rows': conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0],
+        }
+        _write_manifest(dataset_folder, manifest)
+        print(f"  ✅ {manifest['rows']} filas disponibles en formato Parquet.")
+        return manifest
+    finally:
+        conn.close()
+
+
+def dataset_version(db_file=DB_FILE, dataset_folder=DATASET_FOLDER):
+    """Identificador de la versión de los datos (cambia cada vez que cambia la base)."""
+    if pa is None:
+        conn = post_db.connect(db_file)
+        try:
+            # Sin pyarrow nadie limpia 'dirty_months': sus contadores solo crecen con cada cambio
+            signature = conn.execute("SELECT COUNT(*), SUM(changes) FROM dirty_months").fetchone()
+        finally:
+            conn.close()
+        return hashlib.sha1(json.dumps(signature).encode()).hexdigest()[:16]
+    return sync_dataset(db_file, dataset_folder)['version']
+
+
+def _month_range(start_date, end_date):
+    start_month = pd.Timestamp(start_date).strftime('%Y-%m') if start_date is not None else None
+    end_month = pd.Timestamp(end_date).strftime('%Y-%m') if end_date is not None else None
+    return start_month, end_month
+
+
+def _finalize(df):
+    """
+    Restaura el orden de registro de las filas y deja las categorías ordenadas
+    alfabéticamente y solo con los valores presentes.
+    """
+    if ROW_ORDER_COLUMN in df.columns:
+        df = df.sort_values(ROW_ORDER_COLUMN, kind='stable').drop(columns=ROW_ORDER_COLUMN)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+            df[col] = df[col].cat.remove_unused_categories()
+            df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+    return df.reset_index(drop=True)
+
+
+def _load_posts_from_db(db_file, columns, start_date, end_date, months, usernames):
+    """Ruta alternativa sin pyarrow: consulta la base aplicando los mismos tipos y filtros."""
+    conditions, params = [], []
+    if start_date is not None:
+        conditions.append("post_created_at_str >= ?")
+        params.append(pd.Timestamp(start_date).strftime('%Y-%m-%d %H:%M:%S'))
+    if end_date is not None:
+        conditions.append("post_created_at_str <= ?")
+        params.append(pd.Timestamp(end_date).strftime('%Y-%m-%d %H:%M:%S'))
+    if months is not None:
+        month_conditions = []
+        for month in months:
+            condition, month_params = post_db.month_query(month)
+            month_conditions.append(f"({condition})")
+            params.extend(month_params)
+        conditions.append("(" + (" OR ".join(month_conditions) or "0") + ")")
+    if usernames is not None:
+        usernames = list(usernames)
+        conditions.append(f"username IN ({', '.join('?' for _ in usernames) or 'NULL'})")
+        params.extend(usernames)
+
+    selected = list(columns) if columns is not None else POST_COLUMNS
+    query = f"SELECT rowid AS {ROW_ORDER_COLUMN}, {', '.join(selected)} FROM posts"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    conn = post_db.connect(db_file)
+    try:
+        df = pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+    return _finalize(coerce_post_types(df))
+
+
+def load_posts(columns=None, start_date=None, end_date=None, months=None, usernames=None,
+               db_file=DB_FILE, dataset_folder=DATASET_FOLDER):
+    """
+    Carga los posts con tipos fijos, leyendo solo lo necesario.
+
+    Args:
+        columns (list | None): Columnas a cargar (None = todas, en el orden del CSV original).
+        start_date, end_date: Límites (inclusivos) sobre 'post_created_at_str'.
+        months (list | None): Meses 'YYYY-MM' a cargar (poda de particiones).
+        usernames (list | None): Perfiles a cargar.
+
+    Returns:
+        pd.DataFrame: Conteos numéricos, fechas datetime64, 'username' categórico
+        y textos como string.
+    """
+    if not os.path.exists(db_file) and not os.path.exists(post_db.LEGACY_CSV_FILE):
+        raise FileNotFoundError(db_file)
+    if pa is None:
+        return _load_posts_from_db(db_file, columns, start_date, end_date, months, usernames)
+
+    sync_dataset(db_file, dataset_folder)
+    dataset = ds.dataset(dataset_folder, format='parquet', partitioning='hive', schema=SCHEMA)
+
+    filters = []
+    start_month, end_month = _month_range(start_date, end_date)
+    # Filtros por partición (se descartan carpetas completas) y por fila (estadísticas Parquet)
+    if start_date is not None:
+        filters.append(ds.field(PARTITION_COLUMN) >= start_month)
+        filters.append(ds.field('post_created_at_str') >= pa.scalar(pd.Timestamp(start_date).to_pydatetime(), pa.timestamp('s')))
+    if end_date is not None:
+        filters.append(ds.field(PARTITION_COLUMN) <= end_month)
+        filters.append(ds.field('post_created_at_str') <= pa.scalar(pd.Timestamp(end_date).to_pydatetime(), pa.timestamp('s')))
+    if months is not None:
+        filters.append(ds.field(PARTITION_COLUMN).isin(list(months)))
+    if usernames is not None:
+        filters.append(ds.field('username').isin(list(usernames)))
+
+    expression = None
+    for condition in filters:
+        expression = condition if expression is None else expression & condition
+
+    columns_to_read = (list(columns) if columns is not None else POST_COLUMNS) + [ROW_ORDER_COLUMN]
+    table = dataset.to_table(columns=columns_to_read, filter=expression)
+    return _finalize(table.to_pandas())
@@ -0,0 +1,174 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from fingerprints import post_fingerprints
+
+# =============================================================================
+# ARCHIVOS DE CORPUS INCREMENTALES (corpus_texto_<perfil>.txt)
+#
+# Cada archivo de corpus tiene el mismo formato de siempre (los textos de los
+# posts separados por un espacio), pero ya no se reescribe completo en cada
+# ejecución: un manifiesto SQLite ('_manifiesto_corpus.db', en la misma
+# carpeta) guarda para cada post su posición en bytes dentro del archivo, su
+# fecha y la huella de su texto.
+#
+# - Los posts nuevos se agregan al final del archivo.
+# - Si el texto de un post ya escrito cambió (por ejemplo, llegó su
+#   transcripción) o el post ya no está, el archivo se corta en ese post y
+#   solo se reescribe desde ahí.
+# - Si el archivo no coincide con el manifiesto (no existe o lo modificó otro
+#   script), se reescribe completo.
+#
+# Los scripts que leen los corpus pueden pedir solo el texto desde una
+# posición (read_since) o el de un rango de fechas (read_range) sin leer el
+# archivo completo.
+# =============================================================================
+
+# --- CONFIGURACIÓN ---
+MANIFEST_FILE = "_manifiesto_corpus.db"
+SEPARATOR = " "
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS corpus_files (
+    file TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    post_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS corpus_posts (
+    file TEXT NOT NULL,
+    post_shortcode TEXT NOT NULL,
+    post_date TEXT,
+    fingerprint TEXT NOT NULL,
+    byte_start INTEGER NOT NULL,
+    byte_end INTEGER NOT NULL,
+    PRIMARY KEY (file, post_shortcode)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_corpus_posts_offset ON corpus_posts(file, byte_start);
+"""
+
+
+def corpus_filename(candidate):
+    return f"corpus_texto_{candidate}.txt"
+
+
+class CorpusStore:
+    """Archivos de corpus de una carpeta con su manifiesto de posiciones por post."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(folder, MANIFEST_FILE), timeout=60)
+        self.conn.executescript(SCHEMA_SQL)
+
+    def _stored_posts(self, filename):
+        return pd.read_sql_query(
+            "SELECT post_shortcode, fingerprint, byte_start, byte_end FROM corpus_posts "
+            "WHERE file = ? ORDER BY byte_start", self.conn, params=(filename,))
+
+    def file_info(self, filename):
+        """(tamaño en bytes, número de posts) según el manifiesto, o None si el archivo no está registrado."""
+        return self.conn.execute("SELECT size, post_count FROM corpus_files WHERE file = ?", (filename,)).fetchone()
+
+    def sync(self, filename, shortcodes, texts, dates=None):
+        """
+        Deja el archivo con el texto de los posts dados, escribiendo solo lo que cambió.
+
+        Args:
+            filename (str): Nombre del archivo dentro de la carpeta.
+            shortcodes (iterable): post_shortcode de cada post.
+            texts (iterable): Texto de cada post, en el mismo orden.
+            dates (iterable): Fecha de creación de cada post (opcional, para read_range).
+
+        Returns:
+            tuple: (posts escritos en esta ejecución, posts que ya estaban y se conservaron)
+        """
+        path = os.path.join(self.folder, filename)
+        posts = pd.DataFrame({'post_shortcode': list(shortcodes), 'text': list(texts)})
+        posts['text'] = posts['text'].fillna('').astype(str)
+        if dates is not None:
+            post_dates = pd.to_datetime(pd.Series(list(dates)), errors='coerce').dt.strftime('%Y-%m-%d %H:%M:%S')
+            posts['post_date'] = post_dates.astype(object).where(post_dates.notna(), None)
+        else:
+            posts['post_date'] = None
+        posts['fingerprint'] = post_fingerprints(posts, ['text'])
+        posts = posts.set_index('post_shortcode')
+
+        stored = self._stored_posts(filename)
+        info = self.file_info(filename)
+        in_sync = (info is not None and os.path.exists(path) and os.path.getsize(path) == info[0])
+        if in_sync and len(stored):
+            # Se conserva el prefijo del archivo hasta el primer post cambiado o eliminado
+            changed = (stored['post_shortcode'].map(posts['fingerprint']) != stored['fingerprint']).to_numpy()
+            first_changed = int(changed.argmax()) if changed.any() else len(stored)
+        else:
+            first_changed = 0
+        kept = stored.iloc[:first_changed]
+        cut_offset = int(kept['byte_end'].iloc[-1]) if len(kept) else 0
+
+        # Cola a reescribir: posts ya escritos después del corte (que siguen existiendo) y luego los nuevos
+        tail_stored = [key for key in stored['post_shortcode'].iloc[first_changed:] if key in posts.index]
+        known = set(stored['post_shortcode'])
+        tail = tail_stored + [key for key in posts.index if key not in known]
+
+        rows = []
+        position = cut_offset
+        with open(path, 'r+b' if in_sync and cut_offset else 'wb') as f:
+            f.seek(cut_offset)
+            f.truncate()
+            for i, key in enumerate(tail):
+                if len(kept) or i:
+                    f.write(SEPARATOR.encode('utf-8'))
+                    position += len(SEPARATOR.encode('utf-8'))
+                data = posts.at[key, 'text'].encode('utf-8')
+                f.write(data)
+                rows.append((filename, key, posts.at[key, 'post_date'], posts.at[key, 'fingerprint'],
+                             position, position + len(data)))
+                position += len(data)
+
+        with self.conn:
+            if len(kept):
+                self.conn.executemany("DELETE FROM corpus_posts WHERE file = ? AND post_shortcode = ?",
+                                      ((filename, key) for key in stored['post_shortcode'].iloc[first_changed:]))
+            else:
+                self.conn.execute("DELETE FROM corpus_posts WHERE file = ?", (filename,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO corpus_posts (file, post_shortcode, post_date, fingerprint, byte_start, byte_end) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("INSERT OR REPLACE INTO corpus_files (file, size, post_count) VALUES (?, ?, ?)",
+                              (filename, position, len(kept) + len(rows)))
+        return len(rows), len(kept)
+
+    def read_since(self, filename, offset=0):
+        """Texto del archivo desde la posición 'offset' (en bytes; p. ej. el tamaño de una lectura anterior)."""
+        with open(os.path.join(self.folder, filename), 'rb') as f:
+            f.seek(offset)
+            return f.read().decode('utf-8', errors='ignore')
+
+    def read_range(self, filename, start_date=None, end_date=None):
+        """
+        Texto de los posts creados en [start_date, end_date), en el orden del archivo.
+
+        Las fechas son strings 'AAAA-MM-DD' (o con hora); None deja el extremo abierto.
+        Solo se leen del disco los tramos de esos posts.
+        """
+        query = "SELECT byte_start, byte_end FROM corpus_posts WHERE file = ? AND post_date IS NOT NULL"
+        params = [filename]
+        if start_date is not None:
+            query += " AND post_date >= ?"
+            params.append(str(start_date))
+        if end_date is not None:
+            query += " AND post_date < ?"
+            params.append(str(end_date))
+        spans = self.conn.execute(query + " ORDER BY byte_start", params).fetchall()
+
+        texts = []
+        with open(os.path.join(self.folder, filename), 'rb') as f:
+            for byte_start, byte_end in spans:
+                f.seek(byte_start)
+                texts.append(f.read(byte_end - byte_start).decode('utf-8'))
+        return SEPARATOR.join(texts)
+
+    def close(self):
+        self.conn.close()
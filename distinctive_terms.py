@@ -0,0 +1,160 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# TÉRMINOS DISTINTIVOS POR PERFIL Y POR MES (TF-IDF Y LOG-ODDS)
+#
+# A partir del índice de tokens (token_index.py) se arma una matriz dispersa
+# grupo × término en formato COO (filas, columnas, conteos), donde un grupo es
+# un perfil o un mes. Con NumPy, sobre las entradas no nulas, se calculan:
+#
+#   tfidf       (conteo / palabras del grupo) * (log((1 + grupos) / (1 + grupos con el término)) + 1)
+#   log_odds_z  log-odds del término en el grupo frente al resto de grupos, con
+#               prior de Dirichlet proporcional a la frecuencia global del
+#               término (Monroe et al., 2008), dividido por su desviación
+#               estándar: > 2 indica un término claramente propio del grupo
+#
+# y se guardan los N términos de mayor log_odds_z de cada grupo en CSV, para
+# no tener que enviar el corpus completo al LLM solo para encontrar los temas.
+# =============================================================================
+
+# --- CONFIGURACIÓN ---
+TOP_N_TERMS = 25
+MIN_TERM_COUNT = 5  # Veces mínimas que el término debe aparecer en el grupo para entrar al top
+PRIOR_STRENGTH = 1000.0  # Tamaño (en palabras) del prior de Dirichlet del log-odds
+CANDIDATE_TERMS_FILE = "terminos_distintivos_perfil.csv"
+MONTH_TERMS_FILE = "terminos_distintivos_mes.csv"
+
+
+class TermMatrix:
+    """Matriz dispersa grupo × término en formato COO."""
+
+    def __init__(self, groups, vocabulary, rows, cols, counts):
+        """
+        Args:
+            groups (np.ndarray): Nombre de cada grupo (posición = fila).
+            vocabulary (np.ndarray): Palabra de cada término (posición = columna).
+            rows, cols (np.ndarray): Fila y columna de cada entrada no nula.
+            counts (np.ndarray): Frecuencia de cada entrada.
+        """
+        self.groups = groups
+        self.vocabulary = vocabulary
+        self.rows = rows
+        self.cols = cols
+        self.counts = counts
+        self.num_groups = len(groups)
+        self.num_terms = len(vocabulary)
+
+    @classmethod
+    def from_token_index(cls, token_index, shortcodes, groups):
+        """
+        Suma los tokens indexados de cada post en la fila de su grupo.
+
+        Args:
+            token_index (TokenIndex): Índice ya actualizado con los posts.
+            shortcodes (iterable): post_shortcode de cada post.
+            groups (iterable): Grupo de cada post (los posts con grupo nulo se ignoran).
+        """
+        codes, group_names = pd.factorize(pd.Series(list(groups), dtype=object))
+        arrays = token_index.token_arrays(list(shortcodes))
+        lengths = np.fromiter((len(array) for array in arrays), dtype='int64', count=len(arrays))
+        valid = codes >= 0
+        token_ids = (np.concatenate([array for array, keep in zip(arrays, valid) if keep])
+                     if valid.any() else np.zeros(0, dtype='int64')).astype('int64')
+        token_rows = np.repeat(codes[valid].astype('int64'), lengths[valid])
+
+        num_terms = len(token_index.vocabulary)
+        keys, counts = np.unique(token_rows * num_terms + token_ids, return_counts=True)
+        return cls(np.asarray(group_names, dtype=object), np.asarray(token_index.vocabulary, dtype=object),
+                   keys // num_terms, keys % num_terms, counts.astype('float64'))
+
+    # --- Totales ---
+
+    def group_totals(self):
+        """Palabras por grupo."""
+        return np.bincount(self.rows, weights=self.counts, minlength=self.num_groups)
+
+    def term_totals(self):
+        """Frecuencia global de cada término."""
+        return np.bincount(self.cols, weights=self.counts, minlength=self.num_terms)
+
+    def document_frequency(self):
+        """Número de grupos en los que aparece cada término."""
+        return np.bincount(self.cols, minlength=self.num_terms)
+
+    # --- Puntajes por entrada ---
+
+    def tfidf(self):
+        tf = self.counts / self.group_totals()[self.rows]
+        idf = np.log((1 + self.num_groups) / (1 + self.document_frequency())) + 1
+        return tf * idf[self.cols]
+
+    def log_odds_z(self, prior_strength=PRIOR_STRENGTH):
+        """Log-odds con prior de Dirichlet informativo del término en su grupo frente al resto, en z-score."""
+        term_totals = self.term_totals()
+        group_totals = self.group_totals()
+        total = term_totals.sum()
+        alpha = prior_strength * term_totals / total if total > 0 else np.zeros(self.num_terms)
+        alpha_w = alpha[self.cols]
+
+        y_group = self.counts
+        y_rest = term_totals[self.cols] - y_group
+        n_group = group_totals[self.rows]
+        n_rest = total - n_group
+
+        delta = (np.log((y_group + alpha_w) / (n_group + prior_strength - y_group - alpha_w))
+                 - np.log((y_rest + alpha_w) / (n_rest + prior_strength - y_rest - alpha_w)))
+        variance = 1 / (y_group + alpha_w) + 1 / (y_rest + alpha_w)
+        return delta / np.sqrt(variance)
+
+    # --- Resultados ---
+
+    def top_terms(self, n=TOP_N_TERMS, min_count=MIN_TERM_COUNT, group_label='group'):
+        """
+        Los 'n' términos de mayor log_odds_z de cada grupo.
+
+        Returns:
+            pd.DataFrame: group_label, rank, term, count, tfidf, log_odds_z
+        """
+        tfidf = self.tfidf()
+        log_odds = self.log_odds_z()
+        keep = np.flatnonzero(self.counts >= min_count)
+        # Por grupo, de mayor a menor log_odds_z (empates: mayor conteo)
+        keep = keep[np.lexsort((-self.counts[keep], -log_odds[keep], self.rows[keep]))]
+        rows = self.rows[keep]
+        starts = np.searchsorted(rows, rows, side='left')
+        rank = np.arange(len(keep)) - starts + 1
+        keep, rank = keep[rank <= n], rank[rank <= n]
+        return pd.DataFrame({
+            group_label: self.groups[self.rows[keep]],
+            'rank': rank,
+            'term': self.vocabulary[self.cols[keep]],
+            'count': self.counts[keep].astype('int64'),
+            'tfidf': tfidf[keep].round(6),
+            'log_odds_z': log_odds[keep].round(4),
+        })
+
+
+def write_distinctive_terms(token_index, df, output_folder, n=TOP_N_TERMS):
+    """
+    Guarda en 'output_folder' los términos distintivos de cada perfil y de cada mes.
+
+    Args:
+        token_index (TokenIndex): Índice ya actualizado con los posts de 'df'.
+        df (pd.DataFrame): Posts con 'post_shortcode', 'username' y 'post_created_at_str' (fecha).
+        output_folder (str): Carpeta de salida (p. ej. 'reportes_discurso').
+    """
+    shortcodes = df['post_shortcode'].to_numpy(dtype=object)
+    months = pd.to_datetime(df['post_created_at_str'], errors='coerce').dt.strftime('%Y-%m')
+
+    for groups, group_label, filename in [(df['username'].astype(object), 'username', CANDIDATE_TERMS_FILE),
+                                          (months, 'month', MONTH_TERMS_FILE)]:
+        matrix = TermMatrix.from_token_index(token_index, shortcodes, groups)
+        top = matrix.top_terms(n=n, group_label=group_label)
+        if group_label == 'month':
+            top = top.sort_values(['month', 'rank'], kind='stable')
+        output_path = os.path.join(output_folder, filename)
+        top.to_csv(output_path, index=False)
+        print(f"🔑 Términos distintivos ({matrix.num_groups} grupos, {matrix.num_terms} términos) guardados en '{output_path}'")
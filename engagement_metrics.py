@@ -0,0 +1,139 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from columnar_store import DATASET_FOLDER, dataset_version, load_posts, pa
+from post_db import DB_FILE
+
+if pa is not None:
+    import pyarrow.parquet as pq
+
+# =============================================================================
+# MOTOR ÚNICO DE MÉTRICAS DE ENGAGEMENT POR POST
+#
+# Los scripts 4, 5 y 6 calculaban cada uno sus propias fórmulas sobre copias
+# del DataFrame. Aquí se calculan todas en una sola pasada vectorizada sobre
+# arreglos float64 (mismas fórmulas y mismo manejo de ceros/faltantes):
+#
+#   engagement_likes / engagement_comments  (script 4)
+#       video: interacción / reproducciones * 100; otros: / seguidores * 100; sin dato = 0
+#   weighted_interactions, icp_denominator, IC_P, ERV_Comments, ERF_Likes  (script 6)
+#       IC_P = (3 * comentarios + likes) / (reproducciones si es video con vistas, si no seguidores) * 100
+#   interaction_rate  (script 5)
+#       (likes + comentarios) / reproducciones; NaN si no hay reproducciones
+#   impact_score  (script 5)
+#       1 + likes * IMPACT_LIKES_WEIGHT + comentarios * IMPACT_COMMENTS_WEIGHT (0.1 y 0.25)
+#
+# El resultado para toda la base se guarda en '_metricas_engagement.parquet'
+# dentro de la carpeta del almacenamiento columnar, junto con la versión de
+# los datos, de las fórmulas y de los pesos de impact_score: mientras no
+# cambien, los scripts solo leen las columnas.
+# =============================================================================
+
+# --- CONFIGURACIÓN ---
+METRICS_FILE = "_metricas_engagement.parquet"  # Empieza por '_': no se lee como partición de datos
+SOURCE_COLUMNS = ['likes_count', 'comments_count', 'play_count', 'followers_count', 'media_type']
+METRIC_COLUMNS = [
+    'engagement_likes', 'engagement_comments', 'weighted_interactions', 'icp_denominator', 'IC_P',
+    'ERV_Comments', 'ERF_Likes', 'interaction_rate', 'impact_score',
+]
+VIDEO_MEDIA_TYPE = 2
+FORMULA_VERSION = "1"  # Cambiarlo al modificar las fórmulas invalida la caché
+# Pesos de impact_score; son propios de esta métrica (los de las aristas de la red están en network_edges.py)
+IMPACT_LIKES_WEIGHT = 0.1
+IMPACT_COMMENTS_WEIGHT = 0.25
+
+
+def _column(df, col):
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _ratio_percent(numerator, denominator):
+    """numerador / denominador * 100 donde el denominador es > 0; 0 en el resto (y si el numerador falta)."""
+    out = np.zeros(len(numerator))
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return np.nan_to_num(out * 100, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def compute_engagement_metrics(df):
+    """Agrega (en el lugar) todas las columnas de METRIC_COLUMNS como float64 y retorna el DataFrame."""
+    likes, comments, plays, followers, media_type = (_column(df, col) for col in SOURCE_COLUMNS)
+    is_video = media_type == VIDEO_MEDIA_TYPE
+    likes0, comments0 = np.nan_to_num(likes), np.nan_to_num(comments)
+    plays0, followers0 = np.nan_to_num(plays), np.nan_to_num(followers)
+
+    # Script 4: el denominador depende del tipo de medio
+    engagement_base = np.where(is_video, plays, followers)
+    df['engagement_likes'] = _ratio_percent(likes, engagement_base)
+    df['engagement_comments'] = _ratio_percent(comments, engagement_base)
+
+    # Script 6: IC-P con conteos faltantes como 0
+    weighted = 3 * comments0 + likes0
+    denominator = np.where(is_video & (plays0 > 0), plays0, followers0)
+    df['weighted_interactions'] = weighted
+    df['icp_denominator'] = denominator
+    df['IC_P'] = _ratio_percent(weighted, denominator)
+    df['ERV_Comments'] = _ratio_percent(comments0, plays0)
+    df['ERF_Likes'] = _ratio_percent(likes0, followers0)
+
+    # Script 5: tasa de interacción por reproducción (NaN si no hay reproducciones)
+    interaction_rate = np.full(len(df), np.nan)
+    np.divide(likes + comments, plays, out=interaction_rate, where=plays > 0)
+    df['interaction_rate'] = interaction_rate
+    df['impact_score'] = 1 + likes0 * IMPACT_LIKES_WEIGHT + comments0 * IMPACT_COMMENTS_WEIGHT
+    return df
+
+
+def load_engagement_metrics(db_file=DB_FILE, dataset_folder=DATASET_FOLDER):
+    """
+    Métricas de toda la base indexadas por post_shortcode.
+
+    Se leen de la caché si corresponde a la versión actual de los datos; si no,
+    se calculan y se guardan (la caché en disco requiere pyarrow).
+    """
+    version = (f"{dataset_version(db_file, dataset_folder)}:{FORMULA_VERSION}"
+               f":{IMPACT_LIKES_WEIGHT!r}:{IMPACT_COMMENTS_WEIGHT!r}")
+    metrics_path = os.path.join(dataset_folder, METRICS_FILE)
+
+    if pa is not None and os.path.exists(metrics_path):
+        try:
+            table = pq.read_table(metrics_path)
+            if (table.schema.metadata or {}).get(b'version', b'').decode() == version:
+                return table.to_pandas().set_index('post_shortcode')
+        except (OSError, pa.ArrowInvalid):
+            pass  # Caché dañada: se recalcula
+
+    metrics = load_posts(columns=['post_shortcode'] + SOURCE_COLUMNS, db_file=db_file, dataset_folder=dataset_folder)
+    metrics = compute_engagement_metrics(metrics)[['post_shortcode'] + METRIC_COLUMNS]
+
+    if pa is not None:
+        os.makedirs(dataset_folder, exist_ok=True)
+        table = pa.Table.from_pandas(metrics, preserve_index=False).replace_schema_metadata({'version': version})
+        pq.write_table(table, metrics_path + ".tmp")
+        os.replace(metrics_path + ".tmp", metrics_path)
+        print(f"📐 Métricas de engagement recalculadas y guardadas ({len(metrics)} posts).")
+    return metrics.set_index('post_shortcode')
+
+
+def add_engagement_metrics(df, columns=METRIC_COLUMNS, db_file=DB_FILE, dataset_folder=DATASET_FOLDER):
+    """
+    Agrega (en el lugar) las métricas precalculadas 'columns' a 'df'.
+
+    Las filas se emparejan por post_shortcode; si 'df' no tiene esa columna o
+    algún post no está en la caché, las métricas se calculan sobre 'df'.
+    """
+    columns = list(columns)
+    if 'post_shortcode' in df.columns:
+        metrics = load_engagement_metrics(db_file, dataset_folder)
+        positions = metrics.index.get_indexer(df['post_shortcode'])
+        if not (positions < 0).any():
+            for col in columns:
+                df[col] = metrics[col].to_numpy(dtype='float64')[positions]
+            return df
+    computed = compute_engagement_metrics(pd.DataFrame({col: df[col] for col in SOURCE_COLUMNS if col in df.columns}))
+    for col in columns:
+        df[col] = computed[col].to_numpy()
+    return df
@@ -0,0 +1,22 @@
+import os
+
+import pandas as pd
+
+# =============================================================================
+# HUELLAS DE CONTENIDO PARA LOS ÍNDICES INCREMENTALES
+#
+# Los índices que solo reprocesan lo nuevo o lo que cambió (aristas de la red,
+# tokens por post, archivos de corpus) comparan estas huellas con las que
+# guardaron en la ejecución anterior.
+# =============================================================================
+
+
+def post_fingerprints(df, columns):
+    """Huella por fila de las columnas dadas (p. ej. texto, autor, likes, comentarios)."""
+    return pd.util.hash_pandas_object(df[columns], index=False).map('{:016x}'.format).to_numpy()
+
+
+def file_fingerprint(path):
+    """Huella de un archivo (tamaño y fecha de modificación)."""
+    stat = os.stat(path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
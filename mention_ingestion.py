@@ -0,0 +1,106 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from mention_matcher import MentionMatcher
+from network_edges import empty_edges
+
+# =============================================================================
+# LECTURA POR BLOQUES Y EN PARALELO DE LA CARPETA 'menciones'
+#
+# Cada archivo de menciones se lee en bloques de filas (pd.read_csv con
+# chunksize y solo las columnas necesarias), de modo que la memoria no depende
+# del tamaño del archivo. Los archivos se reparten entre procesos; cada proceso
+# construye el buscador de menciones una sola vez y retorna, por archivo, las
+# sumas parciales de peso por (source, target). El proceso principal solo junta
+# esos resultados.
+#
+# La regla de co-mención es propia de cada generador: se pasa como una función
+# de nivel de módulo scan_chunk(df, matcher, context) que retorna aristas
+# (ver network_edges.edges_from_matches).
+# =============================================================================
+
+# --- CONFIGURACIÓN ---
+CHUNK_SIZE = 50_000  # Filas por bloque al leer cada archivo
+MAX_WORKERS = os.cpu_count() or 1
+
+_worker_matcher = None
+
+
+def _init_worker(search_map):
+    """Construye el buscador una sola vez por proceso."""
+    global _worker_matcher
+    _worker_matcher = MentionMatcher(search_map)
+
+
+def _reduce_edges(edges, totals):
+    """Suma los pesos de 'edges' en el diccionario {(source, target): peso}."""
+    if not len(edges['weight']):
+        return
+    partial = (pd.DataFrame({'source': edges['source'], 'target': edges['target'], 'weight': edges['weight']})
+               .groupby(['source', 'target'], sort=False)['weight'].sum())
+    for pair, weight in partial.items():
+        totals[pair] = totals.get(pair, 0.0) + weight
+
+
+def _scan_file(file_path, context, scan_chunk, usecols, chunk_size):
+    """Procesa un archivo bloque a bloque. Retorna (sumas por (source, target), filas, error)."""
+    totals = {}
+    rows = 0
+    try:
+        reader = pd.read_csv(file_path, usecols=lambda col: col in usecols, chunksize=chunk_size)
+        for chunk in reader:
+            rows += len(chunk)
+            _reduce_edges(scan_chunk(chunk.reset_index(drop=True), _worker_matcher, context), totals)
+    except Exception as e:
+        return totals, rows, str(e)
+    return totals, rows, None
+
+
+def _totals_to_edges(totals, unit_key):
+    if not totals:
+        return empty_edges()
+    pairs = list(totals)
+    return {'source': np.array([source for source, _ in pairs], dtype=object),
+            'target': np.array([target for _, target in pairs], dtype=object),
+            'weight': np.fromiter(totals.values(), dtype='float64', count=len(pairs)),
+            'key': np.full(len(pairs), unit_key, dtype=object)}
+
+
+def scan_mention_files(files, scan_chunk, search_map, usecols, chunk_size=CHUNK_SIZE, max_workers=MAX_WORKERS):
+    """
+    Escanea los archivos de menciones y retorna sus aristas consolidadas por archivo.
+
+    Args:
+        files (list): Tuplas (ruta, unidad del índice, contexto para scan_chunk).
+        scan_chunk (callable): Regla del generador, scan_chunk(df, matcher, context) -> aristas.
+        search_map (dict): {término: ID canónico} para el buscador de menciones.
+        usecols (set): Columnas a leer de cada archivo.
+
+    Returns:
+        tuple: (lista de aristas con 'key' por archivo, unidades procesadas sin error)
+    """
+    edge_sets, processed_units = [], []
+    if not files:
+        return edge_sets, processed_units
+
+    workers = max(1, min(max_workers, len(files)))
+    args = [(path, context, scan_chunk, usecols, chunk_size) for path, _, context in files]
+    if workers == 1:
+        # Un solo archivo o un solo núcleo: no vale la pena levantar procesos
+        _init_worker(search_map)
+        results = [_scan_file(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(search_map,)) as pool:
+            futures = [pool.submit(_scan_file, *arg) for arg in args]
+            results = [future.result() for future in futures]
+
+    for (path, unit_key, _), (totals, rows, error) in zip(files, results):
+        if error is not None:
+            print(f"  ⚠️  Error procesando el archivo {path}: {error}")
+            continue
+        edge_sets.append(_totals_to_edges(totals, unit_key))
+        processed_units.append(unit_key)
+    return edge_sets, processed_units
@@ -0,0 +1,143 @@
+from collections import deque
+
+# =============================================================================
+# BUSCADOR DE MENCIONES MULTI-PATRÓN (AHO-CORASICK)
+#
+# Los generadores de red buscaban cada término (username, @handle o nombre real)
+# con su propia expresión regular: el costo crecía con filas × términos. Este
+# módulo construye un solo autómata con todos los términos y encuentra todas
+# las coincidencias recorriendo cada texto una única vez, con las mismas reglas
+# que el patrón original  @término\b | \btérmino\b  (sin distinguir mayúsculas).
+#
+# Si la librería opcional 'pyahocorasick' está instalada se usa su autómata en
+# C; si no, se usa la implementación en Python de este archivo.
+# =============================================================================
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+# --- FUNCIONES AUXILIARES ---
+
+def _fold_case(text):
+    """Minúsculas carácter por carácter, conservando las posiciones del texto original."""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    # Algunos caracteres (p. ej. 'İ') cambian de longitud al pasar a minúsculas
+    return "".join(lower if len(lower) == 1 else char for char, lower in ((c, c.lower()) for c in text))
+
+
+def _is_word_char(char):
+    # Misma definición que \w en las expresiones regulares de Python
+    return char.isalnum() or char == '_'
+
+
+def _is_boundary(text, position):
+    """Equivalente a \\b en 'position'."""
+    before = position > 0 and _is_word_char(text[position - 1])
+    after = position < len(text) and _is_word_char(text[position])
+    return before != after
+
+
+class MentionMatcher:
+    """Encuentra en un texto todos los términos de búsqueda y retorna sus IDs canónicos."""
+
+    def __init__(self, search_map):
+        """
+        Args:
+            search_map (dict): {término a buscar: ID canónico del candidato}.
+        """
+        self.terms = {}
+        for term, target in search_map.items():
+            term = str(term).strip()
+            if term:
+                self.terms.setdefault(_fold_case(term), set()).add(target)
+        if ahocorasick is not None:
+            self._build_native()
+        else:
+            self._build_python()
+
+    def _build_native(self):
+        automaton = ahocorasick.Automaton()
+        for term, targets in self.terms.items():
+            automaton.add_word(term, (len(term), frozenset(targets)))
+        if self.terms:
+            automaton.make_automaton()
+            self._native = automaton
+        else:
+            self._native = None
+        self._iter_matches = self._iter_matches_native
+
+    def _build_python(self):
+        # Trie: transiciones por estado, salidas (longitud, targets) por estado
+        goto = [{}]
+        outputs = [[]]
+        for term, targets in self.terms.items():
+            state = 0
+            for char in term:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append((len(term), frozenset(targets)))
+
+        # Enlaces de fallo (BFS) y salidas heredadas
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                candidate = goto[fallback].get(char, 0)
+                fail[next_state] = candidate if candidate != next_state else 0
+                outputs[next_state] = outputs[next_state] + outputs[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+        self._iter_matches = self._iter_matches_python
+
+    def _iter_matches_native(self, folded):
+        if self._native is None:
+            return
+        for end, (length, targets) in self._native.iter(folded):
+            yield end + 1 - length, end + 1, targets
+
+    def _iter_matches_python(self, folded):
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for position, char in enumerate(folded):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                for length, targets in outputs[state]:
+                    yield position + 1 - length, position + 1, targets
+
+    def find_targets(self, text):
+        """
+        Retorna el conjunto de IDs canónicos mencionados en 'text'.
+
+        Una coincidencia cuenta si termina en un límite de palabra y empieza en un
+        límite de palabra o justo después de '@'.
+        """
+        if not isinstance(text, str) or not text:
+            return set()
+        folded = _fold_case(text)
+        found = set()
+        for start, end, targets in self._iter_matches(folded):
+            if targets <= found:
+                continue
+            if _is_boundary(folded, end) and (
+                    (start > 0 and folded[start - 1] == '@') or _is_boundary(folded, start)):
+                found |= targets
+        return found
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import sqlite3
+
+import pandas as pd
+
+# =============================================================================
+# ÍNDICE INCREMENTAL DE ARISTAS DE LA RED
+#
+# Guarda, por cada unidad de origen (un post de la base: 'post:<shortcode>', o
+# un archivo de la carpeta 'menciones': 'file:<nombre>'), las aristas que
+# produjo y una huella de su contenido. En la siguiente ejecución solo se
+# vuelven a escanear las unidades nuevas o cambiadas, y los pesos consolidados
+# (source, target) se actualizan por diferencia: se resta lo que aportaba la
+# versión anterior de la unidad y se suma lo nuevo.
+#
+# Cada generador usa su propio 'scope' (sus reglas de búsqueda son distintas).
+# Si cambia el conjunto de alias (perfiles_instagram.txt o el JSON de nombres
+# reales), el índice de ese scope se descarta y se reescanea todo.
+# =============================================================================
+
+# --- CONFIGURACIÓN ---
+INDEX_FILE = "indice_red_aristas.db"
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS index_meta (
+    scope TEXT PRIMARY KEY,
+    alias_version TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS units (
+    scope TEXT NOT NULL,
+    unit_key TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    PRIMARY KEY (scope, unit_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS edges (
+    scope TEXT NOT NULL,
+    unit_key TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    weight REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_edges_unit ON edges(scope, unit_key);
+CREATE TABLE IF NOT EXISTS consolidated (
+    scope TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    weight REAL NOT NULL,
+    edge_count INTEGER NOT NULL,
+    PRIMARY KEY (scope, source, target)
+) WITHOUT ROWID;
+"""
+
+
+def alias_version(search_map, rules=""):
+    """Huella del conjunto de términos de búsqueda (y de las reglas del generador)."""
+    payload = json.dumps([sorted((str(k), str(v)) for k, v in search_map.items()), rules], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class NetworkEdgeIndex:
+    """Índice de aristas por unidad de origen con pesos consolidados actualizados por diferencia."""
+
+    def __init__(self, scope, version, index_file=INDEX_FILE):
+        self.scope = scope
+        self.conn = sqlite3.connect(index_file, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA_SQL)
+        row = self.conn.execute("SELECT alias_version FROM index_meta WHERE scope = ?", (scope,)).fetchone()
+        self.rebuilt = row is None or row[0] != version
+        if self.rebuilt:
+            with self.conn:
+                for table in ('units', 'edges', 'consolidated'):
+                    self.conn.execute(f"DELETE FROM {table} WHERE scope = ?", (scope,))
+                self.conn.execute("INSERT OR REPLACE INTO index_meta (scope, alias_version) VALUES (?, ?)",
+                                  (scope, version))
+
+    def pending(self, fingerprints, prefix):
+        """
+        Compara las unidades actuales con las indexadas.
+
+        Args:
+            fingerprints (dict): {unit_key: huella} de las unidades actuales con ese prefijo.
+            prefix (str): 'post:' o 'file:'.
+
+        Returns:
+            tuple: (claves nuevas o cambiadas, claves indexadas que ya no existen)
+        """
+        stored = dict(self.conn.execute(
+            "SELECT unit_key, fingerprint FROM units WHERE scope = ? AND unit_key >= ? AND unit_key < ?",
+            (self.scope, prefix, prefix + '￿')))
+        changed = [key for key, fingerprint in fingerprints.items() if stored.get(key) != fingerprint]
+        removed = [key for key in stored if key not in fingerprints]
+        return changed, removed
+
+    def _apply_consolidated_delta(self, rows):
+        self.conn.executemany(
+            "INSERT INTO consolidated (scope, source, target, weight, edge_count) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(scope, source, target) DO UPDATE SET "
+            "weight = weight + excluded.weight, edge_count = edge_count + excluded.edge_count", rows)
+
+    def update(self, fingerprints, removed_keys, edges):
+        """
+        Reemplaza las aristas de las unidades dadas y ajusta los pesos consolidados.
+
+        Args:
+            fingerprints (dict): {unit_key: huella} de las unidades reescaneadas.
+            removed_keys (list): Unidades que desaparecieron.
+            edges (dict): Arreglos 'key', 'source', 'target', 'weight' de las unidades reescaneadas.
+        """
+        keys = list(fingerprints) + list(removed_keys)
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS touched_units (unit_key TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM touched_units")
+            self.conn.executemany("INSERT OR IGNORE INTO touched_units VALUES (?)", ((key,) for key in keys))
+
+            # 1. Restar lo que aportaban las versiones anteriores de las unidades
+            old = self.conn.execute(
+                "SELECT source, target, -SUM(weight), -COUNT(*) FROM edges "
+                "WHERE scope = ? AND unit_key IN (SELECT unit_key FROM touched_units) GROUP BY source, target",
+                (self.scope,)).fetchall()
+            self._apply_consolidated_delta((self.scope, *row) for row in old)
+            self.conn.execute("DELETE FROM edges WHERE scope = ? AND unit_key IN (SELECT unit_key FROM touched_units)",
+                              (self.scope,))
+
+            # 2. Sumar las aristas nuevas
+            if len(edges['weight']):
+                self.conn.executemany(
+                    "INSERT INTO edges (scope, unit_key, source, target, weight) VALUES (?, ?, ?, ?, ?)",
+                    ((self.scope, key, source, target, float(weight)) for key, source, target, weight
+                     in zip(edges['key'], edges['source'], edges['target'], edges['weight'])))
+                new = (pd.DataFrame({'source': edges['source'], 'target': edges['target'], 'weight': edges['weight']})
+                       .groupby(['source', 'target'])['weight'].agg(['sum', 'count']).reset_index())
+                self._apply_consolidated_delta(
+                    (self.scope, source, target, float(total), int(count))
+                    for source, target, total, count in new.itertuples(index=False))
+            self.conn.execute("DELETE FROM consolidated WHERE scope = ? AND edge_count <= 0", (self.scope,))
+
+            # 3. Registrar las huellas
+            self.conn.executemany("DELETE FROM units WHERE scope = ? AND unit_key = ?",
+                                  ((self.scope, key) for key in removed_keys))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO units (scope, unit_key, fingerprint) VALUES (?, ?, ?)",
+                ((self.scope, key, fingerprint) for key, fingerprint in fingerprints.items()))
+
+    def raw_edges(self):
+        """Todas las aristas indexadas (source, target, weight)."""
+        return pd.read_sql_query("SELECT source, target, weight FROM edges WHERE scope = ? ORDER BY rowid",
+                                 self.conn, params=(self.scope,))
+
+    def consolidated(self):
+        """Pesos consolidados por (source, target)."""
+        return pd.read_sql_query("SELECT source, target, weight FROM consolidated WHERE scope = ? "
+                                 "ORDER BY source, target", self.conn, params=(self.scope,))
+
+    def close(self):
+        self.conn.close()
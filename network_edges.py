@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# CONSTRUCCIÓN VECTORIZADA DE ARISTAS PARA LOS GENERADORES DE RED
+#
+# Funciones compartidas por 9_network_graph_generator.py y
+# _9_2_generadorgrafo_actualizado.py:
+# - El texto a escanear de todas las filas se arma en una sola pasada por
+#   columnas (solo las columnas de texto relevantes), sin iterrows().
+# - El peso de impacto se calcula como columna numpy.
+# - Las aristas se acumulan en arreglos (source, target, weight) y el
+#   DataFrame se crea una sola vez al final.
+# =============================================================================
+
+# --- CONFIGURACIÓN ---
+SCAN_TEXT_COLUMNS = ['post_caption', 'usertags', 'post_transcript']
+LIKES_WEIGHT = 0.1
+COMMENTS_WEIGHT = 0.25
+EDGE_COLUMNS = ['source', 'target', 'weight']
+
+
+def build_scan_text(df, columns=SCAN_TEXT_COLUMNS):
+    """Une las columnas de texto presentes en 'df' (faltantes como cadena vacía) en un arreglo de textos."""
+    present = [col for col in columns if col in df.columns]
+    if not present or df.empty:
+        return np.full(len(df), '', dtype=object)
+    parts = [df[col].astype(object).where(df[col].notna(), '').astype(str) for col in present]
+    text = parts[0]
+    for part in parts[1:]:
+        text = text + ' ' + part
+    return text.to_numpy(dtype=object)
+
+
+def impact_weights(df):
+    """Peso de impacto por fila: 1 + likes * 0.1 + comentarios * 0.25 (faltantes = 0)."""
+    likes = pd.to_numeric(df['likes_count'], errors='coerce') if 'likes_count' in df.columns else pd.Series(0, index=df.index)
+    comments = pd.to_numeric(df['comments_count'], errors='coerce') if 'comments_count' in df.columns else pd.Series(0, index=df.index)
+    return (1 + likes.fillna(0).to_numpy(dtype='float64') * LIKES_WEIGHT
+            + comments.fillna(0).to_numpy(dtype='float64') * COMMENTS_WEIGHT)
+
+
+def empty_edges():
+    return {'source': np.array([], dtype=object), 'target': np.array([], dtype=object),
+            'weight': np.array([], dtype='float64')}
+
+
+def edges_from_matches(row_indices, targets, sources, weights, keys=None):
+    """
+    Arma los arreglos de aristas a partir de las coincidencias encontradas.
+
+    Args:
+        row_indices (list): Fila de origen de cada arista.
+        targets (list): Candidato destino de cada arista.
+        sources (np.ndarray): Autor de cada fila.
+        weights (np.ndarray): Peso de impacto de cada fila.
+        keys (np.ndarray | str, opcional): Unidad de origen de cada fila (o una sola para
+            todas), usada por el índice incremental (network_edge_index.py).
+    """
+    if not row_indices:
+        return empty_edges()
+    rows = np.asarray(row_indices, dtype='int64')
+    edges = {'source': np.asarray(sources, dtype=object)[rows],
+             'target': np.asarray(targets, dtype=object),
+             'weight': np.asarray(weights, dtype='float64')[rows]}
+    if isinstance(keys, str):
+        edges['key'] = np.full(len(rows), keys, dtype=object)
+    elif keys is not None:
+        edges['key'] = np.asarray(keys, dtype=object)[rows]
+    return edges
+
+
+def concat_edges(*edge_sets):
+    """Concatena varios conjuntos de aristas en uno solo (incluye 'key' si todos la tienen)."""
+    edge_sets = [edges for edges in edge_sets if len(edges['weight'])]
+    if not edge_sets:
+        return empty_edges()
+    columns = EDGE_COLUMNS + (['key'] if all('key' in edges for edges in edge_sets) else [])
+    return {col: np.concatenate([edges[col] for edges in edge_sets]) for col in columns}
+
+
+def edges_to_frame(edges):
+    """DataFrame (source, target, weight) construido una sola vez desde los arreglos."""
+    return pd.DataFrame({col: edges[col] for col in EDGE_COLUMNS})
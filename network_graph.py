@@ -0,0 +1,166 @@
+import hashlib
+import json
+
+import igraph as ig
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# REPRESENTACIÓN DISPERSA DE LA RED (ARREGLOS COO / CSR)
+#
+# Convierte las conexiones consolidadas (source, target, weight) en índices
+# enteros una sola vez. A partir de esos arreglos se construye el grafo de
+# igraph (para Leiden) y se calculan con NumPy la fuerza y el grado de cada
+# nodo y los tamaños visuales normalizados, sin pasadas adicionales de pandas.
+#
+# También calcula posiciones fijas de los nodos (layout de igraph) y exporta un
+# HTML liviano de vis-network con la física apagada, para que el navegador no
+# tenga que simular la red al abrir el mapa.
+# =============================================================================
+
+# --- CONFIGURACIÓN ---
+LAYOUT_SCALE = 1500  # Medio ancho (en píxeles de vis-network) del área del layout
+LAYOUT_SEED = 42
+COMMUNITY_ATTRACTION = 3.0  # Las aristas dentro de una misma comunidad atraen más en el layout
+VIS_NETWORK_JS = "https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/vis-network.min.js"
+
+STATIC_HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{vis_js}"></script>
+<style>html,body{{margin:0;height:100%;background:{bgcolor}}}#mynetwork{{width:100%;height:100%}}</style>
+</head>
+<body>
+<div id="mynetwork"></div>
+<script>
+var data={data};
+function htmlTitle(item){{if(item.title){{var el=document.createElement("div");el.innerHTML=item.title;item.title=el;}}return item;}}
+new vis.Network(document.getElementById("mynetwork"),
+  {{nodes:new vis.DataSet(data.nodes.map(htmlTitle)),edges:new vis.DataSet(data.edges.map(htmlTitle))}},data.options);
+</script>
+</body>
+</html>
+"""
+
+
+def normalize_range(values, visual_min, visual_max, mask=None):
+    """
+    Escala 'values' linealmente a [visual_min, visual_max] según su mínimo y máximo.
+
+    Si se da 'mask', el mínimo y el máximo salen solo de esos valores y el
+    resto de posiciones recibe 'visual_min'.
+    """
+    values = np.asarray(values, dtype='float64')
+    reference = values[mask] if mask is not None else values
+    if not len(reference):
+        return np.full(len(values), float(visual_min))
+    low, high = reference.min(), reference.max()
+    value_range = high - low if high > low else 1
+    scaled = visual_min + (values - low) / value_range * (visual_max - visual_min)
+    if mask is not None:
+        scaled = np.where(mask, scaled, visual_min)
+    return scaled
+
+
+class NetworkArrays:
+    """Red dirigida con nodos indexados por enteros y aristas en formato COO."""
+
+    def __init__(self, names, sources, targets, weights):
+        """
+        Args:
+            names (np.ndarray): Nombre de cada nodo (posición = índice del nodo).
+            sources, targets (np.ndarray): Índices enteros de origen y destino de cada arista.
+            weights (np.ndarray): Peso de cada arista.
+        """
+        self.names = names
+        self.sources = sources
+        self.targets = targets
+        self.weights = weights
+        self.num_nodes = len(names)
+
+    @classmethod
+    def from_edges(cls, df, source_col='source', target_col='target', weight_col='weight'):
+        """Factoriza los nombres de un DataFrame de conexiones a índices enteros."""
+        codes, names = pd.factorize(pd.concat([df[source_col], df[target_col]], ignore_index=True))
+        num_edges = len(df)
+        return cls(np.asarray(names, dtype=object), codes[:num_edges].astype('int64'),
+                   codes[num_edges:].astype('int64'), df[weight_col].to_numpy(dtype='float64'))
+
+    # --- Métricas por nodo ---
+
+    def in_strength(self):
+        """Suma de pesos de las aristas que llegan a cada nodo (relevancia real)."""
+        return np.bincount(self.targets, weights=self.weights, minlength=self.num_nodes)
+
+    def out_strength(self):
+        return np.bincount(self.sources, weights=self.weights, minlength=self.num_nodes)
+
+    def in_degree(self):
+        return np.bincount(self.targets, minlength=self.num_nodes)
+
+    def out_degree(self):
+        return np.bincount(self.sources, minlength=self.num_nodes)
+
+    def csr(self):
+        """Aristas salientes en formato CSR: (indptr, vecinos, pesos)."""
+        order = np.argsort(self.sources, kind='stable')
+        indptr = np.zeros(self.num_nodes + 1, dtype='int64')
+        np.cumsum(self.out_degree(), out=indptr[1:])
+        return indptr, self.targets[order], self.weights[order]
+
+    def edges_hash(self):
+        """Huella de los datos de la red (nombres, aristas y pesos)."""
+        digest = hashlib.sha1("\x1f".join(map(str, self.names)).encode('utf-8'))
+        for array in (self.sources, self.targets, self.weights):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def subnetwork(self, edge_mask):
+        """
+        Red con solo las aristas de 'edge_mask' y los nodos que las tocan.
+
+        Returns:
+            tuple: (NetworkArrays con índices locales, índice global de cada nodo local)
+        """
+        sources, targets = self.sources[edge_mask], self.targets[edge_mask]
+        node_ids, local = np.unique(np.concatenate([sources, targets]), return_inverse=True)
+        num_edges = len(sources)
+        return (NetworkArrays(self.names[node_ids], local[:num_edges], local[num_edges:], self.weights[edge_mask]),
+                node_ids)
+
+    # --- Construcción de igraph ---
+
+    def to_igraph(self):
+        """Grafo dirigido de igraph con atributos 'name' (nodos) y 'weight' (aristas)."""
+        return ig.Graph(n=self.num_nodes, edges=np.column_stack([self.sources, self.targets]).tolist(),
+                        directed=True, vertex_attrs={'name': list(self.names)},
+                        edge_attrs={'weight': self.weights.tolist()})
+
+
+def compute_layout(network, membership, scale=LAYOUT_SCALE, seed=LAYOUT_SEED):
+    """
+    Posiciones (x, y) de cada nodo con Fruchterman-Reingold de igraph.
+
+    El peso de cada arista es log(1 + peso), multiplicado por COMMUNITY_ATTRACTION
+    si une dos nodos de la misma comunidad de Leiden, para que las comunidades
+    queden agrupadas. El resultado es determinista para la misma red.
+    """
+    membership = np.asarray(membership)
+    same_community = membership[network.sources] == membership[network.targets]
+    layout_weights = np.log1p(network.weights) * np.where(same_community, COMMUNITY_ATTRACTION, 1.0)
+    start = np.random.default_rng(seed).uniform(-1, 1, size=(network.num_nodes, 2))
+    coords = np.asarray(network.to_igraph().layout_fruchterman_reingold(
+        weights=layout_weights.tolist(), seed=start.tolist()).coords, dtype='float64')
+    coords -= coords.mean(axis=0)
+    extent = np.abs(coords).max()
+    return coords * (scale / extent) if extent > 0 else coords
+
+
+def export_static_html(output_file, nodes, edges, options, bgcolor="#222222", title="Mapa de red"):
+    """Escribe un HTML de vis-network con los datos como JSON compacto (sin panel ni física)."""
+    data = json.dumps({'nodes': nodes, 'edges': edges, 'options': options},
+                      ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(STATIC_HTML_TEMPLATE.format(title=title, vis_js=VIS_NETWORK_JS, bgcolor=bgcolor, data=data))
@@ -0,0 +1,125 @@
+import sqlite3
+
+import leidenalg as la
+import numpy as np
+
+# =============================================================================
+# PARTICIONES DE LEIDEN POR UMBRAL, CON ARRANQUE EN CALIENTE Y CACHÉ EN DISCO
+#
+# Para un rango de umbrales de peso se calcula la partición de comunidades de
+# la red filtrada en una sola ejecución:
+# - La red completa se indexa una vez (network_graph.NetworkArrays) y cada
+#   umbral es solo una máscara sobre sus aristas.
+# - Los umbrales se recorren de mayor a menor (la red va creciendo) y cada
+#   Leiden arranca desde la partición del umbral anterior.
+# - Cada partición se guarda en 'cache_particiones_red.db' con clave
+#   (huella de la red completa, umbral, semilla, arranque). El arranque es la
+#   cadena de umbrales de los que viene la partición inicial ('' si Leiden
+#   arrancó en frío): el mismo umbral solo, o dentro de un barrido, puede dar
+#   otra partición, así que cada caso se guarda por separado.
+# =============================================================================
+
+# --- CONFIGURACIÓN ---
+CACHE_FILE = "cache_particiones_red.db"
+LEIDEN_SEED = 42  # Semilla fija: la misma red, umbral y arranque dan la misma partición
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS leiden_partitions (
+    edges_hash TEXT NOT NULL,
+    threshold REAL NOT NULL,
+    seed INTEGER NOT NULL,
+    warm_start TEXT NOT NULL,
+    membership BLOB NOT NULL,
+    modularity REAL NOT NULL,
+    PRIMARY KEY (edges_hash, threshold, seed, warm_start)
+);
+"""
+
+
+class PartitionCache:
+    """
+    Particiones guardadas por (huella de la red, umbral, semilla, arranque).
+    La membresía es por nodo global (-1 = ausente).
+    """
+
+    def __init__(self, cache_file=CACHE_FILE):
+        self.conn = sqlite3.connect(cache_file, timeout=60)
+        self.conn.executescript(SCHEMA_SQL)
+
+    def get(self, edges_hash, threshold, seed, warm_start):
+        row = self.conn.execute(
+            "SELECT membership, modularity FROM leiden_partitions "
+            "WHERE edges_hash = ? AND threshold = ? AND seed = ? AND warm_start = ?",
+            (edges_hash, float(threshold), int(seed), warm_start)).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype='int32').copy(), row[1]
+
+    def put(self, edges_hash, threshold, seed, warm_start, membership, modularity):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO leiden_partitions "
+                "(edges_hash, threshold, seed, warm_start, membership, modularity) VALUES (?, ?, ?, ?, ?, ?)",
+                (edges_hash, float(threshold), int(seed), warm_start,
+                 np.asarray(membership, dtype='int32').tobytes(), float(modularity)))
+
+    def close(self):
+        self.conn.close()
+
+
+def _initial_membership(previous, node_ids):
+    """Membresía inicial para los nodos 'node_ids' a partir de la partición anterior (nodos nuevos: solos)."""
+    labels = previous[node_ids].astype('int64')
+    missing = labels < 0
+    labels[missing] = labels.max(initial=-1) + 1 + np.arange(missing.sum())
+    # Leiden espera etiquetas consecutivas desde 0
+    return np.unique(labels, return_inverse=True)[1].tolist()
+
+
+def threshold_partitions(network, thresholds, cache_file=CACHE_FILE, seed=LEIDEN_SEED):
+    """
+    Calcula (o lee de la caché) la partición de Leiden para cada umbral.
+
+    El resultado de un umbral depende de los umbrales mayores pedidos junto con
+    él (su partición es el arranque); la clave de la caché lo incluye.
+
+    Args:
+        network (NetworkArrays): Red completa, sin filtrar.
+        thresholds (list): Umbrales mínimos de peso.
+
+    Returns:
+        dict: {umbral: (membresía por nodo global, -1 si el nodo no está; modularidad)}
+    """
+    cache = PartitionCache(cache_file)
+    edges_hash = network.edges_hash()
+    results = {}
+    previous = None
+    previous_chain = ''  # Umbrales de los que viene 'previous', p. ej. '250.0,150.0' ('' = sin arranque)
+    try:
+        for threshold in sorted(set(float(t) for t in thresholds), reverse=True):
+            warm_start = previous_chain
+            cached = cache.get(edges_hash, threshold, seed, warm_start)
+            if cached is not None:
+                results[threshold] = cached
+                previous = cached[0]
+                previous_chain = f"{warm_start},{threshold!r}".lstrip(',')
+                continue
+
+            membership = np.full(network.num_nodes, -1, dtype='int32')
+            edge_mask = network.weights >= threshold
+            if not edge_mask.any():
+                results[threshold] = (membership, 0.0)
+                continue
+
+            subnetwork, node_ids = network.subnetwork(edge_mask)
+            initial = _initial_membership(previous, node_ids) if previous is not None else None
+            partition = la.find_partition(subnetwork.to_igraph(), la.ModularityVertexPartition,
+                                          initial_membership=initial, weights='weight', seed=seed)
+            membership[node_ids] = partition.membership
+            cache.put(edges_hash, threshold, seed, warm_start, membership, partition.modularity)
+            results[threshold] = (membership, partition.modularity)
+            previous = membership
+            previous_chain = f"{warm_start},{threshold!r}".lstrip(',')
+    finally:
+        cache.close()
+    return results
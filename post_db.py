@@ -0,0 +1,388 @@
+import csv
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+# =============================================================================
+# BASE DE DATOS DE POSTS (SQLITE) CON ÍNDICE POR SHORTCODE
+#
+# Fuente principal de los posts recolectados. Cada post es una fila única con
+# clave primaria 'post_shortcode', de modo que:
+# - Insertar posts nuevos, refrescar métricas o llenar transcripciones cuesta
+#   O(filas cambiadas) en lugar de reescribir todo el archivo.
+# - La deduplicación es una búsqueda en el índice, no un set con todo el CSV.
+# - El modo WAL permite leer mientras otro proceso escribe.
+# - Cada consulta de métricas queda guardada en 'metric_snapshots' (serie de
+#   tiempo solo de inserción), mientras 'posts' conserva el último valor.
+#
+# La primera vez que se abre, si la base está vacía y existe el CSV histórico
+# 'base_de_datos_instagram.csv', se importa automáticamente. Ejecutar este
+# archivo directamente exporta la base a CSV para uso externo.
+# =============================================================================
+
+# --- CONFIGURACIÓN ---
+DB_FILE = "base_de_datos_instagram.db"
+LEGACY_CSV_FILE = "base_de_datos_instagram.csv"
+NO_DATE_MONTH = "sin_fecha"
+
+# Orden de columnas del CSV original
+POST_COLUMNS = [
+    'timestamp_registro', 'username', 'followers_count', 'posts_count_total',
+    'following_count', 'post_id', 'post_created_at_str', 'post_shortcode', 'post_url',
+    'likes_count', 'comments_count', 'post_caption', 'media_type', 'play_count', 'usertags', 'post_transcript'
+]
+INTEGER_COLUMNS = [
+    'followers_count', 'posts_count_total', 'following_count',
+    'likes_count', 'comments_count', 'media_type', 'play_count'
+]
+# Columnas que se actualizan cuando un post ya existente vuelve a llegar de la API
+REFRESH_ON_CONFLICT = [
+    'timestamp_registro', 'followers_count', 'posts_count_total', 'following_count',
+    'likes_count', 'comments_count', 'play_count'
+]
+
+_MONTH_EXPR = "COALESCE(substr({row}.post_created_at_str, 1, 7), '" + NO_DATE_MONTH + "')"
+
+SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS posts (
+    post_shortcode TEXT PRIMARY KEY,
+    timestamp_registro TEXT,
+    username TEXT,
+    followers_count INTEGER,
+    posts_count_total INTEGER,
+    following_count INTEGER,
+    post_id TEXT,
+    post_created_at_str TEXT,
+    post_url TEXT,
+    likes_count INTEGER,
+    comments_count INTEGER,
+    post_caption TEXT,
+    media_type INTEGER,
+    play_count INTEGER,
+    usertags TEXT,
+    post_transcript TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_posts_created ON posts(post_created_at_str);
+CREATE INDEX IF NOT EXISTS idx_posts_username_created ON posts(username, post_created_at_str);
+
+-- Meses con cambios pendientes de propagar al almacenamiento columnar
+CREATE TABLE IF NOT EXISTS dirty_months (
+    month TEXT PRIMARY KEY,
+    changes INTEGER NOT NULL
+);
+-- Serie de tiempo de métricas: una fila de enteros por consulta (sin rowid, clave compacta)
+CREATE TABLE IF NOT EXISTS metric_snapshots (
+    post_shortcode TEXT NOT NULL,
+    fetched_at INTEGER NOT NULL,
+    likes INTEGER,
+    comments INTEGER,
+    plays INTEGER,
+    PRIMARY KEY (post_shortcode, fetched_at)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_posts_insert AFTER INSERT ON posts BEGIN
+    INSERT INTO dirty_months(month, changes) VALUES ({_MONTH_EXPR.format(row='NEW')}, 1)
+    ON CONFLICT(month) DO UPDATE SET changes = changes + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_posts_update AFTER UPDATE ON posts BEGIN
+    INSERT INTO dirty_months(month, changes) VALUES ({_MONTH_EXPR.format(row='NEW')}, 1)
+    ON CONFLICT(month) DO UPDATE SET changes = changes + 1;
+    INSERT INTO dirty_months(month, changes) VALUES ({_MONTH_EXPR.format(row='OLD')}, 1)
+    ON CONFLICT(month) DO UPDATE SET changes = changes + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_posts_delete AFTER DELETE ON posts BEGIN
+    INSERT INTO dirty_months(month, changes) VALUES ({_MONTH_EXPR.format(row='OLD')}, 1)
+    ON CONFLICT(month) DO UPDATE SET changes = changes + 1;
+END;
+"""
+
+
+# --- FUNCIONES AUXILIARES ---
+
+def _normalize_row(row):
+    """Convierte una fila (lista en el orden de POST_COLUMNS o dict) a los tipos de la tabla."""
+    values = dict(zip(POST_COLUMNS, row)) if not isinstance(row, dict) else dict(row)
+    for col in INTEGER_COLUMNS:
+        value = values.get(col)
+        try:
+            values[col] = int(float(value)) if value not in (None, '', 'N/A') else None
+        except (TypeError, ValueError):
+            values[col] = None
+    for col in ('post_created_at_str', 'timestamp_registro'):
+        if values.get(col) in ('', 'N/A'):
+            values[col] = None
+    for col in ('post_id', 'post_shortcode'):
+        if values.get(col) is not None:
+            values[col] = str(values[col])
+    return [values.get(col) for col in POST_COLUMNS]
+
+
+def _fetched_at(timestamp_registro):
+    """Segundos Unix de un 'timestamp_registro' (hora local); la hora actual si no se puede leer."""
+    try:
+        return int(datetime.strptime(timestamp_registro[:19], '%Y-%m-%d %H:%M:%S').timestamp())
+    except (TypeError, ValueError):
+        return int(time.time())
+
+
+def _insert_snapshots(conn, snapshots):
+    """Inserta (shortcode, fetched_at, likes, comments, plays); una medición repetida en el mismo segundo se ignora."""
+    conn.executemany(
+        "INSERT OR IGNORE INTO metric_snapshots (post_shortcode, fetched_at, likes, comments, plays) "
+        "VALUES (?, ?, ?, ?, ?)", snapshots)
+
+
+def _import_legacy_csv(conn, csv_file):
+    """Importa el CSV histórico una sola vez (las filas repetidas conservan sus últimas métricas)."""
+    print(f"🗄️ Importando '{csv_file}' a la base de datos '{DB_FILE}' (solo la primera vez)...")
+    with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return 0
+        rows = (dict(zip(header, row)) for row in reader)
+        imported = upsert_posts(conn, (row for row in rows if row.get('post_shortcode')))
+    print(f"  ✅ {imported} filas importadas.")
+    return imported
+
+
+# --- API PÚBLICA ---
+
+def connect(db_file=DB_FILE, legacy_csv_file=LEGACY_CSV_FILE):
+    """
+    Abre la base de datos (modo WAL), crea el esquema si no existe y migra el CSV
+    histórico si la base está vacía. Cada hilo debe usar su propia conexión.
+    """
+    conn = sqlite3.connect(db_file, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA_SQL)
+    if legacy_csv_file and os.path.exists(legacy_csv_file):
+        is_empty = conn.execute("SELECT 1 FROM posts LIMIT 1").fetchone() is None
+        if is_empty:
+            _import_legacy_csv(conn, legacy_csv_file)
+    return conn
+
+
+def upsert_posts(conn, rows):
+    """
+    Inserta posts nuevos. Si el shortcode ya existe, solo se refrescan las
+    métricas y los datos del perfil; el texto y la transcripción existentes se conservan
+    (la transcripción se completa si estaba vacía).
+    Retorna el número de filas procesadas.
+    """
+    placeholders = ", ".join("?" for _ in POST_COLUMNS)
+    updates = ", ".join(f"{col} = excluded.{col}" for col in REFRESH_ON_CONFLICT)
+    sql = (
+        f"INSERT INTO posts ({', '.join(POST_COLUMNS)}) VALUES ({placeholders}) "
+        f"ON CONFLICT(post_shortcode) DO UPDATE SET {updates}, "
+        f"post_transcript = CASE WHEN posts.post_transcript IS NULL OR posts.post_transcript IN ('', 'N/A') "
+        f"THEN excluded.post_transcript ELSE posts.post_transcript END"
+    )
+    rows = [_normalize_row(row) for row in rows]
+    idx = {col: POST_COLUMNS.index(col) for col in
+           ('post_shortcode', 'timestamp_registro', 'likes_count', 'comments_count', 'play_count')}
+    with conn:
+        cursor = conn.executemany(sql, rows)
+        # Cada fila que llega de la API es también una medición de sus métricas
+        _insert_snapshots(conn, (
+            (row[idx['post_shortcode']], _fetched_at(row[idx['timestamp_registro']]),
+             row[idx['likes_count']], row[idx['comments_count']], row[idx['play_count']])
+            for row in rows if row[idx['likes_count']] is not None
+        ))
+    return cursor.rowcount
+
+
+def known_shortcodes(conn, shortcodes):
+    """Retorna el subconjunto de 'shortcodes' que ya existe en la base (búsqueda por índice)."""
+    shortcodes = [code for code in shortcodes if code]
+    found = set()
+    # SQLite limita el número de parámetros por consulta
+    for start in range(0, len(shortcodes), 500):
+        chunk = shortcodes[start:start + 500]
+        placeholders = ", ".join("?" for _ in chunk)
+        found.update(code for (code,) in conn.execute(
+            f"SELECT post_shortcode FROM posts WHERE post_shortcode IN ({placeholders})", chunk))
+    return found
+
+
+def latest_post_date(conn):
+    """Fecha de creación más reciente registrada (texto 'YYYY-MM-DD HH:MM:SS') o None."""
+    return conn.execute("SELECT MAX(post_created_at_str) FROM posts").fetchone()[0]
+
+
+def posts_created_since(conn, since):
+    """Retorna [(shortcode, url)] de los posts creados desde 'since' (texto 'YYYY-MM-DD HH:MM:SS')."""
+    return conn.execute(
+        "SELECT post_shortcode, post_url FROM posts WHERE post_created_at_str >= ? ORDER BY rowid",
+        (since,)
+    ).fetchall()
+
+
+def update_metrics(conn, updates, fetched_at=None):
+    """
+    Actualiza likes, comentarios y reproducciones y guarda la medición en la serie de tiempo.
+
+    Args:
+        updates: iterable de (shortcode, likes, comments, plays).
+        fetched_at (int | None): Segundos Unix de la consulta (None = ahora).
+
+    Returns:
+        int: Filas cuyo valor cambió realmente.
+    """
+    updates = list(updates)
+    fetched_at = int(time.time()) if fetched_at is None else int(fetched_at)
+    sql = (
+        "UPDATE posts SET likes_count = ?, comments_count = ?, play_count = ? "
+        "WHERE post_shortcode = ? AND (likes_count IS NOT ? OR comments_count IS NOT ? OR play_count IS NOT ?)"
+    )
+    with conn:
+        cursor = conn.executemany(sql, (
+            (likes, comments, plays, shortcode, likes, comments, plays)
+            for shortcode, likes, comments, plays in updates
+        ))
+        # La medición se guarda aunque no haya cambios: un valor estable también es información
+        _insert_snapshots(conn, (
+            (shortcode, fetched_at, likes, comments, plays)
+            for shortcode, likes, comments, plays in updates
+        ))
+    return cursor.rowcount
+
+
+def pending_transcripts(conn):
+    """Retorna [(shortcode, url)] de los videos que aún no tienen transcripción."""
+    return conn.execute(
+        "SELECT post_shortcode, post_url FROM posts "
+        "WHERE media_type = 2 AND (post_transcript IS NULL OR post_transcript IN ('', 'N/A')) ORDER BY rowid"
+    ).fetchall()
+
+
+def set_transcripts(conn, transcripts):
+    """
+    Guarda transcripciones solo en los posts que no la tenían.
+
+    Args:
+        transcripts: iterable de (shortcode, transcript).
+
+    Returns:
+        int: Filas actualizadas.
+    """
+    sql = (
+        "UPDATE posts SET post_transcript = ? "
+        "WHERE post_shortcode = ? AND (post_transcript IS NULL OR post_transcript IN ('', 'N/A'))"
+    )
+    with conn:
+        cursor = conn.executemany(sql, ((transcript, shortcode) for shortcode, transcript in transcripts))
+    return cursor.rowcount
+
+
+def _ranked_snapshots(shortcodes):
+    """Subconsulta con las mediciones numeradas de la más reciente (rn = 1) a la más antigua."""
+    where, params = "", ()
+    if shortcodes is not None:
+        shortcodes = list(shortcodes)
+        where = f"WHERE post_shortcode IN ({', '.join('?' for _ in shortcodes) or 'NULL'})"
+        params = tuple(shortcodes)
+    query = (
+        "SELECT *, ROW_NUMBER() OVER (PARTITION BY post_shortcode ORDER BY fetched_at DESC) AS rn "
+        f"FROM metric_snapshots {where}"
+    )
+    return query, params
+
+
+def metric_history(conn, shortcode):
+    """Retorna [(fetched_at, likes, comments, plays)] de un post, de la más antigua a la más reciente."""
+    return conn.execute(
+        "SELECT fetched_at, likes, comments, plays FROM metric_snapshots "
+        "WHERE post_shortcode = ? ORDER BY fetched_at", (shortcode,)
+    ).fetchall()
+
+
+def latest_metrics(conn, shortcodes=None):
+    """
+    Última medición de cada post.
+
+    Returns:
+        dict: {shortcode: (fetched_at, likes, comments, plays)}
+    """
+    ranked, params = _ranked_snapshots(shortcodes)
+    rows = conn.execute(
+        f"SELECT post_shortcode, fetched_at, likes, comments, plays FROM ({ranked}) WHERE rn = 1", params)
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def metric_velocity(conn, shortcodes=None):
+    """
+    Velocidad de cada post entre sus dos últimas mediciones (solo posts con al menos dos).
+
+    Returns:
+        dict: {shortcode: {'likes_per_hour', 'comments_per_hour', 'plays_per_hour',
+               'hours', 'fetched_at'}}
+    """
+    ranked, params = _ranked_snapshots(shortcodes)
+    rows = conn.execute(
+        f"SELECT cur.post_shortcode, cur.fetched_at, cur.fetched_at - prev.fetched_at, "
+        f"cur.likes - prev.likes, cur.comments - prev.comments, cur.plays - prev.plays "
+        f"FROM ({ranked}) AS cur JOIN ({ranked}) AS prev "
+        f"ON prev.post_shortcode = cur.post_shortcode AND cur.rn = 1 AND prev.rn = 2",
+        params + params
+    )
+    velocity = {}
+    for shortcode, fetched_at, seconds, likes, comments, plays in rows:
+        hours = seconds / 3600
+        velocity[shortcode] = {
+            'likes_per_hour': (likes or 0) / hours,
+            'comments_per_hour': (comments or 0) / hours,
+            'plays_per_hour': (plays or 0) / hours,
+            'hours': hours,
+            'fetched_at': fetched_at,
+        }
+    return velocity
+
+
+def dirty_months(conn):
+    """Retorna {mes: contador_de_cambios} de los meses modificados desde la última sincronización."""
+    return dict(conn.execute("SELECT month, changes FROM dirty_months").fetchall())
+
+
+def clear_dirty_months(conn, months_with_changes):
+    """Marca como sincronizados los meses, salvo que hayan vuelto a cambiar entretanto."""
+    with conn:
+        conn.executemany("DELETE FROM dirty_months WHERE month = ? AND changes = ?", months_with_changes.items())
+
+
+def all_months(conn):
+    """Meses ('YYYY-MM' o 'sin_fecha') presentes en la base."""
+    return [month for (month,) in conn.execute(f"SELECT DISTINCT {_MONTH_EXPR.format(row='posts')} FROM posts")]
+
+
+def month_query(month):
+    """Retorna (condición SQL, parámetros) que seleccionan los posts de un mes usando el índice de fecha."""
+    if month == NO_DATE_MONTH:
+        return "post_created_at_str IS NULL", ()
+    year, month_number = month.split('-')
+    return "post_created_at_str >= ? AND post_created_at_str < ?", (month, f"{year}-{int(month_number) + 1:02d}")
+
+
+def export_csv(conn, csv_file):
+    """Exporta la base completa al formato CSV original (en orden de registro)."""
+    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(POST_COLUMNS)
+        cursor = conn.execute(f"SELECT {', '.join(POST_COLUMNS)} FROM posts ORDER BY rowid")
+        total = 0
+        while True:
+            rows = cursor.fetchmany(5000)
+            if not rows:
+                break
+            writer.writerows(rows)
+            total += len(rows)
+    return total
+
+
+if __name__ == "__main__":
+    export_file = "base_de_datos_instagram_export.csv"
+    connection = connect()
+    exported = export_csv(connection, export_file)
+    print(f"🎉 Se exportaron {exported} posts a '{export_file}'.")
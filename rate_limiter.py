@@ -0,0 +1,46 @@
+import threading
+import time
+
+# =============================================================================
+# LIMITADOR DE TASA (TOKEN BUCKET)
+#
+# Reemplaza las pausas fijas (time.sleep) entre peticiones por un control de
+# tasa compartido: cada petición consume un token y los tokens se recargan a la
+# velocidad permitida por la cuota de la API. Es seguro para usar desde varios
+# hilos a la vez.
+# =============================================================================
+
+
+class TokenBucket:
+    """Limitador de tasa tipo 'token bucket' seguro para hilos."""
+
+    def __init__(self, rate_per_second, burst=1):
+        """
+        Args:
+            rate_per_second (float): Tokens que se recargan por segundo (cuota de la API).
+            burst (int): Capacidad máxima del balde (peticiones seguidas permitidas).
+        """
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second debe ser mayor que 0.")
+        self.rate = float(rate_per_second)
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def acquire(self, tokens=1):
+        """Bloquea hasta que haya tokens disponibles y los consume."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_time = (tokens - self._tokens) / self.rate
+            time.sleep(wait_time)
@@ -0,0 +1,178 @@
+import time
+from datetime import datetime
+
+import post_db
+
+# =============================================================================
+# PLANIFICADOR ADAPTATIVO DE ACTUALIZACIÓN DE MÉTRICAS
+#
+# En lugar de consultar en cada ejecución todos los posts recientes, cada post
+# tiene su propio intervalo de actualización:
+# - El intervalo base depende de la edad del post (los posts nuevos cambian más).
+# - Se acorta si el post sigue creciendo rápido y se alarga (hasta un máximo)
+#   si sus métricas se estancaron entre las dos últimas mediciones.
+# El plan de cada ejecución se limita a un presupuesto de peticiones a la API,
+# que se gasta primero en los posts con mayor cambio esperado.
+#
+# El estado se guarda en la tabla 'refresh_schedule' de la base de posts; el
+# crecimiento se calcula con la serie de tiempo 'metric_snapshots' (post_db.py).
+# =============================================================================
+
+# --- CONFIGURACIÓN ---
+# Intervalo base según la edad del post: (edad máxima en horas, intervalo en horas)
+AGE_INTERVALS = [(24, 2), (72, 6), (168, 24)]
+OLD_POST_INTERVAL_HOURS = 72
+MIN_INTERVAL_HOURS = 1
+MAX_INTERVAL_HOURS = 24 * 14
+# Crecimiento relativo por hora ((likes + comentarios) nuevos / acumulados)
+FAST_GROWTH_PER_HOUR = 0.02  # Por encima: el intervalo se reduce a la mitad
+PLATEAU_GROWTH_PER_HOUR = 0.001  # Por debajo: el intervalo se duplica
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS refresh_schedule (
+    post_shortcode TEXT PRIMARY KEY,
+    interval_hours REAL NOT NULL,
+    next_due INTEGER NOT NULL,
+    growth_per_hour REAL
+) WITHOUT ROWID;
+"""
+
+
+# --- FUNCIONES AUXILIARES ---
+
+def _ensure_schema(conn):
+    conn.executescript(SCHEMA_SQL)
+
+
+def _chunks(items, size=500):
+    # SQLite limita el número de parámetros por consulta
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _load_rows(conn, query, shortcodes):
+    """Ejecuta 'query' (con un marcador {placeholders}) por bloques de shortcodes."""
+    rows = {}
+    for chunk in _chunks(list(shortcodes)):
+        placeholders = ", ".join("?" for _ in chunk)
+        for row in conn.execute(query.format(placeholders=placeholders), chunk):
+            rows[row[0]] = row[1:]
+    return rows
+
+
+def _snapshot_stats(conn, shortcodes):
+    """Última medición y velocidad de cada post (consultadas por bloques)."""
+    latest, velocity = {}, {}
+    for chunk in _chunks(list(shortcodes)):
+        latest.update(post_db.latest_metrics(conn, chunk))
+        velocity.update(post_db.metric_velocity(conn, chunk))
+    return latest, velocity
+
+
+def _age_hours(created_at, now):
+    try:
+        created = datetime.strptime(created_at[:19], '%Y-%m-%d %H:%M:%S').timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (now - created) / 3600)
+
+
+def base_interval_hours(age_hours):
+    """Intervalo de actualización según la edad del post."""
+    if age_hours is None:
+        return OLD_POST_INTERVAL_HOURS
+    for max_age, interval in AGE_INTERVALS:
+        if age_hours < max_age:
+            return interval
+    return OLD_POST_INTERVAL_HOURS
+
+
+def _interactions_per_hour(velocity):
+    return max(0.0, velocity['likes_per_hour'] + velocity['comments_per_hour'])
+
+
+def _relative_growth(velocity, latest):
+    """Crecimiento por hora relativo al total acumulado; None si no hay dos mediciones."""
+    if velocity is None or latest is None:
+        return None
+    _, likes, comments, _ = latest
+    return _interactions_per_hour(velocity) / max(1, (likes or 0) + (comments or 0))
+
+
+# --- API PÚBLICA ---
+
+def plan_refresh(conn, candidates, budget=None, now=None):
+    """
+    Elige qué posts consultar en esta ejecución.
+
+    Args:
+        conn: Conexión a la base de posts.
+        candidates: lista de (shortcode, url) que podrían actualizarse.
+        budget (int | None): Máximo de posts a consultar (None = sin límite).
+        now (float | None): Segundos Unix actuales (None = ahora).
+
+    Returns:
+        list: (shortcode, url) vencidos, del mayor al menor cambio esperado.
+    """
+    _ensure_schema(conn)
+    now = time.time() if now is None else now
+    shortcodes = [shortcode for shortcode, _ in candidates]
+    schedule = _load_rows(conn, "SELECT post_shortcode, next_due FROM refresh_schedule "
+                                "WHERE post_shortcode IN ({placeholders})", shortcodes)
+    created = _load_rows(conn, "SELECT post_shortcode, post_created_at_str FROM posts "
+                               "WHERE post_shortcode IN ({placeholders})", shortcodes)
+    latest, velocity = _snapshot_stats(conn, shortcodes)
+
+    due = []
+    for shortcode, url in candidates:
+        if shortcode in schedule and schedule[shortcode][0] > now:
+            continue
+        age = _age_hours(created.get(shortcode, (None,))[0], now)
+        if shortcode not in velocity or shortcode not in latest:
+            # Sin dos mediciones no hay crecimiento conocido: van primero, los más nuevos antes
+            expected_change = float('inf')
+        else:
+            hours_since_fetch = max(0.0, (now - latest[shortcode][0]) / 3600)
+            expected_change = _interactions_per_hour(velocity[shortcode]) * hours_since_fetch
+        due.append((expected_change, -(age if age is not None else float('inf')), shortcode, url))
+
+    due.sort(reverse=True)
+    if budget is not None:
+        due = due[:budget]
+    return [(shortcode, url) for _, _, shortcode, url in due]
+
+
+def record_refresh(conn, shortcodes, now=None):
+    """
+    Recalcula el intervalo y la próxima fecha de actualización de los posts recién
+    consultados (llamar después de post_db.update_metrics).
+    """
+    _ensure_schema(conn)
+    now = time.time() if now is None else now
+    shortcodes = list(shortcodes)
+    previous = _load_rows(conn, "SELECT post_shortcode, interval_hours FROM refresh_schedule "
+                                "WHERE post_shortcode IN ({placeholders})", shortcodes)
+    created = _load_rows(conn, "SELECT post_shortcode, post_created_at_str FROM posts "
+                               "WHERE post_shortcode IN ({placeholders})", shortcodes)
+    latest, velocity = _snapshot_stats(conn, shortcodes)
+
+    rows = []
+    for shortcode in shortcodes:
+        interval = base_interval_hours(_age_hours(created.get(shortcode, (None,))[0], now))
+        growth = _relative_growth(velocity.get(shortcode), latest.get(shortcode))
+        if growth is not None:
+            if growth >= FAST_GROWTH_PER_HOUR:
+                interval = interval / 2
+            elif growth < PLATEAU_GROWTH_PER_HOUR:
+                # Estancado: se duplica el intervalo anterior (o el base, si era menor)
+                interval = max(interval, previous.get(shortcode, (interval,))[0]) * 2
+        interval = min(MAX_INTERVAL_HOURS, max(MIN_INTERVAL_HOURS, interval))
+        rows.append((shortcode, interval, int(now + interval * 3600), growth))
+
+    with conn:
+        conn.executemany(
+            "INSERT INTO refresh_schedule (post_shortcode, interval_hours, next_due, growth_per_hour) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT(post_shortcode) DO UPDATE SET "
+            "interval_hours = excluded.interval_hours, next_due = excluded.next_due, "
+            "growth_per_hour = excluded.growth_per_hour", rows)
+    return len(rows)
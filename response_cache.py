@@ -0,0 +1,121 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlencode
+
+# =============================================================================
+# CACHÉ EN DISCO DE RESPUESTAS DE LA API
+#
+# Guarda las respuestas JSON exitosas de ScrapeCreators en un archivo SQLite,
+# comprimidas con zlib y con clave 'endpoint + parámetros ordenados'. Si un
+# script se vuelve a ejecutar (después de un corte o mientras se desarrolla),
+# las respuestas vigentes se leen del disco en lugar de pagar otra petición.
+#
+# - Cada endpoint tiene su propia vigencia (TTL), definida en scrapecreators_client.py.
+# - Cuando el archivo supera MAX_CACHE_BYTES se eliminan las respuestas usadas
+#   hace más tiempo (LRU).
+# =============================================================================
+
+# --- CONFIGURACIÓN ---
+CACHE_FILE = "cache_respuestas_api.db"
+MAX_CACHE_BYTES = 512 * 1024 * 1024  # Tamaño máximo (comprimido) de las respuestas guardadas
+EVICTION_TARGET_RATIO = 0.9  # Al desalojar se baja hasta este porcentaje del máximo
+COMPRESSION_LEVEL = 6
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS responses (
+    cache_key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    size INTEGER NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access);
+"""
+
+
+def make_key(endpoint, params):
+    """Clave estable: el orden de los parámetros no importa."""
+    return endpoint + "?" + urlencode(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+
+
+class ResponseCache:
+    """Caché de respuestas JSON en SQLite, segura para usar desde varios hilos."""
+
+    def __init__(self, cache_file=CACHE_FILE, max_bytes=MAX_CACHE_BYTES):
+        self.cache_file = cache_file
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total_bytes = 0
+
+    def _connection(self):
+        # Se abre en el primer uso: importar el cliente no crea el archivo
+        if self._conn is None:
+            conn = sqlite3.connect(self.cache_file, timeout=60, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA_SQL)
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, endpoint, params, ttl_seconds):
+        """
+        Retorna la respuesta guardada o None si no existe o ya venció.
+
+        Args:
+            ttl_seconds (float | None): Vigencia en segundos (None = no vence nunca).
+        """
+        key = make_key(endpoint, params)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT created_at, body FROM responses WHERE cache_key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            created_at, body = row
+            if ttl_seconds is not None and now - created_at > ttl_seconds:
+                return None
+            with conn:
+                conn.execute("UPDATE responses SET last_access = ? WHERE cache_key = ?", (now, key))
+        return json.loads(zlib.decompress(body))
+
+    def put(self, endpoint, params, data):
+        """Guarda una respuesta (reemplaza la anterior con la misma clave)."""
+        key = make_key(endpoint, params)
+        body = zlib.compress(json.dumps(data, ensure_ascii=False).encode('utf-8'), COMPRESSION_LEVEL)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                previous = conn.execute("SELECT size FROM responses WHERE cache_key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (cache_key, endpoint, created_at, last_access, size, body) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (key, endpoint, now, now, len(body), body))
+            self._total_bytes += len(body) - (previous[0] if previous else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict(conn)
+
+    def _evict(self, conn):
+        """Elimina las respuestas usadas hace más tiempo hasta bajar del objetivo."""
+        target = self.max_bytes * EVICTION_TARGET_RATIO
+        to_delete = []
+        for key, size in conn.execute("SELECT cache_key, size FROM responses ORDER BY last_access"):
+            if self._total_bytes <= target:
+                break
+            to_delete.append((key,))
+            self._total_bytes -= size
+        with conn:
+            conn.executemany("DELETE FROM responses WHERE cache_key = ?", to_delete)
+
+    def clear(self):
+        """Vacía la caché."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM responses")
+            self._total_bytes = 0
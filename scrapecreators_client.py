@@ -0,0 +1,191 @@
+import email.utils
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import TokenBucket
+from response_cache import ResponseCache
+
+# =============================================================================
+# CLIENTE HTTP COMPARTIDO PARA LA API DE SCRAPECREATORS
+#
+# Todos los scripts que consultan ScrapeCreators pasan por este módulo:
+# - Una sola sesión con conexiones persistentes (keep-alive) y pool de conexiones.
+# - Timeouts por endpoint.
+# - Reintentos con backoff exponencial + jitter ante 429/5xx y fallas de red,
+#   respetando la cabecera 'Retry-After' cuando la API la envía.
+# - Un limitador de tasa global ajustado a la cuota de la API.
+# - Una caché en disco de respuestas (response_cache.py) con vigencia por endpoint.
+# - Un registro opcional de la latencia de cada llamada, medida en el cliente.
+# =============================================================================
+
+# Asumimos que config.py contiene: SCRAPE_API_KEY
+try:
+    from config import SCRAPE_API_KEY
+except ImportError:
+    print("❌ Error: Asegúrate de que tu archivo 'config.py' existe y contiene la variable SCRAPE_API_KEY.")
+    exit()
+
+# --- CONFIGURACIÓN ---
+# Se puede apuntar a otro servidor (p. ej. scrapecreators_stub.py) con la variable de entorno
+BASE_URL = os.environ.get("SCRAPE_API_BASE_URL", "https://api.scrapecreators.com")
+
+# --- Endpoints de la API ---
+ENDPOINT_PROFILE = "/v1/instagram/profile"
+ENDPOINT_POSTS = "/v2/instagram/user/posts"
+ENDPOINT_POST = "/v1/instagram/post"
+ENDPOINT_TRANSCRIPT = "/v2/instagram/media/transcript"
+
+# Timeouts (conexión, lectura) en segundos por endpoint
+ENDPOINT_TIMEOUTS = {
+    ENDPOINT_PROFILE: (10, 30),
+    ENDPOINT_POSTS: (10, 60),
+    ENDPOINT_POST: (10, 45),
+    ENDPOINT_TRANSCRIPT: (10, 90),
+}
+DEFAULT_TIMEOUT = (10, 60)
+
+# Reintentos
+MAX_RETRIES = 4
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+RETRY_AFTER_MAX_SECONDS = 60.0  # Tope de la espera pedida por 'Retry-After' (una cabecera errónea no bloquea un hilo por horas)
+
+# Cuota y conexiones
+API_REQUESTS_PER_SECOND = float(os.environ.get("SCRAPE_API_REQUESTS_PER_SECOND", 2.0))  # Cuota de ScrapeCreators (peticiones por segundo)
+API_BURST = 4  # Peticiones seguidas permitidas antes de aplicar la cuota
+POOL_MAXSIZE = 16  # Conexiones persistentes máximas (>= hilos simultáneos)
+
+# Caché de respuestas: vigencia en segundos por endpoint (None = no vence nunca).
+# Los endpoints que no aparecen (o con 0) siempre consultan la API.
+USE_RESPONSE_CACHE = True
+ENDPOINT_CACHE_TTLS = {
+    ENDPOINT_PROFILE: 6 * 60 * 60,  # Estadísticas del perfil: horas
+    ENDPOINT_POSTS: 10 * 60,  # Páginas de posts de un perfil: minutos
+    ENDPOINT_POST: 0,  # Métricas de un post: siempre frescas (alimentan la serie de tiempo)
+    ENDPOINT_TRANSCRIPT: None,  # Una transcripción no cambia
+}
+
+# Registro de latencia (lo usa benchmark_ingestion.py): si la variable de entorno tiene una ruta,
+# cada llamada a api_get que sale a la red agrega ahí la línea "endpoint<TAB>código<TAB>segundos".
+# El tiempo incluye la espera del limitador de tasa y los reintentos: es lo que espera el script.
+LATENCY_LOG_FILE = os.environ.get("SCRAPE_API_LATENCY_LOG")
+
+HEADERS = {
+    "x-api-key": SCRAPE_API_KEY,
+    "accept": "application/json"
+}
+
+RATE_LIMITER = TokenBucket(API_REQUESTS_PER_SECOND, burst=API_BURST)
+RESPONSE_CACHE = ResponseCache()
+
+_session = None
+_session_lock = threading.Lock()
+_latency_log_lock = threading.Lock()
+
+
+def get_session():
+    """Retorna la sesión HTTP compartida, creándola la primera vez."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _retry_after_seconds(response):
+    """
+    Interpreta la cabecera 'Retry-After' (segundos o fecha HTTP), limitada a RETRY_AFTER_MAX_SECONDS.
+    Retorna None si no existe.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return min(max(0.0, float(value)), RETRY_AFTER_MAX_SECONDS)
+    except ValueError:
+        pass
+    try:
+        retry_date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_date.tzinfo is None:
+        retry_date = retry_date.replace(tzinfo=timezone.utc)
+    return min(max(0.0, (retry_date - datetime.now(timezone.utc)).total_seconds()), RETRY_AFTER_MAX_SECONDS)
+
+
+def _backoff_seconds(attempt):
+    """Backoff exponencial con 'full jitter'."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+def _log_latency(endpoint, outcome, seconds):
+    """Agrega una llamada al registro de latencia, si está activado."""
+    if not LATENCY_LOG_FILE:
+        return
+    with _latency_log_lock, open(LATENCY_LOG_FILE, 'a', encoding='utf-8') as f:
+        f.write(f"{endpoint}\t{outcome}\t{seconds:.6f}\n")
+
+
+def api_get(endpoint, params):
+    """
+    Realiza un GET a la API con reintentos y retorna el JSON decodificado.
+
+    Lanza requests.exceptions.RequestException si la petición falla de forma
+    definitiva, igual que una llamada directa a requests.get + raise_for_status().
+    Las respuestas exitosas se guardan en la caché según ENDPOINT_CACHE_TTLS.
+    """
+    ttl = ENDPOINT_CACHE_TTLS.get(endpoint, 0)
+    use_cache = USE_RESPONSE_CACHE and ttl != 0
+    if use_cache:
+        cached = RESPONSE_CACHE.get(endpoint, params, ttl)
+        if cached is not None:
+            return cached
+
+    session = get_session()
+    url = BASE_URL + endpoint
+    timeout = ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+
+    started = time.perf_counter()
+    outcome = "error"  # Código de la última respuesta ('error' si falló la conexión)
+    try:
+        for attempt in range(MAX_RETRIES + 1):
+            RATE_LIMITER.acquire()
+            try:
+                response = session.get(url, params=params, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                outcome = "error"
+                if attempt == MAX_RETRIES:
+                    raise
+                wait_time = _backoff_seconds(attempt)
+                print(f"  🔁 Falla de red en {endpoint}. Reintentando en {wait_time:.1f}s...")
+                time.sleep(wait_time)
+                continue
+
+            outcome = str(response.status_code)
+            if response.status_code in RETRY_STATUS_CODES and attempt < MAX_RETRIES:
+                wait_time = _retry_after_seconds(response)
+                if wait_time is None:
+                    wait_time = _backoff_seconds(attempt)
+                print(f"  🔁 Respuesta {response.status_code} en {endpoint}. Reintentando en {wait_time:.1f}s...")
+                time.sleep(wait_time)
+                continue
+
+            response.raise_for_status()
+            data = response.json()
+            if use_cache:
+                RESPONSE_CACHE.put(endpoint, params, data)
+            return data
+    finally:
+        _log_latency(endpoint, outcome, time.perf_counter() - started)
@@ -0,0 +1,251 @@
+import argparse
+import json
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from response_cache import make_key
+
+# =============================================================================
+# SERVIDOR LOCAL QUE IMITA LA API DE SCRAPECREATORS (SIN GASTAR CRÉDITOS)
+#
+# Atiende los cuatro endpoints que usan los scripts:
+#   /v1/instagram/profile, /v2/instagram/user/posts (paginado con next_max_id),
+#   /v1/instagram/post y /v2/instagram/media/transcript
+#
+# Las respuestas salen de respuestas grabadas (un archivo de caché
+# 'cache_respuestas_api.db' generado por response_cache.py durante ejecuciones
+# reales) o, si no existen, de datos sintéticos deterministas por perfil.
+# Permite simular latencia, respuestas 429 y errores 5xx.
+#
+# Uso:
+#   python scrapecreators_stub.py --port 8765 --latency-ms 150 --rate-429 0.05
+#   SCRAPE_API_BASE_URL=http://127.0.0.1:8765 python 2_update_bd.py
+#
+# Rutas internas: GET /__stats (estadísticas de peticiones) y GET /__reset.
+# =============================================================================
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+DEFAULT_PORT = 8765
+POSTS_PER_PAGE = 12
+PAGES_PER_PROFILE = 4
+HOURS_BETWEEN_POSTS = 5
+VIDEO_SHARE = 0.4  # Proporción de posts que son video (media_type 2)
+TRANSCRIPT_WORDS = "país gente seguridad salud educación empleo paz campo jóvenes futuro cambio región".split()
+
+
+class StubSettings:
+    """Parámetros de simulación del servidor."""
+
+    def __init__(self, latency_ms=0.0, latency_jitter_ms=0.0, rate_429=0.0, error_rate=0.0,
+                 fixtures_file=None, posts_per_page=POSTS_PER_PAGE, pages_per_profile=PAGES_PER_PROFILE, seed=0):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.rate_429 = rate_429
+        self.error_rate = error_rate
+        self.fixtures_file = fixtures_file
+        self.posts_per_page = posts_per_page
+        self.pages_per_profile = pages_per_profile
+        self.seed = seed
+
+
+# --- DATOS SINTÉTICOS ---
+
+def _rng(*parts):
+    """Generador aleatorio determinista para una combinación de valores."""
+    return random.Random(zlib.crc32("|".join(str(part) for part in parts).encode('utf-8')))
+
+
+def _shortcode(handle, index):
+    return f"{zlib.crc32(handle.encode('utf-8')):08x}{index:05d}"
+
+
+def synthetic_profile(handle, settings):
+    rng = _rng(settings.seed, 'profile', handle)
+    return {'data': {'user': {
+        'username': handle,
+        'edge_followed_by': {'count': rng.randint(1_000, 2_000_000)},
+        'edge_owner_to_timeline_media': {'count': rng.randint(200, 5_000)},
+        'edge_follow': {'count': rng.randint(50, 2_000)},
+    }}}
+
+
+def synthetic_posts_page(handle, next_max_id, settings, now):
+    page = int(next_max_id) if next_max_id and str(next_max_id).isdigit() else 0
+    items = []
+    for i in range(settings.posts_per_page):
+        index = page * settings.posts_per_page + i
+        rng = _rng(settings.seed, 'post', handle, index)
+        media_type = 2 if rng.random() < VIDEO_SHARE else rng.choice([1, 8])
+        mentions = rng.sample(TRANSCRIPT_WORDS, 3)
+        items.append({
+            'pk': str(3_000_000_000_000_000_000 + zlib.crc32(f"{handle}{index}".encode())),
+            'code': _shortcode(handle, index),
+            'taken_at': int(now - (index + 1) * HOURS_BETWEEN_POSTS * 3600),
+            'caption': {'text': " ".join(mentions) + f" @{handle} #colombia"},
+            'media_type': media_type,
+            'like_count': rng.randint(0, 20_000),
+            'comment_count': rng.randint(0, 1_500),
+            'play_count': rng.randint(1_000, 500_000) if media_type == 2 else 0,
+            'usertags': {'in': [{'user': {'username': f"usuario_{rng.randint(1, 40)}"}}] if rng.random() < 0.3 else []},
+        })
+    has_more = page + 1 < settings.pages_per_profile
+    return {'items': items, 'next_max_id': str(page + 1) if has_more else None}
+
+
+def synthetic_post(url, settings, now):
+    shortcode = url.rstrip('/').rsplit('/', 1)[-1]
+    rng = _rng(settings.seed, 'metrics', shortcode)
+    # Las métricas crecen con el tiempo para que la serie de tiempo tenga movimiento
+    growth = (now / 3600) % 10_000
+    is_video = rng.random() < VIDEO_SHARE
+    return {'data': {'xdt_shortcode_media': {
+        'shortcode': shortcode,
+        'is_video': is_video,
+        'edge_media_preview_like': {'count': rng.randint(0, 20_000) + int(growth * rng.random())},
+        'edge_media_to_parent_comment': {'count': rng.randint(0, 1_500) + int(growth * rng.random() / 20)},
+        'video_play_count': rng.randint(1_000, 500_000) + int(growth * 10) if is_video else None,
+    }}}
+
+
+def synthetic_transcript(url, settings):
+    rng = _rng(settings.seed, 'transcript', url)
+    return {'success': True, 'transcripts': [
+        {'id': url, 'text': " ".join(rng.choices(TRANSCRIPT_WORDS, k=rng.randint(20, 120)))}
+    ]}
+
+
+# --- SERVIDOR ---
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, settings):
+        super().__init__(address, StubRequestHandler)
+        self.settings = settings
+        self.stats_lock = threading.Lock()
+        self.requests_log = []  # (endpoint, status, segundos de proceso en el servidor)
+        self._fixtures_lock = threading.Lock()
+        self._fixtures = None
+        if settings.fixtures_file:
+            self._fixtures = sqlite3.connect(settings.fixtures_file, check_same_thread=False)
+
+    def fixture(self, endpoint, params):
+        """Respuesta grabada para la petición, o None si no existe."""
+        if self._fixtures is None:
+            return None
+        with self._fixtures_lock:
+            row = self._fixtures.execute("SELECT body FROM responses WHERE cache_key = ?",
+                                         (make_key(endpoint, params),)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def record(self, endpoint, status, seconds):
+        with self.stats_lock:
+            self.requests_log.append((endpoint, status, seconds))
+
+    def stats(self):
+        with self.stats_lock:
+            log = list(self.requests_log)
+        return {'requests': [{'endpoint': e, 'status': s, 'seconds': t} for e, s, t in log]}
+
+    def reset(self):
+        with self.stats_lock:
+            self.requests_log = []
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    server_version = "ScrapeCreatorsStub/1.0"
+
+    def log_message(self, format, *args):
+        pass  # Silencioso: las estadísticas se consultan en /__stats
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        started = time.perf_counter()
+        parts = urlsplit(self.path)
+        endpoint = parts.path
+        params = dict(parse_qsl(parts.query))
+        settings = self.server.settings
+
+        if endpoint == "/__stats":
+            return self._send_json(200, self.server.stats())
+        if endpoint == "/__reset":
+            self.server.reset()
+            return self._send_json(200, {'ok': True})
+
+        latency = settings.latency_ms + random.uniform(-settings.latency_jitter_ms, settings.latency_jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+        roll = random.random()
+        if roll < settings.rate_429:
+            status, payload, headers = 429, {'error': 'rate limited'}, {'Retry-After': '1'}
+        elif roll < settings.rate_429 + settings.error_rate:
+            status, payload, headers = 500, {'error': 'internal error'}, None
+        else:
+            status, headers = 200, None
+            payload = self.server.fixture(endpoint, params) or self._synthetic(endpoint, params)
+            if payload is None:
+                status, payload = 404, {'error': f'endpoint desconocido: {endpoint}'}
+
+        self._send_json(status, payload, headers)
+        self.server.record(endpoint, status, time.perf_counter() - started)
+
+    def _synthetic(self, endpoint, params):
+        settings = self.server.settings
+        now = time.time()
+        if endpoint == "/v1/instagram/profile":
+            return synthetic_profile(params.get('handle', ''), settings)
+        if endpoint == "/v2/instagram/user/posts":
+            return synthetic_posts_page(params.get('handle', ''), params.get('next_max_id'), settings, now)
+        if endpoint == "/v1/instagram/post":
+            return synthetic_post(params.get('url', ''), settings, now)
+        if endpoint == "/v2/instagram/media/transcript":
+            return synthetic_transcript(params.get('url', ''), settings)
+        return None
+
+
+def start_stub_server(settings=None, host="127.0.0.1", port=0):
+    """Inicia el servidor en un hilo de fondo. Retorna el servidor (server.server_port tiene el puerto)."""
+    server = StubServer((host, port), settings or StubSettings())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita la API de ScrapeCreators.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latencia media por petición.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Variación aleatoria de la latencia (±).")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Proporción de respuestas 429.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proporción de respuestas 500.")
+    parser.add_argument("--fixtures", default=None, help="Archivo de caché con respuestas grabadas.")
+    parser.add_argument("--pages", type=int, default=PAGES_PER_PROFILE, help="Páginas de posts por perfil.")
+    args = parser.parse_args()
+
+    settings = StubSettings(args.latency_ms, args.jitter_ms, args.rate_429, args.error_rate,
+                            args.fixtures, pages_per_profile=args.pages)
+    server = StubServer(("127.0.0.1", args.port), settings)
+    print(f"🧪 Servidor de prueba de ScrapeCreators escuchando en http://127.0.0.1:{args.port}")
+    print(f"   Usa: SCRAPE_API_BASE_URL=http://127.0.0.1:{args.port} python 2_update_bd.py")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Servidor detenido.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import re
+from collections import Counter, defaultdict
+
+# =============================================================================
+# LIMPIEZA Y TOKENIZACIÓN DE TEXTOS, POST POR POST
+#
+# Antes los scripts 5 y ?11 unían todos los textos de un perfil en un solo
+# string, le aplicaban cuatro re.sub y lo partían en palabras. Aquí cada post
+# se limpia y se tokeniza por separado con una sola expresión regular, y los
+# tokens van directo a un Counter por perfil: la memoria depende del
+# vocabulario, no del tamaño del corpus.
+#
+# Reglas de limpieza (las mismas de clean_text):
+#   1. Se quitan URLs (http...), menciones (@usuario) y hashtags (#tema)
+#   2. Se quita todo lo que no sea letra (incluidas tildes y ñ) o espacio
+#   3. Se pasa a minúsculas y se descartan stopwords y palabras de 1 o 2 letras
+# =============================================================================
+
+# --- CONFIGURACIÓN ---
+MIN_WORD_LENGTH = 3
+
+STOPWORDS = frozenset([
+    'de', 'la', 'que', 'el', 'en', 'y', 'a', 'los', 'del', 'se', 'las', 'por', 'un',
+    'para', 'con', 'no', 'una', 'su', 'al', 'lo', 'como', 'más', 'pero', 'sus',
+    'le', 'ya', 'o', 'este', 'ha', 'me', 'si', 'sin', 'sobre', 'entre',
+    'cuando', 'también', 'fue', 'ser', 'son', 'dos', 'así', 'desde', 'muy', 'hasta',
+    'nos', 'mi', 'eso', 'qué', 'todo', 'todos', 'eres', 'soy', 'es', 'está', 'están'
+])
+
+# Una sola pasada equivale a las cuatro sustituciones en orden: las menciones y
+# hashtags se cortan antes de un 'http', que siempre se elimina completo.
+CLEAN_PATTERN = re.compile(
+    r"http\S+"
+    r"|@(?:(?!http\S)\w)+"
+    r"|#(?:(?!http\S)\w)+"
+    r"|[^a-zA-ZáéíóúÁÉÍÓÚñÑ\s]"
+)
+
+
+def clean_text(text):
+    """Limpia un texto (URLs, menciones, hashtags y caracteres no alfabéticos) y lo pasa a minúsculas."""
+    return CLEAN_PATTERN.sub('', text).lower()
+
+
+def tokenize(text):
+    """Palabras de un texto limpio, sin stopwords ni palabras cortas."""
+    return [word for word in clean_text(text).split()
+            if len(word) >= MIN_WORD_LENGTH and word not in STOPWORDS]
+
+
+def iter_tokens(texts):
+    """Genera la lista de tokens de cada texto (los valores faltantes cuentan como texto vacío)."""
+    for text in texts:
+        yield tokenize(text) if isinstance(text, str) else []
+
+
+def count_tokens(texts):
+    """Frecuencia de cada palabra en todos los textos."""
+    counts = Counter()
+    for tokens in iter_tokens(texts):
+        counts.update(tokens)
+    return counts
+
+
+def token_counts_by_group(groups, texts):
+    """
+    Frecuencia de palabras por grupo (por ejemplo, por perfil).
+
+    Args:
+        groups (iterable): Grupo de cada texto.
+        texts (iterable): Textos, en el mismo orden.
+
+    Returns:
+        dict: {grupo: Counter de palabras}
+    """
+    counts = defaultdict(Counter)
+    for group, tokens in zip(groups, iter_tokens(texts)):
+        counts[group].update(tokens)
+    return dict(counts)
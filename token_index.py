@@ -0,0 +1,143 @@
+import hashlib
+import json
+import sqlite3
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from fingerprints import post_fingerprints
+from text_processing import CLEAN_PATTERN, MIN_WORD_LENGTH, STOPWORDS, tokenize
+
+# =============================================================================
+# ÍNDICE PERSISTENTE DE TOKENS POR POST
+#
+# Guarda en 'indice_tokens.db' las palabras limpias de cada post (caption +
+# transcripción) como un arreglo de IDs enteros, más la tabla de vocabulario
+# (ID -> palabra). Cada post lleva la huella de su texto: en cada ejecución
+# solo se tokenizan los posts nuevos o cuyo texto cambió (por ejemplo, los que
+# recibieron su transcripción).
+#
+# Las frecuencias de un perfil, un mes o cualquier ventana de tiempo salen de
+# sumar los arreglos guardados con np.bincount, sin volver a limpiar texto.
+#
+# Si cambian las reglas de limpieza (text_processing.py), el índice se vacía
+# y se reconstruye.
+# =============================================================================
+
+# --- CONFIGURACIÓN ---
+INDEX_FILE = "indice_tokens.db"
+TOKEN_DTYPE = 'int32'
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS index_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vocabulary (
+    token_id INTEGER PRIMARY KEY,
+    token TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS post_tokens (
+    post_shortcode TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    tokens BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def tokenizer_version():
+    """Huella de las reglas de limpieza y tokenización."""
+    payload = json.dumps([CLEAN_PATTERN.pattern, MIN_WORD_LENGTH, sorted(STOPWORDS)], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class TokenIndex:
+    """Arreglos de IDs de tokens por post_shortcode, con vocabulario compartido."""
+
+    def __init__(self, index_file=INDEX_FILE):
+        self.conn = sqlite3.connect(index_file, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA_SQL)
+        version = tokenizer_version()
+        row = self.conn.execute("SELECT value FROM index_meta WHERE key = 'tokenizer_version'").fetchone()
+        if row is None or row[0] != version:
+            with self.conn:
+                self.conn.execute("DELETE FROM post_tokens")
+                self.conn.execute("DELETE FROM vocabulary")
+                self.conn.execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES ('tokenizer_version', ?)",
+                                  (version,))
+        self.vocabulary = [token for token, in self.conn.execute("SELECT token FROM vocabulary ORDER BY token_id")]
+        self.token_ids = {token: token_id for token_id, token in enumerate(self.vocabulary)}
+        self._arrays = None
+
+    def _encode(self, tokens, new_tokens):
+        ids = []
+        for token in tokens:
+            token_id = self.token_ids.get(token)
+            if token_id is None:
+                token_id = self.token_ids[token] = len(self.vocabulary)
+                self.vocabulary.append(token)
+                new_tokens.append((token_id, token))
+            ids.append(token_id)
+        return np.asarray(ids, dtype=TOKEN_DTYPE)
+
+    def update(self, shortcodes, texts):
+        """
+        Tokeniza y guarda solo los posts nuevos o cuyo texto cambió.
+
+        Args:
+            shortcodes (iterable): post_shortcode de cada post.
+            texts (iterable): Texto completo de cada post (caption + transcripción), en el mismo orden.
+
+        Returns:
+            int: Número de posts tokenizados en esta ejecución.
+        """
+        df = pd.DataFrame({'post_shortcode': list(shortcodes), 'text': list(texts)})
+        df['text'] = df['text'].fillna('').astype(str)
+        df['fingerprint'] = post_fingerprints(df, ['text'])
+        stored = dict(self.conn.execute("SELECT post_shortcode, fingerprint FROM post_tokens"))
+        pending = df[df['post_shortcode'].map(stored) != df['fingerprint']]
+        if pending.empty:
+            return 0
+
+        new_tokens = []
+        rows = [(shortcode, fingerprint, self._encode(tokenize(text), new_tokens).tobytes())
+                for shortcode, text, fingerprint in pending[['post_shortcode', 'text', 'fingerprint']].itertuples(index=False)]
+        with self.conn:
+            self.conn.executemany("INSERT INTO vocabulary (token_id, token) VALUES (?, ?)", new_tokens)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO post_tokens (post_shortcode, fingerprint, tokens) VALUES (?, ?, ?)", rows)
+        self._arrays = None
+        return len(rows)
+
+    def token_arrays(self, shortcodes):
+        """Arreglo de IDs de tokens de cada post (vacío si el post no está en el índice)."""
+        if self._arrays is None:
+            self._arrays = {shortcode: np.frombuffer(blob, dtype=TOKEN_DTYPE)
+                            for shortcode, blob in self.conn.execute("SELECT post_shortcode, tokens FROM post_tokens")}
+        empty = np.zeros(0, dtype=TOKEN_DTYPE)
+        return [self._arrays.get(shortcode, empty) for shortcode in shortcodes]
+
+    def term_counts(self, shortcodes):
+        """Frecuencia de cada palabra en los posts dados, como Counter {palabra: frecuencia}."""
+        arrays = self.token_arrays(shortcodes)
+        ids = np.concatenate(arrays) if arrays else np.zeros(0, dtype=TOKEN_DTYPE)
+        counts = np.bincount(ids, minlength=len(self.vocabulary))
+        present = np.flatnonzero(counts)
+        vocabulary = np.asarray(self.vocabulary, dtype=object)
+        return Counter(dict(zip(vocabulary[present], counts[present].tolist())))
+
+    def term_counts_by_group(self, shortcodes, groups):
+        """
+        Frecuencia de palabras por grupo (perfil, mes, ...) sumando los arreglos guardados.
+
+        Returns:
+            dict: {grupo: Counter de palabras}
+        """
+        frame = pd.DataFrame({'post_shortcode': list(shortcodes), 'group': list(groups)})
+        return {group: self.term_counts(members['post_shortcode'])
+                for group, members in frame.groupby('group', sort=False)}
+
+    def close(self):
+        self.conn.close()